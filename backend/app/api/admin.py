@@ -152,19 +152,8 @@ async def upload_regulation(rule_id: str, source_document: str, chunks: list[dic
     )
 
     # Generate embeddings
-    await job_queue.connect_async()
-
     for chunk in processed_chunks:
-        # Check cache
-        text_hash = embeddings_service.compute_text_hash(chunk["chunk_text"])
-        cached_embedding = await job_queue.get_cached_embedding(text_hash)
-
-        if cached_embedding is not None:
-            chunk["embedding"] = cached_embedding
-        else:
-            embedding = await embeddings_service.embed_text(chunk["chunk_text"])
-            chunk["embedding"] = embedding
-            await job_queue.cache_embedding(text_hash, embedding)
+        chunk["embedding"] = await embeddings_service.embed_with_cache(chunk["chunk_text"])
 
     # Store in database
     db = await get_db()
@@ -10,7 +10,6 @@ from loguru import logger
 from app.core.security import verify_admin_api_key
 from app.database import get_db
 from app.models.database import (
-    CodeMapQueries,
     RepositoryQueries,
     ScanQueries,
     ViolationQueries,
@@ -26,6 +25,7 @@ from app.models.schemas import (
 )
 from app.services.embeddings import embeddings_service
 from app.services.llm import llm_service
+from app.services.memory_index import memory_index
 from app.workers.job_queue import job_queue
 
 # Multi-agent compliance scanning
@@ -68,8 +68,9 @@ async def analyze_rule(request: AnalyzeRuleRequest) -> AnalyzeRuleResponse:
 
     # Find similar code chunks
     async with db.acquire() as conn:
-        similar_chunks = await CodeMapQueries.search_similar(
-            conn, rule_embedding, request.repo_id, top_k=request.top_k
+        similar_chunks = await memory_index.search_similar(
+            conn, rule_embedding, request.repo_id, top_k=request.top_k,
+            include_text=True, include_summary=True, query_text=request.rule_text,
         )
 
     logger.info(f"Found {len(similar_chunks)} similar chunks for rule analysis")
@@ -77,8 +78,18 @@ async def analyze_rule(request: AnalyzeRuleRequest) -> AnalyzeRuleResponse:
     # Analyze each chunk with LLM
     violations = []
     matched_chunks = []
+    cache_stats = {"hits": 0, "misses": 0}
 
-    for chunk in similar_chunks:
+    # Judge the chunks several per LLM call
+    try:
+        analyses = await llm_service.analyze_compliance_batch(
+            request.rule_text, similar_chunks, cache_stats=cache_stats
+        )
+    except Exception as e:
+        logger.warning(f"Failed to analyze chunks: {e}")
+        analyses = [None] * len(similar_chunks)
+
+    for chunk, analysis in zip(similar_chunks, analyses):
         similarity_score = 1.0 - chunk.get("distance", 1.0)
 
         matched_chunks.append(
@@ -95,17 +106,10 @@ async def analyze_rule(request: AnalyzeRuleRequest) -> AnalyzeRuleResponse:
             )
         )
 
-        # Analyze compliance
-        try:
-            analysis = await llm_service.analyze_compliance(
-                rule_text=request.rule_text,
-                code_text=chunk["chunk_text"],
-                file_path=chunk["file_path"],
-                start_line=chunk["start_line"],
-                end_line=chunk["end_line"],
-                language=chunk["language"],
-            )
+        if analysis is None:
+            continue
 
+        try:
             # Add to violations if non-compliant
             if analysis["verdict"] in ["non_compliant", "partial"]:
                 # Check severity filter
@@ -138,7 +142,10 @@ async def analyze_rule(request: AnalyzeRuleRequest) -> AnalyzeRuleResponse:
             logger.warning(f"Failed to analyze chunk {chunk['chunk_id']}: {e}")
 
     # Generate summary
-    summary = f"Analyzed {len(similar_chunks)} code chunks. Found {len(violations)} violations."
+    summary = (
+        f"Analyzed {len(similar_chunks)} code chunks. Found {len(violations)} violations. "
+        f"Reused {cache_stats['hits']} cached verdicts."
+    )
 
     return AnalyzeRuleResponse(
         rule_text=request.rule_text,
@@ -182,6 +189,7 @@ async def full_repo_scan(repo_id: UUID, request: FullScanRequest) -> ScanRespons
         scan_id=scan_id,
         repo_id=repo_id,
         rule_ids=request.rule_ids,
+        concurrency=request.concurrency,
     )
 
     logger.info(f"Created scan {scan_id} and enqueued job {job_id}")
@@ -14,6 +14,9 @@ from app.workers.job_queue import job_queue
 
 router = APIRouter(tags=["webhooks"])
 
+# GitHub includes at most this many commits in a push payload
+MAX_PUSH_PAYLOAD_COMMITS = 20
+
 
 @router.post("/webhook")
 async def github_webhook(request: Request):
@@ -152,29 +155,57 @@ async def handle_push_event(payload: dict) -> None:
         return
 
     commit_sha = payload.get("after")
-
-    # Detect changed files from commits
-    changed_files = set()
-    for commit in payload.get("commits", []):
-        changed_files.update(commit.get("added", []))
-        changed_files.update(commit.get("modified", []))
-        changed_files.update(commit.get("removed", []))
+    commits = payload.get("commits", [])
+
+    # Net changed/removed files across the pushed commits, in order
+    changed_files: set[str] = set()
+    removed_files: set[str] = set()
+    for commit in commits:
+        for path in commit.get("added", []) + commit.get("modified", []):
+            changed_files.add(path)
+            removed_files.discard(path)
+        for path in commit.get("removed", []):
+            removed_files.add(path)
+            changed_files.discard(path)
 
     # Get repo from database
     db = await get_db()
     async with db.acquire() as conn:
         repo = await RepositoryQueries.get_by_github_id(conn, repository["id"])
 
-    if repo:
-        # Enqueue selective re-indexing job for changed files
-        # TODO: Implement selective re-indexing for changed files if needed
+    if repo and repo.get("last_commit_sha"):
+        # The commit list is only trustworthy if it starts at the indexed commit,
+        # isn't a force push, and wasn't truncated by GitHub
+        complete_delta = (
+            payload.get("before") == repo["last_commit_sha"]
+            and not payload.get("forced")
+            and len(commits) < MAX_PUSH_PAYLOAD_COMMITS
+        )
+        job_queue.enqueue_reindex_job(
+            repo_id=repo["repo_id"],
+            installation_id=installation["id"],
+            full_name=repository["full_name"],
+            commit_sha=commit_sha,
+            changed_files=sorted(changed_files) if complete_delta else None,
+            removed_files=sorted(removed_files) if complete_delta else None,
+        )
+        if complete_delta:
+            logger.info(
+                f"Enqueued incremental re-indexing for {repository['full_name']}: "
+                f"{len(changed_files)} changed, {len(removed_files)} removed"
+            )
+        else:
+            logger.info(
+                f"Enqueued full-tree file_hash re-indexing for {repository['full_name']}"
+            )
+    elif repo:
+        # Known repo that was never indexed successfully
         job_queue.enqueue_indexing_job(
             repo_id=repo["repo_id"],
             installation_id=installation["id"],
             full_name=repository["full_name"],
             commit_sha=commit_sha,
         )
-        logger.info(f"Enqueued selective re-indexing for {repository['full_name']} after push: {changed_files}")
     else:
         # First-time indexing
         await _enqueue_repo_indexing(
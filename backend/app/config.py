@@ -77,6 +77,7 @@ class Settings(BaseSettings):
     embeddings_provider: Literal["azure", "openai"] = "azure"
     embedding_dimension: int = 1536
     embedding_batch_size: int = 100
+    embedding_batch_max_tokens: int = 100000  # per request, estimated
 
     # LLM provider
     llm_provider: Literal["azure", "openai"] = "azure"
@@ -105,6 +106,7 @@ class Settings(BaseSettings):
     local_storage_path: Path = Path("./storage")
     temp_clone_path: Path = Path("./storage/temp")
     max_file_size_mb: int = 10
+    repo_mirror_max_gb: float = 20.0  # disk budget for bare repo mirrors (LRU evicted)
 
     # Code parsing
     supported_languages: list[str] = Field(
@@ -130,14 +132,58 @@ class Settings(BaseSettings):
     # Rate limiting
     rate_limit_embeddings: int = 3500  # per minute
     rate_limit_llm: int = 500  # per minute
+    rate_limit_embedding_tokens: int = 350000  # tokens per minute
+    rate_limit_llm_tokens: int = 80000  # tokens per minute
+    rate_limit_headroom: float = 0.9  # fraction of quota the fleet may use
+    rate_limit_enabled: bool = True
+
+    # Indexing pipeline (lane concurrency is capped by the rate limits above)
+    indexing_embed_concurrency: int = 4  # embedding batches in flight
+    indexing_llm_concurrency: int = 16  # summary calls in flight
+    indexing_flush_size: int = 200  # chunks per code_map insert
+    bulk_load_flush_size: int = 5000  # rows per COPY + upsert transaction
+    indexing_queue_size: int = 1000  # chunks in flight before backpressure
+    indexing_chunk_workers: int = 0  # chunking processes (0 = CPU count)
+    indexing_chunk_batch_files: int = 64  # files per chunking task
 
     # Cache TTL (seconds)
-    cache_ttl_embeddings: int = 86400  # 24 hours
+    cache_ttl_embeddings: int = 604800  # 7 days
     cache_ttl_nl_summary: int = 86400  # 24 hours
+    cache_ttl_verdicts: int = 2592000  # 30 days in Redis; compliance_verdicts keeps them
+    embedding_cache_memory_entries: int = 4096  # in-process LRU tier (~6 KB per 1536-d vector)
 
     # Analysis
+    verdict_cache_enabled: bool = True  # reuse LLM verdicts for unchanged rule/code pairs
+    analysis_llm_concurrency: int = 8  # compliance analysis calls in flight per scan
+    compliance_batch_max_chunks: int = 8  # code chunks judged per multi-chunk call
+    compliance_batch_max_prompt_tokens: int = 6000  # prompt budget per multi-chunk call (tiktoken)
     top_k_similar_chunks: int = 10
-    similarity_threshold: float = 0.7
+    similarity_threshold: float = 0.7  # minimum cosine similarity
+
+    # Pre-filter between vector search and LLM investigation
+    prefilter_enabled: bool = True  # off = every hit above similarity_threshold is investigated
+    prefilter_max_per_rule: int = 3  # hits investigated per regulation clause
+    prefilter_min_score: float = 0.1  # lowest combined score investigated
+    prefilter_weight_similarity: float = 0.6  # calibrated cosine similarity
+    prefilter_weight_bm25: float = 0.25  # BM25 of rule keywords over chunk text and summary
+    prefilter_weight_keywords: float = 0.15  # rule keywords among the chunk's semantic_tags
+
+    # Vector search (per-query ANN recall/speed trade-off)
+    vector_ivfflat_probes: int = 10  # IVFFlat lists scanned per query
+    vector_hnsw_ef_search: int = 40  # HNSW candidate list size per query
+    hybrid_search_enabled: bool = True  # fuse full-text matches into searches given query text
+    hybrid_search_candidates: int = 50  # chunks taken from each ranking before fusion
+    hybrid_search_max_terms: int = 6  # most distinctive query terms searched as full text
+    hybrid_rrf_k: int = 60  # reciprocal rank fusion constant
+    vector_search_batch_size: int = 64  # query vectors per search_similar_many round trip
+    vector_memory_index_enabled: bool = False  # serve repo searches from in-process NumPy indexes
+    vector_memory_index_max_mb: int = 512  # memory budget across repos (LRU evicted)
+    vector_memory_index_check_seconds: float = 5.0  # how often a loaded index checks the repo's sync state
+    embedding_snapshots_enabled: bool = True  # write mmap-able .npy snapshots after indexing (with the memory index)
+    embedding_snapshot_dtype: Literal["float32", "float16"] = "float32"  # float16 halves disk, casts per search
+    vector_hnsw_m: int = 16  # HNSW graph degree
+    vector_hnsw_ef_construction: int = 64  # HNSW build-time candidate list size
+    vector_repo_index_min_chunks: int = 20000  # repos this large get a partial HNSW index
 
     # Monitoring
     sentry_dsn: Optional[str] = None
@@ -5,8 +5,9 @@ import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from asyncpg import Pool, create_pool
+from asyncpg import Connection, Pool, create_pool
 from loguru import logger
+from pgvector.asyncpg import register_vector
 
 from app.config import get_settings
 
@@ -37,6 +38,7 @@ class Database:
                     server_settings={
                         "application_name": settings.app_name,
                     },
+                    init=self._init_connection,
                 )
                 logger.info("Neon database connection pool created")
 
@@ -54,6 +56,21 @@ class Database:
                 logger.error(f"Failed to create Neon database pool: {e}")
                 raise
 
+    @staticmethod
+    async def _init_connection(conn: Connection) -> None:
+        """
+        Register the binary pgvector codec on a new pool connection.
+
+        `vector` parameters then take lists or NumPy arrays directly and
+        `vector` columns come back as float32 NumPy arrays, instead of
+        ~20KB text literals that both sides have to format and parse.
+        """
+        try:
+            await register_vector(conn)
+        except ValueError:
+            # Extension missing; reported once the pool is up
+            pass
+
     async def disconnect(self) -> None:
         """Close database connection pool."""
         async with self._lock:
@@ -1,12 +1,17 @@
 """
 Database model helpers and query builders.
 """
+import json
 from datetime import datetime
-from typing import Any, Optional, List
-from uuid import UUID
+from typing import Any, Optional, List, TypedDict
+from uuid import UUID, uuid4
 
 from asyncpg import Record
 
+from app.config import get_settings
+
+settings = get_settings()
+
 
 def record_to_dict(record: Optional[Record]) -> Optional[dict[str, Any]]:
     """Convert asyncpg Record to dictionary."""
@@ -20,6 +25,190 @@ def records_to_list(records: list[Record]) -> list[dict[str, Any]]:
     return [dict(record) for record in records]
 
 
+# ORDER BY operator for each pgvector opclass. A nearest-neighbour query can
+# only use an IVFFlat/HNSW index built with the matching opclass; any other
+# operator silently falls back to a sequential scan.
+DISTANCE_OPERATORS = {
+    "vector_cosine_ops": "<=>",
+    "vector_l2_ops": "<->",
+    "vector_ip_ops": "<#>",
+}
+
+# Opclass of each table's embedding index (see migrations)
+VECTOR_INDEX_OPCLASS = {
+    "code_map": "vector_cosine_ops",
+    "regulation_chunks": "vector_cosine_ops",
+    "policy_vectors": "vector_cosine_ops",
+}
+
+
+def distance_operator(table: str) -> str:
+    """Distance operator that matches the embedding index of a table."""
+    return DISTANCE_OPERATORS[VECTOR_INDEX_OPCLASS[table]]
+
+
+# Per-repository partial HNSW indexes on code_map (built by
+# app.workers.vector_indexes) are named with this prefix and the repo's UUID
+REPO_VECTOR_INDEX_PREFIX = "idx_code_map_embedding_r_"
+
+
+def repo_vector_index_name(repo_id: UUID) -> str:
+    """Name of a repository's partial HNSW index."""
+    return f"{REPO_VECTOR_INDEX_PREFIX}{repo_id.hex}"
+
+
+async def has_repo_vector_index(conn, repo_id: UUID) -> bool:
+    """True if the repository has a valid partial HNSW index."""
+    return bool(await conn.fetchval(
+        """
+        SELECT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = $1
+        """,
+        repo_vector_index_name(repo_id),
+    ))
+
+
+async def set_vector_search_params(
+    conn,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    repo_id: Optional[UUID] = None,
+) -> bool:
+    """
+    Set ANN search parameters for the current transaction only.
+
+    Also forces custom plans: a generic plan of a prepared statement never
+    matches the `repo_id = '<uuid>'` predicate of a per-repo partial index.
+
+    A repository without a valid partial index of its own is searched
+    exactly: the global index would walk `ef_search` neighbours from every
+    tenant and filter them by repo_id afterwards, which can leave a small
+    repository with fewer than top_k hits, or none.
+
+    Args:
+        probes: IVFFlat lists to scan (default `vector_ivfflat_probes`)
+        ef_search: HNSW candidate list size (default `vector_hnsw_ef_search`)
+        repo_id: Repository the search is scoped to, if any
+
+    Returns:
+        True if the search should be an exact scan of the repository's rows
+    """
+    record = await conn.fetchrow(
+        """
+        SELECT set_config('ivfflat.probes', $1, true),
+               set_config('hnsw.ef_search', $2, true),
+               set_config('plan_cache_mode', 'force_custom_plan', true),
+               $3::text IS NOT NULL AND NOT EXISTS (
+                   SELECT 1
+                   FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                   WHERE c.relname = $3::text AND i.indisvalid
+               ) AS exact
+        """,
+        str(probes or settings.vector_ivfflat_probes),
+        str(ef_search or settings.vector_hnsw_ef_search),
+        repo_vector_index_name(repo_id) if repo_id is not None else None,
+    )
+    return bool(record["exact"])
+
+
+async def copy_upsert(
+    conn,
+    table: str,
+    columns: tuple[str, ...],
+    rows: list[tuple],
+    conflict_columns: tuple[str, ...],
+    update_columns: tuple[str, ...],
+    fill_columns: tuple[str, ...] = (),
+    flush_size: Optional[int] = None,
+) -> int:
+    """
+    Bulk upsert rows through the table's unlogged `{table}_staging` table.
+
+    Each flush of `flush_size` rows is one transaction: the rows are
+    streamed in with binary COPY, merged into the table by a single
+    INSERT ... SELECT ... ON CONFLICT, and removed from staging again.
+    Staged rows are tagged with a batch id, so concurrent loaders share the
+    staging table. Rows repeating a conflict key within a flush keep the
+    last one, as the equivalent sequence of single-row upserts would.
+
+    Args:
+        table: Target table (its staging table is created by migration 013)
+        columns: Columns of each row, in order
+        rows: Row tuples; JSONB values as JSON strings
+        conflict_columns: Unique key to upsert on
+        update_columns: Columns overwritten when the row already exists
+        fill_columns: Columns overwritten only by non-NULL values
+        flush_size: Rows per transaction (default `bulk_load_flush_size`)
+
+    Returns:
+        Number of rows loaded
+    """
+    staging = f"{table}_staging"
+    column_list = ", ".join(columns)
+    conflict = ", ".join(conflict_columns)
+    updates = [f"{column} = EXCLUDED.{column}" for column in update_columns]
+    updates += [f"{column} = COALESCE(EXCLUDED.{column}, {table}.{column})" for column in fill_columns]
+    merge = f"""
+        INSERT INTO {table} ({column_list})
+        SELECT DISTINCT ON ({conflict}) {column_list}
+        FROM {staging}
+        WHERE batch_id = $1
+        ORDER BY {conflict}, seq DESC
+        ON CONFLICT ({conflict}) DO UPDATE SET
+            {", ".join(updates + ["updated_at = NOW()"])}
+    """
+    flush_size = flush_size or settings.bulk_load_flush_size
+
+    for start in range(0, len(rows), flush_size):
+        batch_id = uuid4()
+        async with conn.transaction():
+            await conn.copy_records_to_table(
+                staging,
+                records=[
+                    (batch_id, seq, *row)
+                    for seq, row in enumerate(rows[start:start + flush_size])
+                ],
+                columns=["batch_id", "seq", *columns],
+            )
+            await conn.execute(merge, batch_id)
+            await conn.execute(f"DELETE FROM {staging} WHERE batch_id = $1", batch_id)
+    return len(rows)
+
+
+def format_jsonb(obj: Any) -> Optional[str]:
+    """Convert Python dict/list to JSON string for JSONB."""
+    if obj is None:
+        return None
+    return json.dumps(obj)
+
+
+class SimilarChunk(TypedDict, total=False):
+    """
+    A code_map chunk returned by a similarity search.
+
+    The identifying columns and `distance` (cosine distance, similarity =
+    1 - distance) are always present; the rest only when requested.
+    """
+
+    chunk_id: UUID
+    repo_id: UUID
+    file_path: str
+    language: Optional[str]
+    start_line: int
+    end_line: int
+    ast_node_type: Optional[str]
+    chunk_hash: str
+    distance: float
+    chunk_text: str
+    nl_summary: Optional[str]
+    embedding: Any
+    # Hybrid searches only (see `CodeMapQueries.search_hybrid_many`)
+    rrf_score: float
+    vector_rank: Optional[int]
+    lexical_rank: Optional[int]
+
+
 class InstallationQueries:
     """SQL queries for installations table."""
 
@@ -138,72 +327,311 @@ class RepositoryQueries:
 
 
 class CodeMapQueries:
-    """SQL queries for code_map table."""
+    """
+    SQL queries for code_map table.
+
+    code_map holds one row per occurrence of a chunk in a repository
+    (unique per repo_id, file_path and chunk_hash). The chunk's text and
+    summary live once per chunk_hash in chunk_content (see
+    `ChunkContentQueries`); the embedding is stored there and copied onto
+    each occurrence, where the per-repository vector indexes can use it.
+
+    That copy is a deliberate trade-off: text and summaries are stored per
+    unique chunk, but vector storage (about 6KB per row at 1536 dimensions)
+    still grows with total occurrences. Moving the vector off code_map
+    would leave repository-scoped searches without a per-repository index.
+    """
+
+    # Columns every similarity search returns; text, summary and the
+    # embedding itself are opt-in because they dominate the payload
+    SIMILAR_COLUMNS = (
+        "chunk_id", "repo_id", "file_path", "language",
+        "start_line", "end_line", "ast_node_type", "chunk_hash",
+    )
+    # Columns read from chunk_content
+    CONTENT_COLUMNS = ("chunk_text", "nl_summary")
+
+    @staticmethod
+    def _content_join(alias: str, columns: tuple[str, ...]) -> tuple[str, str]:
+        """Select list and JOIN clause adding chunk_content columns to rows of `alias`."""
+        content = [column for column in columns if column in CodeMapQueries.CONTENT_COLUMNS]
+        if not content:
+            return "", ""
+        return (
+            "".join(f", cc.{column}" for column in content),
+            f"JOIN chunk_content cc ON cc.chunk_hash = {alias}.chunk_hash",
+        )
+
+    @staticmethod
+    def _nearest_order(column: str, query: str, exact: bool) -> str:
+        """
+        ORDER BY expression ranking `column` by distance to `query`.
+
+        The exact form is not an index expression: the planner reads the
+        repository's rows through idx_code_map_repo and sorts them instead
+        of walking an ANN index.
+        """
+        order = f"{column} {distance_operator('code_map')} {query}"
+        return f"({order}) + 0" if exact else order
+
+    @staticmethod
+    def similar_query(
+        repo_scoped: bool, columns: tuple[str, ...] = SIMILAR_COLUMNS, exact: bool = False
+    ) -> str:
+        """
+        Build a nearest-neighbour query over code_map.
+
+        Takes the query embedding as $1 and, if repo_scoped, the repo_id as
+        $2; the limit is the last parameter. Text columns are joined from
+        chunk_content after the top-k is found. `exact` ranks the rows by
+        exact distance instead of through an ANN index.
+        """
+        distance = distance_operator("code_map")
+        where = "repo_id = $2 AND embedding IS NOT NULL" if repo_scoped else "embedding IS NOT NULL"
+        own = [column for column in columns if column not in CodeMapQueries.CONTENT_COLUMNS]
+        query = f"""
+            SELECT {", ".join(own)},
+                (embedding {distance} $1::vector) AS distance
+            FROM code_map
+            WHERE {where}
+            ORDER BY {CodeMapQueries._nearest_order("embedding", "$1::vector", exact)}
+            LIMIT ${3 if repo_scoped else 2}
+        """
+        content, join = CodeMapQueries._content_join("m", columns)
+        if not join:
+            return query
+        return f"""
+            SELECT m.*{content}
+            FROM ({query}) m
+            {join}
+            ORDER BY m.distance
+        """
+
+    @staticmethod
+    def similar_many_query(
+        repo_scoped: bool, columns: tuple[str, ...] = SIMILAR_COLUMNS, exact: bool = False
+    ) -> str:
+        """
+        Build a nearest-neighbour query for many query embeddings at once.
+
+        Takes the query embeddings as a vector[] in $1 and, if repo_scoped,
+        the repo_id as $2; the per-query limit is the last parameter. Each
+        embedding gets its own index-served (or, with `exact`, exact) top-k
+        through a LATERAL join, tagged with its 1-based position as
+        `query_index`.
+        """
+        distance = distance_operator("code_map")
+        where = "c.repo_id = $2 AND c.embedding IS NOT NULL" if repo_scoped else "c.embedding IS NOT NULL"
+        own = [column for column in columns if column not in CodeMapQueries.CONTENT_COLUMNS]
+        content, join = CodeMapQueries._content_join("m", columns)
+        return f"""
+            SELECT q.query_index, m.*{content}
+            FROM unnest($1::vector[]) WITH ORDINALITY AS q(embedding, query_index)
+            CROSS JOIN LATERAL (
+                SELECT {", ".join("c." + column for column in own)},
+                    (c.embedding {distance} q.embedding) AS distance
+                FROM code_map c
+                WHERE {where}
+                ORDER BY {CodeMapQueries._nearest_order("c.embedding", "q.embedding", exact)}
+                LIMIT ${3 if repo_scoped else 2}
+            ) m
+            {join}
+            ORDER BY q.query_index, m.distance
+        """
+
+    @staticmethod
+    def _lexical_matches(where: str, limit: str) -> str:
+        """
+        Best full-text matches of `q.terms` among the code_map rows `where`
+        selects, as (chunk_id, score).
+
+        The terms come from `lexical_queries`, which keeps only distinctive
+        ones, so the GIN index on the shared chunk_content table returns
+        few rows to filter down to the repository.
+        """
+        return f"""
+            SELECT c.chunk_id, ts_rank_cd(cc.search_tsv, to_tsquery('simple', q.terms)) AS score
+            FROM code_map c
+            JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+            WHERE {where}
+                AND q.terms <> ''
+                AND cc.search_tsv @@ to_tsquery('simple', q.terms)
+            ORDER BY score DESC, c.chunk_id
+            LIMIT {limit}
+        """
+
+    @staticmethod
+    def lexical_many_query() -> str:
+        """
+        Build a full-text search of one repository for many queries at once.
+
+        Takes the to_tsquery texts as a text[] in $1, the repo_id in $2 and
+        the per-query limit in $3; returns the chunk_id of each match with
+        its 1-based `query_index` and `lexical_rank`.
+        """
+        return f"""
+            SELECT q.query_index, m.chunk_id,
+                ROW_NUMBER() OVER (PARTITION BY q.query_index ORDER BY m.score DESC, m.chunk_id) AS lexical_rank
+            FROM unnest($1::text[]) WITH ORDINALITY AS q(terms, query_index)
+            CROSS JOIN LATERAL ({CodeMapQueries._lexical_matches("c.repo_id = $2 AND c.embedding IS NOT NULL", "$3")}) m
+            ORDER BY q.query_index, lexical_rank
+        """
+
+    @staticmethod
+    def hybrid_many_query(
+        repo_scoped: bool, columns: tuple[str, ...] = SIMILAR_COLUMNS, exact: bool = False
+    ) -> str:
+        """
+        Build a hybrid (vector + full-text) search for many queries at once.
+
+        Takes the query embeddings as a vector[] in $1, their to_tsquery
+        texts as a text[] in $2, the candidates per ranking in $3, the
+        reciprocal rank fusion constant in $4, the per-query limit in $5
+        and, if repo_scoped, the repo_id in $6. For each query the
+        `$3` nearest chunks and the `$3` best full-text matches of
+        chunk_content.search_tsv are fused by reciprocal rank,
+        sum(1 / ($4 + rank)), and the best `$5` returned with their
+        `rrf_score`, `vector_rank` and `lexical_rank` (NULL when absent from
+        that ranking). `distance` is the exact cosine distance, also for
+        chunks only the full-text search found. `exact` ranks the vector side
+        by exact distance instead of through an ANN index.
+        """
+        distance = distance_operator("code_map")
+        where = "c.repo_id = $6 AND c.embedding IS NOT NULL" if repo_scoped else "c.embedding IS NOT NULL"
+        own = [column for column in columns if column not in CodeMapQueries.CONTENT_COLUMNS]
+        content, join = CodeMapQueries._content_join("m", columns)
+        return f"""
+            SELECT q.query_index, m.*{content}
+            FROM unnest($1::vector[], $2::text[]) WITH ORDINALITY AS q(embedding, terms, query_index)
+            CROSS JOIN LATERAL (
+                SELECT {", ".join("c." + column for column in own)},
+                    (c.embedding {distance} q.embedding) AS distance,
+                    f.rrf_score, f.vector_rank, f.lexical_rank
+                FROM (
+                    SELECT COALESCE(v.chunk_id, l.chunk_id) AS chunk_id,
+                        COALESCE(1.0 / ($4::float8 + v.rank), 0) + COALESCE(1.0 / ($4::float8 + l.rank), 0) AS rrf_score,
+                        v.rank AS vector_rank,
+                        l.rank AS lexical_rank
+                    FROM (
+                        SELECT chunk_id, ROW_NUMBER() OVER (ORDER BY distance, chunk_id) AS rank
+                        FROM (
+                            SELECT c.chunk_id, (c.embedding {distance} q.embedding) AS distance
+                            FROM code_map c
+                            WHERE {where}
+                            ORDER BY {CodeMapQueries._nearest_order("c.embedding", "q.embedding", exact)}
+                            LIMIT $3
+                        ) nearest
+                    ) v
+                    FULL JOIN (
+                        SELECT chunk_id, ROW_NUMBER() OVER (ORDER BY score DESC, chunk_id) AS rank
+                        FROM ({CodeMapQueries._lexical_matches(where, "$3")}) matched
+                    ) l ON l.chunk_id = v.chunk_id
+                    ORDER BY rrf_score DESC, chunk_id
+                    LIMIT $5
+                ) f
+                JOIN code_map c ON c.chunk_id = f.chunk_id
+            ) m
+            {join}
+            ORDER BY q.query_index, m.rrf_score DESC, m.chunk_id
+        """
+
+    # Columns written by the indexer, and those refreshed when the chunk is
+    # already stored at the same path
+    INSERT_COLUMNS = (
+        "repo_id", "file_path", "language", "start_line", "end_line",
+        "ast_node_type", "file_hash", "chunk_hash", "embedding", "metadata",
+        "call_links", "variables", "config_keys", "semantic_tags",
+        "previous_hash", "delta_type", "blob_sha",
+    )
+    UPSERT_COLUMNS = (
+        "start_line", "end_line", "file_hash", "blob_sha",
+        "call_links", "variables", "config_keys", "semantic_tags",
+        "previous_hash", "delta_type",
+    )
+    # Refreshed only by non-NULL values, as in chunk_content: a NULL here
+    # would hide the occurrence from every search
+    FILL_COLUMNS = ("embedding",)
+    CONFLICT_COLUMNS = ("repo_id", "file_path", "chunk_hash")
+
+    @staticmethod
+    def _row(chunk: dict[str, Any]) -> tuple:
+        """Values of a chunk in `INSERT_COLUMNS` order."""
+        return (
+            chunk["repo_id"],
+            chunk["file_path"],
+            chunk["language"],
+            chunk["start_line"],
+            chunk["end_line"],
+            chunk.get("ast_node_type"),
+            chunk["file_hash"],
+            chunk["chunk_hash"],
+            chunk.get("embedding"),
+            format_jsonb(chunk.get("metadata", {})),
+            format_jsonb(chunk.get("call_links", [])),
+            format_jsonb(chunk.get("variables", {})),
+            format_jsonb(chunk.get("config_keys", {})),
+            format_jsonb(chunk.get("semantic_tags", [])),
+            chunk.get("previous_hash"),
+            chunk.get("delta_type"),
+            chunk.get("blob_sha"),
+        )
 
     @staticmethod
     async def insert_batch(conn, chunks: list[dict[str, Any]]) -> int:
-        """Batch insert code map chunks."""
-        import json
-        
-        query = """
-            INSERT INTO code_map (
-                repo_id, file_path, language, start_line, end_line,
-                chunk_text, ast_node_type, file_hash, chunk_hash,
-                embedding, nl_summary, metadata, call_links, variables, config_keys, semantic_tags, previous_hash, delta_type
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10::vector, $11, $12::jsonb, $13::jsonb, $14::jsonb, $15::jsonb, $16::jsonb, $17, $18)
-            ON CONFLICT (chunk_hash) DO UPDATE SET
-                embedding = EXCLUDED.embedding,
-                nl_summary = EXCLUDED.nl_summary,
-                call_links = EXCLUDED.call_links,
-                variables = EXCLUDED.variables,
-                config_keys = EXCLUDED.config_keys,
-                semantic_tags = EXCLUDED.semantic_tags,
-                previous_hash = EXCLUDED.previous_hash,
-                delta_type = EXCLUDED.delta_type,
+        """
+        Batch insert code map chunks with one upsert statement per row.
+
+        Prefer `bulk_upsert` for anything but small batches.
+        """
+        columns = CodeMapQueries.INSERT_COLUMNS
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        updates = ", ".join(
+            [f"{column} = EXCLUDED.{column}" for column in CodeMapQueries.UPSERT_COLUMNS]
+            + [f"{column} = COALESCE(EXCLUDED.{column}, code_map.{column})" for column in CodeMapQueries.FILL_COLUMNS]
+        )
+        query = f"""
+            INSERT INTO code_map ({", ".join(columns)}) VALUES ({placeholders})
+            ON CONFLICT ({", ".join(CodeMapQueries.CONFLICT_COLUMNS)}) DO UPDATE SET
+                {updates},
                 updated_at = NOW()
         """
-        
-        def format_embedding(emb):
-            """Convert Python list to PostgreSQL vector format."""
-            if emb is None:
-                return None
-            if isinstance(emb, list):
-                return f"[{','.join(map(str, emb))}]"
-            return emb
-        
-        def format_jsonb(obj):
-            """Convert Python dict/list to JSON string for JSONB."""
-            if obj is None:
-                return None
-            return json.dumps(obj)
-        
         async with conn.transaction():
-            await conn.executemany(
-                query,
-                [
-                    (
-                        chunk["repo_id"],
-                        chunk["file_path"],
-                        chunk["language"],
-                        chunk["start_line"],
-                        chunk["end_line"],
-                        chunk["chunk_text"],
-                        chunk.get("ast_node_type"),
-                        chunk["file_hash"],
-                        chunk["chunk_hash"],
-                        format_embedding(chunk.get("embedding")),
-                        chunk.get("nl_summary"),
-                        format_jsonb(chunk.get("metadata", {})),
-                        format_jsonb(chunk.get("call_links", [])),
-                        format_jsonb(chunk.get("variables", {})),
-                        format_jsonb(chunk.get("config_keys", {})),
-                        format_jsonb(chunk.get("semantic_tags", [])),
-                        chunk.get("previous_hash"),
-                        chunk.get("delta_type"),
-                    )
-                    for chunk in chunks
-                ],
-            )
+            await ChunkContentQueries.insert_batch(conn, chunks)
+            await conn.executemany(query, [CodeMapQueries._row(chunk) for chunk in chunks])
+        return len(chunks)
+
+    @staticmethod
+    async def bulk_upsert(
+        conn, chunks: list[dict[str, Any]], flush_size: Optional[int] = None
+    ) -> int:
+        """
+        Upsert code map chunks and their content with COPY through staging tables.
+
+        Each flush stores the chunks' content and then their occurrences in
+        one transaction.
+
+        Args:
+            chunks: Chunks as passed to `insert_batch`
+            flush_size: Chunks per transaction (default `bulk_load_flush_size`)
+
+        Returns:
+            Number of chunks loaded
+        """
+        flush_size = flush_size or settings.bulk_load_flush_size
+        for start in range(0, len(chunks), flush_size):
+            batch = chunks[start:start + flush_size]
+            async with conn.transaction():
+                await ChunkContentQueries.bulk_upsert(conn, batch, flush_size)
+                await copy_upsert(
+                    conn,
+                    "code_map",
+                    CodeMapQueries.INSERT_COLUMNS,
+                    [CodeMapQueries._row(chunk) for chunk in batch],
+                    conflict_columns=CodeMapQueries.CONFLICT_COLUMNS,
+                    update_columns=CodeMapQueries.UPSERT_COLUMNS,
+                    fill_columns=CodeMapQueries.FILL_COLUMNS,
+                    flush_size=flush_size,
+                )
         return len(chunks)
 
     @staticmethod
@@ -212,40 +640,447 @@ class CodeMapQueries:
     ) -> list[dict[str, Any]]:
         """Get code map chunks for a repository."""
         query = """
-            SELECT * FROM code_map
-            WHERE repo_id = $1
-            ORDER BY file_path, start_line
+            SELECT c.*, cc.chunk_text, cc.nl_summary
+            FROM code_map c
+            JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+            WHERE c.repo_id = $1
+            ORDER BY c.file_path, c.start_line
             LIMIT $2 OFFSET $3
         """
         records = await conn.fetch(query, repo_id, limit, offset)
         return records_to_list(records)
 
     @staticmethod
-    async def search_similar(
-        conn, embedding: list[float], repo_id: Optional[UUID], top_k: int = 10
-    ) -> list[dict[str, Any]]:
-        """Find similar code map chunks using vector similarity."""
-        if repo_id:
+    async def get_semantic_tags(conn, chunk_ids: list[UUID]) -> dict[UUID, list[str]]:
+        """Get the semantic_tags of chunks by chunk_id."""
+        if not chunk_ids:
+            return {}
+        query = """
+            SELECT chunk_id, semantic_tags FROM code_map
+            WHERE chunk_id = ANY($1::uuid[])
+        """
+        records = await conn.fetch(query, list(set(chunk_ids)))
+        tags = {}
+        for record in records:
+            value = record["semantic_tags"]
+            if isinstance(value, str):
+                value = json.loads(value)
+            tags[record["chunk_id"]] = value or []
+        return tags
+
+    @staticmethod
+    async def get_file_versions(
+        conn, repo_id: UUID, file_paths: Optional[list[str]] = None
+    ) -> dict[str, dict[str, Optional[str]]]:
+        """
+        Get the indexed file_hash and git blob_sha per file path.
+
+        Returns all indexed files of the repository if file_paths is None.
+        """
+        if file_paths is None:
             query = """
-                SELECT *,
-                    (embedding <-> $1::vector) AS distance
+                SELECT DISTINCT ON (file_path) file_path, file_hash, blob_sha
                 FROM code_map
-                WHERE repo_id = $2
-                ORDER BY embedding <-> $1::vector
-                LIMIT $3
+                WHERE repo_id = $1
             """
-            records = await conn.fetch(query, embedding, repo_id, top_k)
+            records = await conn.fetch(query, repo_id)
         else:
+            if not file_paths:
+                return {}
             query = """
-                SELECT *,
-                    (embedding <-> $1::vector) AS distance
+                SELECT DISTINCT ON (file_path) file_path, file_hash, blob_sha
                 FROM code_map
-                ORDER BY embedding <-> $1::vector
-                LIMIT $2
+                WHERE repo_id = $1 AND file_path = ANY($2::text[])
             """
-            records = await conn.fetch(query, embedding, top_k)
+            records = await conn.fetch(query, repo_id, file_paths)
+        return {
+            record["file_path"]: {"file_hash": record["file_hash"], "blob_sha": record["blob_sha"]}
+            for record in records
+        }
+
+    @staticmethod
+    async def set_blob_shas(conn, repo_id: UUID, blob_shas: dict[str, str]) -> None:
+        """Record the git blob SHA of files whose content is already indexed."""
+        if not blob_shas:
+            return
+        query = "UPDATE code_map SET blob_sha = $3 WHERE repo_id = $1 AND file_path = $2"
+        await conn.executemany(
+            query, [(repo_id, path, blob_sha) for path, blob_sha in blob_shas.items()]
+        )
+
+    @staticmethod
+    async def get_previous_chunks(
+        conn, repo_id: UUID, file_paths: list[str], chunk_hashes: list[str]
+    ) -> list[dict[str, Any]]:
+        """
+        Get indexed chunks that a re-index can diff against.
+
+        Returns the chunks currently stored for `file_paths` plus any chunk of
+        the repository whose hash is in `chunk_hashes` (code moved between
+        files), with their embedding and nl_summary.
+        """
+        if not file_paths and not chunk_hashes:
+            return []
+        query = """
+            SELECT c.file_path, c.chunk_hash, c.metadata->>'name' AS name,
+                c.embedding, cc.nl_summary
+            FROM code_map c
+            JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+            WHERE c.repo_id = $1
+                AND (c.file_path = ANY($2::text[]) OR c.chunk_hash = ANY($3::text[]))
+        """
+        records = await conn.fetch(query, repo_id, file_paths, chunk_hashes)
         return records_to_list(records)
 
+    @staticmethod
+    async def delete_files(conn, repo_id: UUID, file_paths: list[str]) -> int:
+        """Delete all chunks of the given files (and content no longer used)."""
+        if not file_paths:
+            return 0
+        query = """
+            DELETE FROM code_map WHERE repo_id = $1 AND file_path = ANY($2::text[])
+            RETURNING chunk_hash
+        """
+        records = await conn.fetch(query, repo_id, file_paths)
+        await ChunkContentQueries.prune(conn, [record["chunk_hash"] for record in records])
+        return len(records)
+
+    @staticmethod
+    async def delete_stale_chunks(
+        conn, repo_id: UUID, file_path: str, keep_hashes: list[str]
+    ) -> int:
+        """Delete chunks of a file whose chunk_hash is no longer present (and unused content)."""
+        query = """
+            DELETE FROM code_map
+            WHERE repo_id = $1 AND file_path = $2 AND chunk_hash <> ALL($3::text[])
+            RETURNING chunk_hash
+        """
+        records = await conn.fetch(query, repo_id, file_path, keep_hashes)
+        await ChunkContentQueries.prune(conn, [record["chunk_hash"] for record in records])
+        return len(records)
+
+    @staticmethod
+    async def count_by_repo(conn, repo_id: UUID) -> tuple[int, int]:
+        """Count indexed files and chunks for a repository."""
+        query = """
+            SELECT COUNT(DISTINCT file_path) AS file_count, COUNT(*) AS chunk_count
+            FROM code_map
+            WHERE repo_id = $1
+        """
+        record = await conn.fetchrow(query, repo_id)
+        return record["file_count"], record["chunk_count"]
+
+    @staticmethod
+    async def search_similar(
+        conn,
+        embedding: list[float],
+        repo_id: Optional[UUID],
+        top_k: int = 10,
+        *,
+        include_text: bool = False,
+        include_summary: bool = False,
+        include_embedding: bool = False,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> list[SimilarChunk]:
+        """
+        Find the code map chunks nearest to an embedding.
+
+        Orders by cosine distance, the opclass of the code_map HNSW indexes,
+        so the search is served by the repository's partial index (or the
+        global one). Only the columns of `SimilarChunk` that are asked for
+        are fetched.
+
+        Args:
+            conn: Database connection
+            embedding: Query embedding
+            repo_id: Repository to search, or None for all repositories
+            top_k: Number of chunks to return
+            include_text: Also return chunk_text
+            include_summary: Also return nl_summary
+            include_embedding: Also return the stored embedding
+            probes: IVFFlat lists to scan for this query
+            ef_search: HNSW candidate list size for this query
+        """
+        columns = CodeMapQueries.SIMILAR_COLUMNS
+        if include_text:
+            columns += ("chunk_text",)
+        if include_summary:
+            columns += ("nl_summary",)
+        if include_embedding:
+            columns += ("embedding",)
+        args = (embedding, repo_id, top_k) if repo_id is not None else (embedding, top_k)
+
+        async with conn.transaction():
+            exact = await set_vector_search_params(conn, probes, ef_search, repo_id)
+            query = CodeMapQueries.similar_query(repo_id is not None, columns, exact)
+            records = await conn.fetch(query, *args)
+        return records_to_list(records)
+
+    @staticmethod
+    async def search_similar_many(
+        conn,
+        embeddings: list[Any],
+        repo_id: Optional[UUID],
+        top_k: int = 10,
+        *,
+        include_text: bool = False,
+        include_summary: bool = False,
+        include_embedding: bool = False,
+        batch_size: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> list[list[SimilarChunk]]:
+        """
+        Find the nearest code map chunks for many query embeddings.
+
+        Same results as calling `search_similar` once per embedding, but
+        `batch_size` embeddings share one round trip.
+
+        Args:
+            conn: Database connection
+            embeddings: Query embeddings (lists or NumPy arrays)
+            repo_id: Repository to search, or None for all repositories
+            top_k: Number of chunks to return per embedding
+            include_text: Also return chunk_text
+            include_summary: Also return nl_summary
+            include_embedding: Also return the stored embedding
+            batch_size: Embeddings per query (default `vector_search_batch_size`)
+            probes: IVFFlat lists to scan for this query
+            ef_search: HNSW candidate list size for this query
+
+        Returns:
+            One list of chunks per embedding, in input order
+        """
+        columns = CodeMapQueries.SIMILAR_COLUMNS
+        if include_text:
+            columns += ("chunk_text",)
+        if include_summary:
+            columns += ("nl_summary",)
+        if include_embedding:
+            columns += ("embedding",)
+        batch_size = batch_size or settings.vector_search_batch_size
+
+        results: list[list[SimilarChunk]] = [[] for _ in embeddings]
+        async with conn.transaction():
+            exact = await set_vector_search_params(conn, probes, ef_search, repo_id)
+            query = CodeMapQueries.similar_many_query(repo_id is not None, columns, exact)
+            for start in range(0, len(embeddings), batch_size):
+                batch = embeddings[start : start + batch_size]
+                args = (batch, repo_id, top_k) if repo_id is not None else (batch, top_k)
+                for record in await conn.fetch(query, *args):
+                    match = dict(record)
+                    results[start + match.pop("query_index") - 1].append(match)
+        return results
+
+    @staticmethod
+    async def search_hybrid_many(
+        conn,
+        embeddings: list[Any],
+        tsqueries: list[str],
+        repo_id: Optional[UUID],
+        top_k: int = 10,
+        *,
+        include_text: bool = False,
+        include_summary: bool = False,
+        include_embedding: bool = False,
+        candidates: Optional[int] = None,
+        rrf_k: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> list[list[SimilarChunk]]:
+        """
+        Find code map chunks for many queries by vector and full-text search.
+
+        Both rankings are computed and fused by reciprocal rank in the
+        database, `batch_size` queries per round trip (see
+        `hybrid_many_query`). An empty tsquery makes that query a plain
+        vector search.
+
+        Args:
+            conn: Database connection
+            embeddings: Query embeddings (lists or NumPy arrays)
+            tsqueries: to_tsquery('simple') text of each query
+            repo_id: Repository to search, or None for all repositories
+            top_k: Number of chunks to return per query
+            include_text: Also return chunk_text
+            include_summary: Also return nl_summary
+            include_embedding: Also return the stored embedding
+            candidates: Chunks taken from each ranking (default `hybrid_search_candidates`)
+            rrf_k: Reciprocal rank fusion constant (default `hybrid_rrf_k`)
+            batch_size: Queries per round trip (default `vector_search_batch_size`)
+            probes: IVFFlat lists to scan for this query
+            ef_search: HNSW candidate list size for this query
+
+        Returns:
+            One list of chunks per query, best fused score first
+        """
+        columns = CodeMapQueries.SIMILAR_COLUMNS
+        if include_text:
+            columns += ("chunk_text",)
+        if include_summary:
+            columns += ("nl_summary",)
+        if include_embedding:
+            columns += ("embedding",)
+        candidates = max(candidates or settings.hybrid_search_candidates, top_k)
+        rrf_k = settings.hybrid_rrf_k if rrf_k is None else rrf_k
+        batch_size = batch_size or settings.vector_search_batch_size
+
+        results: list[list[SimilarChunk]] = [[] for _ in embeddings]
+        async with conn.transaction():
+            exact = await set_vector_search_params(conn, probes, ef_search, repo_id)
+            query = CodeMapQueries.hybrid_many_query(repo_id is not None, columns, exact)
+            for start in range(0, len(embeddings), batch_size):
+                args = [
+                    embeddings[start : start + batch_size],
+                    tsqueries[start : start + batch_size],
+                    candidates,
+                    rrf_k,
+                    top_k,
+                ]
+                if repo_id is not None:
+                    args.append(repo_id)
+                for record in await conn.fetch(query, *args):
+                    match = dict(record)
+                    results[start + match.pop("query_index") - 1].append(match)
+        return results
+
+    @staticmethod
+    async def search_lexical_many(
+        conn, tsqueries: list[str], repo_id: UUID, limit: int
+    ) -> list[list[UUID]]:
+        """
+        Full-text matches of one repository's chunks for many queries.
+
+        The lexical half of a hybrid search whose vector half runs
+        elsewhere (the in-process index), in one round trip.
+
+        Args:
+            conn: Database connection
+            tsqueries: to_tsquery('simple') text of each query; empty ones match nothing
+            repo_id: Repository to search
+            limit: Matches returned per query
+
+        Returns:
+            One list of chunk_ids per query, best match first
+        """
+        results: list[list[UUID]] = [[] for _ in tsqueries]
+        if not any(tsqueries):
+            return results
+        for record in await conn.fetch(CodeMapQueries.lexical_many_query(), tsqueries, repo_id, limit):
+            results[record["query_index"] - 1].append(record["chunk_id"])
+        return results
+
+
+class ChunkContentQueries:
+    """
+    SQL queries for chunk_content table.
+
+    Content-addressed chunk storage: the text, embedding and NL summary of
+    each distinct chunk_hash, shared by every code_map occurrence of it, so
+    identical code in several repositories (or files) is embedded and
+    summarised once.
+    """
+
+    INSERT_COLUMNS = ("chunk_hash", "chunk_text", "embedding", "nl_summary")
+
+    @staticmethod
+    def _row(chunk: dict[str, Any]) -> tuple:
+        """Values of a chunk in `INSERT_COLUMNS` order."""
+        return (
+            chunk["chunk_hash"],
+            chunk["chunk_text"],
+            chunk.get("embedding"),
+            chunk.get("nl_summary"),
+        )
+
+    @staticmethod
+    async def insert_batch(conn, chunks: list[dict[str, Any]]) -> int:
+        """Batch upsert chunk content with one statement per row."""
+        query = """
+            INSERT INTO chunk_content (chunk_hash, chunk_text, embedding, nl_summary)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (chunk_hash) DO UPDATE SET
+                embedding = COALESCE(EXCLUDED.embedding, chunk_content.embedding),
+                nl_summary = COALESCE(EXCLUDED.nl_summary, chunk_content.nl_summary),
+                updated_at = NOW()
+        """
+        await conn.executemany(query, [ChunkContentQueries._row(chunk) for chunk in chunks])
+        return len(chunks)
+
+    @staticmethod
+    async def bulk_upsert(
+        conn, chunks: list[dict[str, Any]], flush_size: Optional[int] = None
+    ) -> int:
+        """
+        Upsert chunk content with COPY through chunk_content_staging.
+
+        A stored embedding or summary is never replaced by a missing one,
+        so a chunk whose enrichment failed in one repository doesn't erase
+        what another repository stored.
+
+        Returns:
+            Number of chunks loaded
+        """
+        return await copy_upsert(
+            conn,
+            "chunk_content",
+            ChunkContentQueries.INSERT_COLUMNS,
+            [ChunkContentQueries._row(chunk) for chunk in chunks],
+            conflict_columns=("chunk_hash",),
+            update_columns=(),
+            fill_columns=("embedding", "nl_summary"),
+            flush_size=flush_size,
+        )
+
+    @staticmethod
+    async def get_many(conn, chunk_hashes: list[str]) -> dict[str, dict[str, Any]]:
+        """Get the stored embedding and nl_summary of chunks, by chunk_hash."""
+        if not chunk_hashes:
+            return {}
+        query = """
+            SELECT chunk_hash, embedding, nl_summary
+            FROM chunk_content
+            WHERE chunk_hash = ANY($1::text[])
+        """
+        records = await conn.fetch(query, chunk_hashes)
+        return {record["chunk_hash"]: dict(record) for record in records}
+
+    @staticmethod
+    async def prune(conn, chunk_hashes: Optional[list[str]] = None) -> int:
+        """
+        Delete content no code_map row refers to any more.
+
+        Args:
+            chunk_hashes: Only consider these hashes (e.g. of deleted rows);
+                None scans the whole table
+
+        Returns:
+            Number of content rows deleted
+        """
+        # Rows a concurrent indexer is storing an occurrence of are locked
+        # by its foreign key check; skip them rather than fail either side
+        unused = """
+            DELETE FROM chunk_content WHERE chunk_hash IN (
+                SELECT chunk_hash FROM chunk_content
+                WHERE {scope} NOT EXISTS (
+                    SELECT 1 FROM code_map c WHERE c.chunk_hash = chunk_content.chunk_hash
+                )
+                FOR UPDATE SKIP LOCKED
+            )
+        """
+        if chunk_hashes is None:
+            result = await conn.execute(unused.format(scope=""))
+        elif chunk_hashes:
+            result = await conn.execute(
+                unused.format(scope="chunk_hash = ANY($1::text[]) AND"), list(set(chunk_hashes))
+            )
+        else:
+            return 0
+        return int(result.split()[-1])
+
+
 class FlowGraphQueries:
     """SQL queries for flow_graph table."""
 
@@ -304,38 +1139,49 @@ class ComplianceEvidenceQueries:
 class RegulationChunkQueries:
     """SQL queries for regulation_chunks table."""
 
+    INSERT_COLUMNS = (
+        "rule_id", "rule_section", "source_document", "chunk_text",
+        "chunk_index", "chunk_hash", "embedding", "nl_summary", "metadata",
+    )
+
     @staticmethod
-    async def insert_batch(conn, chunks: list[dict[str, Any]]) -> int:
-        """Batch insert regulation chunks."""
-        query = """
-            INSERT INTO regulation_chunks (
-                rule_id, rule_section, source_document, chunk_text,
-                chunk_index, chunk_hash, embedding, nl_summary, metadata
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-            ON CONFLICT (chunk_hash) DO UPDATE SET
-                embedding = EXCLUDED.embedding,
-                nl_summary = EXCLUDED.nl_summary,
-                updated_at = NOW()
+    def _row(chunk: dict[str, Any]) -> tuple:
+        """Values of a chunk in `INSERT_COLUMNS` order."""
+        return (
+            chunk["rule_id"],
+            chunk.get("rule_section"),
+            chunk.get("source_document"),
+            chunk["chunk_text"],
+            chunk["chunk_index"],
+            chunk["chunk_hash"],
+            chunk.get("embedding"),
+            chunk.get("nl_summary"),
+            format_jsonb(chunk.get("metadata", {})),
+        )
+
+    @staticmethod
+    async def insert_batch(
+        conn, chunks: list[dict[str, Any]], flush_size: Optional[int] = None
+    ) -> int:
         """
-        async with conn.transaction():
-            await conn.executemany(
-                query,
-                [
-                    (
-                        chunk["rule_id"],
-                        chunk.get("rule_section"),
-                        chunk.get("source_document"),
-                        chunk["chunk_text"],
-                        chunk["chunk_index"],
-                        chunk["chunk_hash"],
-                        chunk.get("embedding"),
-                        chunk.get("nl_summary"),
-                        chunk.get("metadata", {}),
-                    )
-                    for chunk in chunks
-                ],
-            )
-        return len(chunks)
+        Upsert regulation chunks with COPY through regulation_chunks_staging.
+
+        Args:
+            chunks: Chunks with rule_id, chunk_text, chunk_index and chunk_hash
+            flush_size: Chunks per transaction (default `bulk_load_flush_size`)
+
+        Returns:
+            Number of chunks loaded
+        """
+        return await copy_upsert(
+            conn,
+            "regulation_chunks",
+            RegulationChunkQueries.INSERT_COLUMNS,
+            [RegulationChunkQueries._row(chunk) for chunk in chunks],
+            conflict_columns=("chunk_hash",),
+            update_columns=("embedding", "nl_summary"),
+            flush_size=flush_size,
+        )
 
     @staticmethod
     async def get_by_rule_id(conn, rule_id: str) -> list[dict[str, Any]]:
@@ -356,6 +1202,43 @@ class RegulationChunkQueries:
         return [record["rule_id"] for record in records]
 
 
+class VerdictCacheQueries:
+    """SQL queries for compliance_verdicts table (the verdict cache's durable tier)."""
+
+    @staticmethod
+    async def get(
+        conn, model: str, prompt_version: str, rule_hash: str, code_hash: str
+    ) -> Optional[dict[str, Any]]:
+        """Get a cached verdict."""
+        query = """
+            SELECT verdict FROM compliance_verdicts
+            WHERE model = $1 AND prompt_version = $2 AND rule_hash = $3 AND code_hash = $4
+        """
+        verdict = await conn.fetchval(query, model, prompt_version, rule_hash, code_hash)
+        return json.loads(verdict) if verdict is not None else None
+
+    @staticmethod
+    async def upsert(
+        conn,
+        model: str,
+        prompt_version: str,
+        rule_hash: str,
+        code_hash: str,
+        verdict: dict[str, Any],
+    ) -> None:
+        """Store a verdict, replacing any earlier one for the same key."""
+        query = """
+            INSERT INTO compliance_verdicts (model, prompt_version, rule_hash, code_hash, verdict)
+            VALUES ($1, $2, $3, $4, $5::jsonb)
+            ON CONFLICT (model, prompt_version, rule_hash, code_hash) DO UPDATE SET
+                verdict = EXCLUDED.verdict,
+                created_at = NOW()
+        """
+        await conn.execute(
+            query, model, prompt_version, rule_hash, code_hash, format_jsonb(verdict)
+        )
+
+
 class ScanQueries:
     """SQL queries for scans table."""
 
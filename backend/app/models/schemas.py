@@ -167,6 +167,9 @@ class FullScanRequest(BaseModel):
     initiator: Optional[str] = None
     commit_sha: Optional[str] = None
     rule_ids: Optional[list[str]] = None
+    concurrency: Optional[int] = Field(
+        default=None, ge=1, le=64, description="LLM calls in flight (default from settings)"
+    )
 
 class FlowGraphNode(BaseModel):
     node_id: str
@@ -37,22 +37,19 @@ Response MUST be valid JSON with this structure:
   "severity": "critical" | "high" | "medium" | "low",
   "severity_score": 0-10,
   "explanation": "Clear explanation of compliance status",
-  "evidence": "Specific code lines or patterns that support verdict",
+  "evidence": "Code quoted from the snippet that supports the verdict",
   "remediation": "Concrete steps to achieve compliance (if non-compliant)"
 }
 
 Rules:
 - ONLY analyze the provided code - do not assume external implementations
 - Be strict: if rule is not clearly satisfied, mark as non_compliant
-- Provide line-specific evidence when possible
+- Quote the code itself as evidence; do not cite file paths or line numbers
 - Remediation should be actionable (specific code changes)""",
     "user": """Compliance Rule:
 {rule_text}
 
-Code to analyze:
-File: {file_path}
-Lines: {start_line}-{end_line}
-Language: {language}
+Code to analyze ({language}):
 
 {code_text}
 
@@ -60,6 +57,49 @@ Language: {language}
 Analyze compliance and respond in JSON format.""",
 }
 
+# Multi-chunk compliance analysis prompt (one rule, several code chunks)
+COMPLIANCE_BATCH_ANALYSIS_PROMPT = {
+    "system": """You are a fintech compliance expert analyzing code against regulatory requirements.
+
+You will receive one compliance rule and several numbered code chunks. Judge each
+chunk on its own against the rule:
+1. Determine if the chunk complies with the rule
+2. Provide clear evidence from the chunk
+3. Suggest remediation if non-compliant
+4. Assign severity score (0-10, where 10 is critical violation)
+
+Response MUST be a valid JSON array with exactly one object per chunk:
+[
+  {
+    "chunk_index": <number of the chunk>,
+    "verdict": "compliant" | "non_compliant" | "partial" | "unknown",
+    "severity": "critical" | "high" | "medium" | "low",
+    "severity_score": 0-10,
+    "explanation": "Clear explanation of compliance status",
+    "evidence": "Code quoted from the chunk that supports the verdict",
+    "remediation": "Concrete steps to achieve compliance (if non-compliant)"
+  }
+]
+
+Rules:
+- ONLY analyze the provided code - do not assume external implementations
+- Never let one chunk's contents influence another chunk's verdict
+- Be strict: if rule is not clearly satisfied, mark as non_compliant
+- Quote the code itself as evidence; do not cite file paths or line numbers
+- Remediation should be actionable (specific code changes)""",
+    "user": """Compliance Rule:
+{rule_text}
+
+Code chunks to analyze:
+{chunks}
+
+Analyze each chunk and respond with the JSON array.""",
+    "chunk": """### Chunk {chunk_index} ({language})
+
+{code_text}
+""",
+}
+
 # Scan summary prompt
 SCAN_SUMMARY_PROMPT = {
     "system": """You are a compliance reporting expert. Generate executive summaries of code compliance scans.
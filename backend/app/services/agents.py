@@ -1,6 +1,7 @@
 """
 Service for logging agent 'thoughts' and actions to Redis for frontend streaming.
 """
+import asyncio
 import json
 import time
 from datetime import datetime
@@ -23,6 +24,7 @@ class AgentLogger:
         self.scan_id = str(scan_id)
         self.ttl = ttl_seconds
         self.redis_key = f"scan:{self.scan_id}:logs"
+        self._pending: set[asyncio.Task] = set()
 
     async def log(self, agent: AgentType, message: str):
         """
@@ -56,6 +58,21 @@ class AgentLogger:
         except Exception as e:
             logger.error(f"Failed to stream agent log: {e}")
 
+    def log_nowait(self, agent: AgentType, message: str) -> None:
+        """
+        Push a log entry in the background, for hot paths that shouldn't
+        wait on Redis. Entries may land slightly out of order; `flush`
+        waits for them.
+        """
+        task = asyncio.create_task(self.log(agent, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self) -> None:
+        """Wait for background log entries to be written."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending))
+
     async def get_logs(self, start_index: int = 0) -> list[dict]:
         """
         Retrieve logs from Redis.
@@ -0,0 +1,266 @@
+"""
+Cheap pre-filter between vector search and LLM investigation.
+
+Every (regulation clause, code chunk) hit of the vector search is scored
+from three signals before anything is sent to the LLM:
+
+- calibrated similarity: cosine similarity rescaled so that
+  `similarity_threshold` maps to 0 and an identical vector to 1; hits
+  below the threshold are dropped outright, unless a hybrid search found
+  them by full-text match (they carry a `lexical_rank`) and their code
+  contains one of the clause's identifiers (PAN, MAX_TXN_LIMIT)
+- BM25 of the clause's keywords (from `normalize_rule_text`) over the
+  chunk's text and summary, with term statistics from all of the scan's
+  candidate chunks, normalized by the clause's best match
+- keyword hits: the share of the chunk's semantic_tags the clause names
+
+The signals are combined with the `prefilter_weight_*` settings and only
+the best `prefilter_max_per_rule` chunks per clause scoring at least
+`prefilter_min_score` are investigated. `select_candidates` also counts
+the candidates left after each stage, to tune the funnel with.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Optional
+
+from app.config import get_settings
+from app.models.rule_model import normalize_rule_text
+
+settings = get_settings()
+
+# Words regulation text is full of that say nothing about the code
+STOPWORDS = frozenset(
+    """
+    a an and any are as at be been by can each for from has have if in into is it its
+    may must no not of on or other shall should such than that the their there these
+    this those to under upon was were which while who will with within without
+    """.split()
+)
+
+# Words common to regulation text and code alike; too unspecific to search for
+GENERIC_TERMS = frozenset(
+    """
+    above account after all allow also applicable apply before below case check code
+    customer data document ensure entity every following function include information list
+    made make manner new number only per process provide record regulated related
+    require required requirement service set system time type use used user using
+    valid value
+    """.split()
+)
+
+# Code identifiers as written in prose: snake_case, camelCase, acronyms, sha256
+_IDENTIFIER = re.compile(
+    r"\b(?:[A-Za-z][A-Za-z0-9]*_[A-Za-z0-9_]+|[A-Z]?[a-z]+[A-Z][A-Za-z0-9]*|[A-Z]{2,6}[0-9]*s?|[A-Za-z]+[0-9]+[A-Za-z0-9]*)\b"
+)
+
+# Identifier pieces: "storeCardPAN_v2" -> store, card, pan, v, 2
+_WORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def _normalize(term: str) -> str:
+    """Lowercase and singularize so "payments" matches "payment", "entities" "entity"."""
+    term = term.lower()
+    if len(term) > 4 and term.endswith("ies"):
+        term = term[:-3] + "y"
+    elif len(term) > 4 and term.endswith("s") and not term.endswith("ss"):
+        term = term[:-1]
+    return term
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text and code identifiers into normalized terms, without stopwords."""
+    terms = (_normalize(word) for word in _WORD.findall(text or ""))
+    return [term for term in terms if len(term) > 1 and term not in STOPWORDS]
+
+
+def identifiers(text: str) -> list[str]:
+    """Distinct code identifiers and acronyms a text names, lowercased."""
+    found = []
+    for word in _IDENTIFIER.findall(text or ""):
+        word = word[:-1] if word[-2:-1].isupper() and word.endswith("s") else word  # PANs
+        word = word.lower()
+        if word not in STOPWORDS and word not in GENERIC_TERMS:
+            found.append(word)
+    return list(dict.fromkeys(found))
+
+
+def mentions_identifier(names: list[str], code_text: str) -> bool:
+    """Whether code contains one of the identifiers, whole or as an identifier piece."""
+    if not names:
+        return False
+    words = {word.lower() for word in re.findall(r"\w+", code_text or "")}
+    return not words.isdisjoint(names) or not set(tokenize(code_text)).isdisjoint(names)
+
+
+def rule_keywords(rule_text: str) -> list[str]:
+    """Distinct search terms of a rule, in order of appearance."""
+    keywords = normalize_rule_text(rule_text).keywords
+    return list(dict.fromkeys(term for word in keywords for term in tokenize(word)))
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus of tokenized documents."""
+
+    def __init__(self, documents: list[list[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.avg_length = (sum(self.lengths) / len(documents)) if documents else 0.0
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query: list[str], index: int) -> float:
+        """BM25 score of document `index` for the query terms."""
+        counts = self.term_counts[index]
+        if not counts:
+            return 0.0
+        length_norm = 1 - self.b + self.b * self.lengths[index] / self.avg_length
+        score = 0.0
+        for term in set(query):
+            tf = counts.get(term)
+            if tf:
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return score
+
+
+def lexical_queries(texts: list[str], max_terms: Optional[int] = None) -> list[str]:
+    """
+    to_tsquery('simple') text for each query text, matching any of its most
+    distinctive terms; empty when it has none (a plain vector search).
+
+    Identifiers are searched as written; other words only if they are not
+    stopwords or generic, and as prefixes only when at least six letters
+    long ("payment:*"), so a query never matches most of a repository.
+    Terms are ranked identifiers first, then by IDF across `texts` (words
+    every clause of a regulation shares say little about any one of them),
+    then by length, and only the best `max_terms` are kept.
+
+    Args:
+        texts: Query texts, e.g. the clauses searched in one batch
+        max_terms: Terms per query (default `hybrid_search_max_terms`)
+    """
+    max_terms = max_terms or settings.hybrid_search_max_terms
+    candidates = []
+    for text in texts:
+        names = identifiers(text)
+        # Identifiers' pieces ("max" of MAX_TXN_LIMIT) would only broaden the match
+        words = [term for term in tokenize(_IDENTIFIER.sub(" ", text or "")) if term not in GENERIC_TERMS]
+        candidates.append((names, list(dict.fromkeys(words))))
+    idf = BM25([names + words for names, words in candidates]).idf
+
+    queries = []
+    for names, words in candidates:
+        ranked = sorted(
+            [(True, term) for term in names] + [(False, term) for term in words],
+            key=lambda item: (not item[0], -idf[item[1]], -len(item[1])),
+        )
+        queries.append(
+            " | ".join(
+                term if is_name or len(term) < 6 else f"{term}:*"
+                for is_name, term in ranked[:max_terms]
+            )
+        )
+    return queries
+
+
+def calibrated_similarity(distance: float, threshold: Optional[float] = None) -> float:
+    """Cosine similarity of a hit rescaled to [0, 1] above the similarity threshold."""
+    threshold = settings.similarity_threshold if threshold is None else threshold
+    similarity = 1.0 - distance
+    if threshold >= 1.0:
+        return 1.0 if similarity >= 1.0 else 0.0
+    return min(1.0, max(0.0, (similarity - threshold) / (1.0 - threshold)))
+
+
+def select_candidates(
+    clauses: list[tuple[dict[str, Any], list[dict[str, Any]]]],
+    semantic_tags: Optional[dict[Any, list[str]]] = None,
+    max_per_rule: Optional[int] = None,
+    min_score: Optional[float] = None,
+) -> tuple[list[list[dict[str, Any]]], dict[str, int]]:
+    """
+    Pick the hits worth an LLM call for each regulation clause.
+
+    Args:
+        clauses: (regulation chunk, vector search hits) pairs; hits need
+            distance and chunk_text, and may carry nl_summary
+        semantic_tags: code_map semantic_tags by chunk_id
+        max_per_rule: Hits kept per clause (default `prefilter_max_per_rule`)
+        min_score: Lowest combined score kept (default `prefilter_min_score`)
+
+    Returns:
+        The kept hits of each clause, best first, each with its
+        `prefilter_score`; and the candidate count after each stage
+        (retrieved, similar, lexical, selected)
+    """
+    semantic_tags = semantic_tags or {}
+    max_per_rule = max_per_rule or settings.prefilter_max_per_rule
+    min_score = settings.prefilter_min_score if min_score is None else min_score
+    funnel = {"retrieved": 0, "similar": 0, "lexical": 0, "selected": 0}
+
+    # Stage 1: similarity floor; full-text matches of a hybrid search only
+    # pass below it on an exact identifier, so they add no LLM calls otherwise
+    similar: list[list[tuple[dict[str, Any], float]]] = []
+    for reg_chunk, hits in clauses:
+        funnel["retrieved"] += len(hits)
+        names = identifiers(reg_chunk["chunk_text"])
+        kept = []
+        for hit in hits:
+            if 1.0 - hit.get("distance", 1.0) >= settings.similarity_threshold or (
+                hit.get("lexical_rank") is not None
+                and mentions_identifier(names, hit.get("chunk_text"))
+            ):
+                kept.append((hit, calibrated_similarity(hit.get("distance", 1.0))))
+        funnel["similar"] += len(kept)
+        similar.append(kept)
+
+    if not settings.prefilter_enabled:
+        selected = [[hit for hit, _ in kept] for kept in similar]
+        funnel["selected"] = funnel["similar"]
+        return selected, funnel
+
+    # One BM25 corpus per scan: every distinct surviving chunk
+    positions: dict[str, int] = {}
+    documents: list[list[str]] = []
+    for kept in similar:
+        for hit, _ in kept:
+            key = hit.get("chunk_hash") or hit["chunk_text"]
+            if key not in positions:
+                positions[key] = len(documents)
+                documents.append(tokenize(f"{hit['chunk_text']}\n{hit.get('nl_summary') or ''}"))
+    bm25 = BM25(documents)
+
+    # Stages 2 and 3: lexical evidence, then combined score and cut-off
+    selected = []
+    for (reg_chunk, _), kept in zip(clauses, similar):
+        keywords = rule_keywords(reg_chunk["chunk_text"])
+        keyword_set = set(keywords)
+        lexical = [bm25.score(keywords, positions[hit.get("chunk_hash") or hit["chunk_text"]]) for hit, _ in kept]
+        best = max(lexical, default=0.0) or 1.0
+
+        scored = []
+        for (hit, similarity), bm25_score in zip(kept, lexical):
+            tags = {_normalize(tag) for tag in semantic_tags.get(hit.get("chunk_id"), [])}
+            tag_hits = len(tags & keyword_set) / len(tags) if tags else 0.0
+            if bm25_score > 0 or tag_hits > 0:
+                funnel["lexical"] += 1
+            score = (
+                settings.prefilter_weight_similarity * similarity
+                + settings.prefilter_weight_bm25 * bm25_score / best
+                + settings.prefilter_weight_keywords * tag_hits
+            )
+            if score >= min_score:
+                scored.append((score, hit))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        picks = [{**hit, "prefilter_score": round(score, 4)} for score, hit in scored[:max_per_rule]]
+        funnel["selected"] += len(picks)
+        selected.append(picks)
+
+    return selected, funnel
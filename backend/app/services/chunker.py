@@ -58,7 +58,7 @@ class CodeChunker:
 
         # Try AST-based chunking
         try:
-            ast_chunks = code_parser.extract_functions_fallback(content, language)
+            ast_chunks = code_parser.extract_functions_fallback(content, language, file_path)
 
             if ast_chunks:
                 for ast_chunk in ast_chunks:
@@ -123,6 +123,48 @@ class CodeChunker:
         logger.debug(f"Chunked {file_path}: {len(chunks)} chunks (fallback)")
         return chunks
 
+    @staticmethod
+    def diff_chunks(
+        chunks: list[dict[str, Any]], previous: list[dict[str, Any]]
+    ) -> dict[str, int]:
+        """
+        Classify re-chunked code against previously indexed chunks.
+
+        Follows the rules of `CodeParser.parse_file_changes`: a chunk whose
+        hash is already indexed is unchanged and inherits the stored
+        embedding and nl_summary; a chunk whose name matches an indexed chunk
+        of the same file is modified (previous_hash points at the old chunk);
+        anything else is added. Sets `delta_type` and `previous_hash` in place.
+
+        Args:
+            chunks: New chunks from `chunk_file`
+            previous: Indexed chunks (file_path, chunk_hash, name, embedding, nl_summary)
+
+        Returns:
+            Count of chunks per delta_type
+        """
+        by_hash = {row["chunk_hash"]: row for row in previous}
+        by_name = {
+            (row["file_path"], row["name"]): row for row in previous if row.get("name")
+        }
+        counts = {"added": 0, "modified": 0, "unchanged": 0}
+
+        for chunk in chunks:
+            old = by_hash.get(chunk["chunk_hash"])
+            if old:
+                chunk["delta_type"] = "unchanged"
+                chunk["previous_hash"] = None
+                chunk["embedding"] = old.get("embedding")
+                chunk["nl_summary"] = old.get("nl_summary")
+            else:
+                name = chunk.get("metadata", {}).get("name")
+                old = by_name.get((chunk["file_path"], name)) if name else None
+                chunk["delta_type"] = "modified" if old else "added"
+                chunk["previous_hash"] = old["chunk_hash"] if old else None
+            counts[chunk["delta_type"]] += 1
+
+        return counts
+
     def _split_large_chunk(
         self, text: str, start_line: int, language: str, repo_id: UUID, file_path: str, file_hash: str
     ) -> list[dict[str, Any]]:
@@ -131,9 +131,12 @@ def detect_missing_error_handling(code: str) -> bool:
 """
 Code parsing service using Tree-sitter for AST analysis.
 """
+import importlib
 import re
+import threading
+from bisect import bisect_left
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 from loguru import logger
 from tree_sitter import Language, Parser
@@ -144,34 +147,121 @@ from app.core.exceptions import CodeParsingError
 settings = get_settings()
 
 
+# Grammar name -> (package, function returning the compiled language)
+TREE_SITTER_GRAMMARS = {
+    "python": ("tree_sitter_python", "language"),
+    "javascript": ("tree_sitter_javascript", "language"),
+    "typescript": ("tree_sitter_typescript", "language_typescript"),
+    "tsx": ("tree_sitter_typescript", "language_tsx"),
+    "java": ("tree_sitter_java", "language"),
+}
+
+# Definitions (@function/@class/@method), callee names (@call) and literal
+# assignments (@constant). Python chunks come from the `ast` extractor.
+_JS_QUERY = """
+(function_declaration) @function
+(generator_function_declaration) @function
+(class_declaration) @class
+(method_definition) @method
+(variable_declarator value: [(arrow_function) (function_expression)]) @function
+(call_expression function: (identifier) @call)
+(call_expression function: (member_expression property: (property_identifier) @call))
+(variable_declarator value: [(number) (string) (true) (false)]) @constant
+"""
+
+TREE_SITTER_QUERIES = {
+    "javascript": _JS_QUERY,
+    "typescript": _JS_QUERY + "(abstract_class_declaration) @class\n",
+    "tsx": _JS_QUERY + "(abstract_class_declaration) @class\n",
+    "java": """
+(class_declaration) @class
+(interface_declaration) @class
+(enum_declaration) @class
+(method_declaration) @method
+(constructor_declaration) @method
+(method_invocation name: (identifier) @call)
+(variable_declarator value: [
+  (decimal_integer_literal) (decimal_floating_point_literal) (string_literal) (true) (false)
+]) @constant
+""",
+}
+
+
+def _literal_value(node) -> Any:
+    """Python value of a literal node."""
+    text = node.text.decode("utf-8", "replace")
+    if node.type in ("true", "false"):
+        return node.type == "true"
+    if node.type in ("string", "string_literal"):
+        return text[1:-1]
+    number = text.replace("_", "").rstrip("lLfFdD")
+    for cast in (int, float):
+        try:
+            return cast(number)
+        except ValueError:
+            pass
+    return text
+
+
 class CodeParser:
     """
     Tree-sitter based code parser supporting multiple languages.
-    
-    NOTE: Tree-sitter language bindings need to be built separately.
-    For hackathon demo, this provides the interface with fallback.
+
+    Grammars and queries are compiled once per process; parsers are reused
+    per thread. Python chunks come from the standard-library `ast` module.
     """
 
     def __init__(self):
-        self.parsers: dict[str, Parser] = {}
+        self.languages: dict[str, Language] = {}
+        self.queries: dict[str, Any] = {}
+        self._local = threading.local()
         self.languages_available = ["python", "javascript", "typescript", "java"]
 
-        # Initialize parsers (stub for demo - in production, load compiled languages)
         self._init_parsers()
 
     def _init_parsers(self) -> None:
-        """Initialize Tree-sitter parsers (stubbed for demo)."""
-        # In production, you would build and load language libraries:
-        # Language.build_library(
-        #     'build/languages.so',
-        #     ['vendor/tree-sitter-python', 'vendor/tree-sitter-javascript', ...]
-        # )
-        # Then load: Language('build/languages.so', 'python')
-
-        logger.warning(
-            "Tree-sitter parsers not fully initialized - using fallback text parsing"
-        )
-        # For demo, we'll use regex-based fallback
+        """Load the tree-sitter grammars and compile their queries."""
+        for grammar, (package, loader) in TREE_SITTER_GRAMMARS.items():
+            try:
+                module = importlib.import_module(package)
+                pointer = getattr(module, loader)()
+                try:
+                    language = Language(pointer)
+                except TypeError:
+                    # py-tree-sitter < 0.22 also takes the language name
+                    language = Language(pointer, grammar)
+                self.languages[grammar] = language
+                if grammar in TREE_SITTER_QUERIES:
+                    self.queries[grammar] = language.query(TREE_SITTER_QUERIES[grammar])
+            except Exception as e:
+                logger.warning(f"Tree-sitter grammar {grammar} unavailable: {e}")
+
+        logger.debug(f"Loaded tree-sitter grammars: {sorted(self.languages)}")
+
+    def get_parser(self, grammar: str) -> Optional[Parser]:
+        """Get this thread's parser for a grammar (created on first use)."""
+        language = self.languages.get(grammar)
+        if language is None:
+            return None
+
+        parsers = self._local.__dict__.setdefault("parsers", {})
+        parser = parsers.get(grammar)
+        if parser is None:
+            parser = Parser()
+            if hasattr(parser, "set_language"):
+                parser.set_language(language)
+            else:
+                # py-tree-sitter >= 0.22 sets the language as a property
+                parser.language = language
+            parsers[grammar] = parser
+        return parser
+
+    @staticmethod
+    def _grammar_for(language: str, file_path: Optional[str] = None) -> str:
+        """Grammar to parse a file with (TSX files need the tsx grammar)."""
+        if language == "typescript" and file_path and file_path.lower().endswith(".tsx"):
+            return "tsx"
+        return language
 
     def get_language_from_extension(self, file_path: str) -> Optional[str]:
         """
@@ -200,35 +290,35 @@ class CodeParser:
         }
         return mapping.get(ext)
 
-    def parse_file(self, file_path: str, content: str) -> Optional[dict]:
+    def parse_file(self, file_path: str, content: str):
         """
-        Parse file and return AST (stubbed for demo).
+        Parse file into a tree-sitter syntax tree.
 
         Args:
             file_path: File path
             content: File content
 
         Returns:
-            AST representation or None if parsing fails
+            Root node of the syntax tree, or None if the language is unsupported
         """
         language = self.get_language_from_extension(file_path)
         if not language:
             return None
 
-        # In production, use Tree-sitter parser
-        # parser = self.parsers.get(language)
-        # tree = parser.parse(bytes(content, "utf8"))
-        # return tree.root_node
-
-        # For demo, return placeholder
-        return {"language": language, "type": "module", "content": content}
-
+        parser = self.get_parser(self._grammar_for(language, file_path))
+        if parser is None:
+            return None
+        return parser.parse(content.encode("utf-8")).root_node
 
     def extract_functions_fallback(
-        self, content: str, language: str
+        self, content: str, language: str, file_path: Optional[str] = None
     ) -> list[dict[str, any]]:
         """
-        Fallback function extraction using regex (for demo without full Tree-sitter).
+        Extract function, class and method chunks.
+
+        Python uses the `ast` extractor, languages with a loaded tree-sitter
+        grammar use tree-sitter, and JS/TS fall back to regex scanning when
+        their grammar is missing.
         Populates code_map fields: call_links, semantic_tags, variables, config_keys.
         """
         chunks = []
@@ -239,45 +329,11 @@ class CodeParser:
             if tag in content.lower():
                 semantic_tags.append(tag)
 
+        grammar = self._grammar_for(language, file_path)
         if language == "python":
-            pattern = r"^(class|def|async def)\s+(\w+)"
-            lines = content.split("\n")
-            for i, line in enumerate(lines):
-                match = re.match(pattern, line.strip())
-                if match:
-                    node_type = match.group(1)
-                    name = match.group(2)
-                    start_line = i + 1
-                    end_line = start_line
-                    base_indent = len(line) - len(line.lstrip())
-                    for j in range(i + 1, len(lines)):
-                        if lines[j].strip() and not lines[j].strip().startswith("#"):
-                            current_indent = len(lines[j]) - len(lines[j].lstrip())
-                            if current_indent <= base_indent:
-                                end_line = j
-                                break
-                    else:
-                        end_line = len(lines)
-                    chunk_text = "\n".join(lines[i:end_line])
-                    # Extract call_links
-                    call_links = list(set([call for call_list in detect_function_calls(chunk_text).values() for call in call_list]))
-                    # Extract variables
-                    variables = extract_constants_from_code(chunk_text)
-                    # Extract config_keys
-                    config_keys = find_hardcoded_thresholds(variables)
-                    chunks.append(
-                        {
-                            "type": "function" if "def" in node_type else "class",
-                            "name": name,
-                            "start_line": start_line,
-                            "end_line": end_line,
-                            "text": chunk_text,
-                            "call_links": call_links,
-                            "variables": variables,
-                            "config_keys": config_keys,
-                            "semantic_tags": semantic_tags,
-                        }
-                    )
+            chunks = self._extract_python_chunks(content, semantic_tags)
+        elif grammar in self.queries:
+            chunks = self._extract_tree_sitter_chunks(content, grammar, semantic_tags)
         elif language in ["javascript", "typescript"]:
             pattern = r"^(function|class|const|let|var)\s+(\w+)"
             lines = content.split("\n")
@@ -316,6 +372,161 @@ class CodeParser:
                     )
         return chunks
     
+    def _extract_tree_sitter_chunks(
+        self, content: str, grammar: str, semantic_tags: list[str]
+    ) -> list[dict[str, any]]:
+        """
+        Extract chunks with one tree-sitter parse and one query run.
+
+        The query returns definitions, callee names and literal assignments
+        in a single pass; calls and constants are attributed to every
+        definition whose byte range contains them.
+        """
+        tree = self.get_parser(grammar).parse(content.encode("utf-8"))
+        captures = self.queries[grammar].captures(tree.root_node)
+        if isinstance(captures, dict):
+            # py-tree-sitter >= 0.23 groups captures by name
+            captures = [(node, name) for name, nodes in captures.items() for node in nodes]
+
+        definitions = {}
+        calls: list[tuple[int, str]] = []
+        constants: list[tuple[int, str, Any]] = []
+        for node, kind in captures:
+            if kind == "call":
+                calls.append((node.start_byte, node.text.decode("utf-8", "replace")))
+            elif kind == "constant":
+                name_node = node.child_by_field_name("name")
+                value_node = node.child_by_field_name("value")
+                if name_node is not None and value_node is not None:
+                    constants.append(
+                        (node.start_byte, name_node.text.decode("utf-8", "replace"),
+                         _literal_value(value_node))
+                    )
+            else:
+                definitions[(node.start_byte, node.end_byte, node.type)] = (node, kind)
+
+        calls.sort()
+        constants.sort(key=lambda c: c[0])
+        call_offsets = [offset for offset, _ in calls]
+        constant_offsets = [offset for offset, _, _ in constants]
+        lines = content.split("\n")
+
+        chunks = []
+        for key in sorted(definitions):
+            node, kind = definitions[key]
+            name_node = node.child_by_field_name("name")
+            if name_node is None:
+                continue
+            # `const f = () => ...` spans the whole declaration statement
+            span = node.parent if node.type == "variable_declarator" else node
+
+            lo = bisect_left(call_offsets, span.start_byte)
+            hi = bisect_left(call_offsets, span.end_byte)
+            call_links = sorted({callee for _, callee in calls[lo:hi]})
+
+            lo = bisect_left(constant_offsets, span.start_byte)
+            hi = bisect_left(constant_offsets, span.end_byte)
+            variables = {name: value for _, name, value in constants[lo:hi]}
+
+            start_line = span.start_point[0] + 1
+            end_line = span.end_point[0] + 1
+            chunks.append(
+                {
+                    "type": kind,
+                    "name": name_node.text.decode("utf-8", "replace"),
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "text": "\n".join(lines[start_line - 1 : end_line]),
+                    "call_links": call_links,
+                    "variables": variables,
+                    "config_keys": find_hardcoded_thresholds(variables),
+                    "semantic_tags": semantic_tags,
+                }
+            )
+        return chunks
+
+    def _extract_python_chunks(
+        self, content: str, semantic_tags: list[str]
+    ) -> list[dict[str, any]]:
+        """
+        Extract function and class chunks from Python source in one pass.
+
+        The file is parsed once; spans come from the AST (`lineno`/`end_lineno`)
+        and call_links, variables and config_keys are collected during a single
+        traversal of the same tree. A chunk keeps the trailing blank and comment
+        lines up to the next statement, as the indentation scanner did, so
+        chunk hashes stay stable. Unparsable files yield no chunks and fall
+        back to line-based chunking.
+        """
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return []
+
+        lines = content.split("\n")
+        frames: list[dict[str, any]] = []
+
+        def block_end(node: ast.AST) -> int:
+            """Last line of a block, extended over trailing blank/comment lines."""
+            end = node.end_lineno
+            while end < len(lines):
+                stripped = lines[end].strip()
+                if stripped and not stripped.startswith("#"):
+                    break
+                end += 1
+            return end
+
+        # Iterative pre-order walk (source order); each node carries the
+        # stack of enclosing function/class frames
+        pending: list[tuple[ast.AST, list[dict[str, any]]]] = [(tree, [])]
+        while pending:
+            node, stack = pending.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                frame = {
+                    "node": node,
+                    "is_function": not isinstance(node, ast.ClassDef),
+                    "calls": set(),
+                    "variables": {},
+                }
+                frames.append(frame)
+                stack = stack + [frame]
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                # Calls count for a chunk only when made inside one of its functions
+                innermost = max(
+                    (i for i, f in enumerate(stack) if f["is_function"]), default=-1
+                )
+                for frame in stack[: innermost + 1]:
+                    frame["calls"].add(node.func.id)
+            elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        for frame in stack:
+                            frame["variables"][target.id] = node.value.value
+
+            children = list(ast.iter_child_nodes(node))
+            pending.extend((child, stack) for child in reversed(children))
+
+        chunks = []
+        for frame in frames:
+            node = frame["node"]
+            start_line = node.lineno
+            end_line = block_end(node)
+            variables = frame["variables"]
+            chunks.append(
+                {
+                    "type": "function" if frame["is_function"] else "class",
+                    "name": node.name,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "text": "\n".join(lines[start_line - 1 : end_line]),
+                    "call_links": sorted(frame["calls"]),
+                    "variables": variables,
+                    "config_keys": find_hardcoded_thresholds(variables),
+                    "semantic_tags": semantic_tags,
+                }
+            )
+        return chunks
+
     def parse_file_changes(
         self,
         file_path: str,
@@ -0,0 +1,156 @@
+"""
+Two-tier embedding cache.
+
+- An in-process LRU of up to `embedding_cache_memory_entries` vectors.
+- Redis, holding each vector as packed little-endian float32 bytes (6 KB
+  for 1536 dimensions, about a third of the JSON text) for
+  `cache_ttl_embeddings` seconds.
+
+Entries are keyed by `emb:{model}:{dimension}:{text_hash}`, so switching
+the embedding model or dimension never returns vectors of the old one.
+Batch lookups answer what they can from the LRU and fetch the rest with
+one MGET; batch writes go out in one pipeline.
+
+Redis failures are logged and treated as misses: the cache only saves
+provider calls, it is never required for correctness.
+"""
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+import redis.asyncio as aioredis
+from loguru import logger
+
+from app.config import get_settings
+
+settings = get_settings()
+
+_DTYPE = np.dtype("<f4")
+
+
+def pack_embedding(embedding: Any) -> bytes:
+    """Encode an embedding as little-endian float32 bytes."""
+    return np.asarray(embedding, dtype=_DTYPE).tobytes()
+
+
+def unpack_embedding(data: bytes) -> np.ndarray:
+    """Decode bytes written by `pack_embedding` (read-only float32 array)."""
+    return np.frombuffer(data, dtype=_DTYPE)
+
+
+class EmbeddingCache:
+    """In-process LRU in front of Redis, keyed by embedding model and text hash."""
+
+    def __init__(
+        self,
+        model: str,
+        dimension: int,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        redis_url: Optional[str] = None,
+    ):
+        """
+        Args:
+            model: Embedding model name, part of every key
+            dimension: Embedding dimension, part of every key
+            max_entries: Vectors kept in process (default `embedding_cache_memory_entries`)
+            ttl: Redis expiry in seconds (default `cache_ttl_embeddings`)
+            redis_url: Redis to use (default `redis_url`)
+        """
+        self.model = model
+        self.dimension = dimension
+        self.max_entries = settings.embedding_cache_memory_entries if max_entries is None else max_entries
+        self.ttl = ttl or settings.cache_ttl_embeddings
+        self.redis_url = redis_url or settings.redis_url
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Separate from JobQueue's client, which decodes responses as text
+        self._redis: Optional[aioredis.Redis] = None
+        self.stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def key(self, text_hash: str) -> str:
+        """Redis key of a text's embedding."""
+        return f"emb:{self.model}:{self.dimension}:{text_hash}"
+
+    def _client(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.Redis.from_url(self.redis_url, decode_responses=False)
+        return self._redis
+
+    def _remember(self, text_hash: str, embedding: np.ndarray) -> None:
+        """Add an entry to the LRU tier, evicting the oldest beyond capacity."""
+        if self.max_entries <= 0:
+            return
+        self._memory[text_hash] = embedding
+        self._memory.move_to_end(text_hash)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _decode(self, data: Optional[bytes]) -> Optional[np.ndarray]:
+        """Decode a Redis value; anything that isn't a packed vector is a miss."""
+        if data is None or len(data) != self.dimension * _DTYPE.itemsize:
+            return None
+        return unpack_embedding(data)
+
+    async def get_many(self, text_hashes: list[str]) -> list[Optional[np.ndarray]]:
+        """
+        Look up embeddings for many texts.
+
+        Returns:
+            One read-only float32 vector (or None on a miss) per hash, in order
+        """
+        results: list[Optional[np.ndarray]] = [None] * len(text_hashes)
+        remote: dict[str, list[int]] = {}
+        for i, text_hash in enumerate(text_hashes):
+            embedding = self._memory.get(text_hash)
+            if embedding is not None:
+                self._memory.move_to_end(text_hash)
+                results[i] = embedding
+                self.stats["memory_hits"] += 1
+            else:
+                remote.setdefault(text_hash, []).append(i)
+
+        if remote:
+            try:
+                values = await self._client().mget([self.key(h) for h in remote])
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                values = [None] * len(remote)
+            for (text_hash, positions), data in zip(remote.items(), values):
+                embedding = self._decode(data)
+                if embedding is None:
+                    self.stats["misses"] += len(positions)
+                    continue
+                self._remember(text_hash, embedding)
+                self.stats["redis_hits"] += len(positions)
+                for i in positions:
+                    results[i] = embedding
+        return results
+
+    async def get(self, text_hash: str) -> Optional[np.ndarray]:
+        """Look up the embedding of one text."""
+        return (await self.get_many([text_hash]))[0]
+
+    async def set_many(self, embeddings: dict[str, Any]) -> None:
+        """Store embeddings by text hash in both tiers."""
+        if not embeddings:
+            return
+        packed = {}
+        for text_hash, embedding in embeddings.items():
+            data = pack_embedding(embedding)
+            self._remember(text_hash, unpack_embedding(data))
+            packed[text_hash] = data
+        try:
+            async with self._client().pipeline(transaction=False) as pipe:
+                for text_hash, data in packed.items():
+                    pipe.set(self.key(text_hash), data, ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache {len(packed)} embeddings: {e}")
+
+    async def set(self, text_hash: str, embedding: Any) -> None:
+        """Store the embedding of one text."""
+        await self.set_many({text_hash: embedding})
+
+    def clear_memory(self) -> None:
+        """Empty the in-process tier."""
+        self._memory.clear()
@@ -0,0 +1,204 @@
+"""
+Memory-mapped embedding snapshots per repository commit.
+
+After indexing, a repository's embeddings are written once to
+`local_storage_path/snapshots/{repo_id}/{commit_sha}/` as plain `.npy`
+files: the unit-normalised embedding matrix plus array-backed metadata
+(chunk ids, hashes, file paths, languages, node types and line ranges).
+Readers open them with `np.load(mmap_mode='r')`, so every worker process
+on a host shares one page-cached copy with no deserialisation; metadata
+rows are only materialised for the hits a search returns.
+
+Snapshots are only written while the in-process memory index, their
+only reader, is enabled (see `snapshots_enabled`).
+
+Snapshots are published atomically (written to a temporary directory,
+then renamed) and older commits of the repository are deleted once a new
+one is in place.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+import numpy as np
+from loguru import logger
+
+from app.config import get_settings
+from app.models.database import CodeMapQueries
+
+settings = get_settings()
+
+SNAPSHOT_ROOT = settings.local_storage_path / "snapshots"
+_MANIFEST = "snapshot.json"
+
+# Text columns stored as (distinct values, per-row index) pairs
+_CATEGORICAL = ("file_path", "language", "ast_node_type")
+
+
+def to_float32(embedding: Any) -> np.ndarray:
+    """Convert an embedding (list or array) to a float32 vector."""
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def snapshots_enabled() -> bool:
+    """Whether indexing should write snapshots: only the memory index reads them."""
+    return settings.embedding_snapshots_enabled and settings.vector_memory_index_enabled
+
+
+def snapshot_path(repo_id: UUID, commit_sha: str) -> Path:
+    """Directory of a repository snapshot."""
+    return SNAPSHOT_ROOT / str(repo_id) / commit_sha
+
+
+def _categorical(values: list[Optional[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """Encode strings as a table of distinct values plus an index per row (None -> -1)."""
+    table = sorted({v for v in values if v is not None})
+    position = {v: i for i, v in enumerate(table)}
+    codes = np.array([position[v] if v is not None else -1 for v in values], dtype=np.int32)
+    return np.array(table, dtype=str), codes
+
+
+class SnapshotRows:
+    """Read-only sequence of `SimilarChunk` rows backed by snapshot arrays."""
+
+    def __init__(self, repo_id: UUID, arrays: dict[str, np.ndarray]):
+        self.repo_id = repo_id
+        self._arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self._arrays["start_line"])
+
+    def __getitem__(self, i: int) -> dict[str, Any]:
+        a = self._arrays
+        row = {
+            "chunk_id": UUID(bytes=a["chunk_id"][i].tobytes()),
+            "repo_id": self.repo_id,
+            "chunk_hash": a["chunk_hash"][i].decode(),
+            "start_line": int(a["start_line"][i]),
+            "end_line": int(a["end_line"][i]),
+        }
+        for column in _CATEGORICAL:
+            code = a[f"{column}_index"][i]
+            row[column] = str(a[f"{column}_values"][code]) if code >= 0 else None
+        return row
+
+
+class EmbeddingSnapshot:
+    """A loaded snapshot: memory-mapped matrix plus lazily decoded rows."""
+
+    def __init__(self, path: Path, repo_id: UUID, commit_sha: str):
+        arrays = {p.stem: np.load(p, mmap_mode="r") for p in path.glob("*.npy")}
+        self.embeddings = arrays.pop("embeddings")
+        self.rows = SnapshotRows(repo_id, arrays)
+        self.commit_sha = commit_sha
+
+
+def load_snapshot(repo_id: UUID, commit_sha: Optional[str]) -> Optional[EmbeddingSnapshot]:
+    """Open a repository's snapshot for a commit, or None if there isn't one."""
+    if not commit_sha:
+        return None
+    path = snapshot_path(repo_id, commit_sha)
+    if not (path / _MANIFEST).exists():
+        return None
+    try:
+        return EmbeddingSnapshot(path, repo_id, commit_sha)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def _write(path: Path, records: list, dtype: str) -> None:
+    """Write snapshot arrays and manifest into an empty directory."""
+    embeddings = np.empty((len(records), settings.embedding_dimension), dtype=np.float32)
+    for i, record in enumerate(records):
+        embeddings[i] = to_float32(record["embedding"])
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings /= norms
+
+    arrays = {
+        "embeddings": embeddings.astype(dtype, copy=False),
+        "chunk_id": np.frombuffer(
+            b"".join(r["chunk_id"].bytes for r in records), dtype=np.uint8
+        ).reshape(-1, 16),
+        "chunk_hash": np.array([r["chunk_hash"].encode() for r in records], dtype="S64"),
+        "start_line": np.array([r["start_line"] or 0 for r in records], dtype=np.int32),
+        "end_line": np.array([r["end_line"] or 0 for r in records], dtype=np.int32),
+    }
+    for column in _CATEGORICAL:
+        values, codes = _categorical([r[column] for r in records])
+        arrays[f"{column}_values"] = values
+        arrays[f"{column}_index"] = codes
+
+    for name, array in arrays.items():
+        np.save(path / f"{name}.npy", array)
+    (path / _MANIFEST).write_text(
+        json.dumps({"count": len(records), "dtype": dtype, "created_at": time.time()})
+    )
+
+
+async def write_snapshot(conn, repo_id: UUID, commit_sha: str) -> Optional[Path]:
+    """
+    Publish a snapshot of a repository's embeddings at a commit.
+
+    Failures are logged and swallowed: snapshots only speed up searches,
+    which fall back to Postgres without one.
+
+    Returns:
+        The snapshot directory, or None if it could not be written
+    """
+    path = snapshot_path(repo_id, commit_sha)
+    tmp = path.with_name(f".{commit_sha}.{os.getpid()}.tmp")
+    try:
+        records = await conn.fetch(
+            f"""
+            SELECT {", ".join(CodeMapQueries.SIMILAR_COLUMNS)}, embedding
+            FROM code_map
+            WHERE repo_id = $1 AND embedding IS NOT NULL
+            ORDER BY chunk_id
+            """,
+            repo_id,
+        )
+        tmp.mkdir(parents=True, exist_ok=True)
+        _write(tmp, records, settings.embedding_snapshot_dtype)
+        if path.exists():
+            # Mapped files stay readable for processes that still hold them
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"Failed to write embedding snapshot for repo {repo_id}: {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+
+    removed = gc_snapshots(repo_id, keep=commit_sha)
+    logger.info(
+        f"Wrote embedding snapshot {repo_id}@{commit_sha[:12]} ({len(records)} chunks), "
+        f"removed {removed} old"
+    )
+    return path
+
+
+def gc_snapshots(repo_id: UUID, keep: Optional[str] = None) -> int:
+    """
+    Delete a repository's snapshots other than `keep` (all if None).
+
+    Returns:
+        Number of snapshots removed
+    """
+    repo_dir = SNAPSHOT_ROOT / str(repo_id)
+    if not repo_dir.exists():
+        return 0
+    removed = 0
+    for path in repo_dir.iterdir():
+        if path.name == keep:
+            continue
+        # Temporary directories of in-progress writes, unless long abandoned
+        if path.name.startswith(".") and time.time() - path.stat().st_mtime < settings.job_timeout:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
@@ -11,6 +11,8 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
 from app.core.exceptions import EmbeddingProviderError
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rate_limiter import embeddings_rate_limiter
 
 settings = get_settings()
 
@@ -22,6 +24,7 @@ class EmbeddingsService:
         self.provider = settings.embeddings_provider
         self.dimension = settings.embedding_dimension
         self.batch_size = settings.embedding_batch_size
+        self.batch_max_tokens = settings.embedding_batch_max_tokens
 
         if self.provider == "azure":
             if not settings.azure_openai_endpoint or not settings.azure_openai_key:
@@ -47,6 +50,8 @@ class EmbeddingsService:
         else:
             raise EmbeddingProviderError(f"Unknown provider: {self.provider}")
 
+        self.cache = EmbeddingCache(self.model, self.dimension)
+
     @staticmethod
     def compute_text_hash(text: str) -> str:
         """Compute SHA256 hash of text for caching."""
@@ -67,6 +72,8 @@ class EmbeddingsService:
         Returns:
             Embedding vector
         """
+        await embeddings_rate_limiter.acquire(tokens=self.estimate_tokens(text))
+
         try:
             # For Azure OpenAI, try deployment name first, fall back to direct API call
             if self.provider == "azure":
@@ -141,11 +148,58 @@ class EmbeddingsService:
             f"{', '.join(models_to_try)}"
         )
 
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimation (4 chars ≈ 1 token)."""
+        return max(1, len(text) // 4)
+
+    def plan_batches(self, texts: list[str]) -> list[list[int]]:
+        """
+        Group texts into provider requests.
+
+        Each batch holds at most `embedding_batch_size` inputs and at most
+        `embedding_batch_max_tokens` estimated tokens.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of batches, each a list of indices into `texts`
+        """
+        batches: list[list[int]] = []
+        current: list[int] = []
+        current_tokens = 0
+
+        for idx, text in enumerate(texts):
+            tokens = self.estimate_tokens(text)
+            if current and (
+                len(current) >= self.batch_size
+                or current_tokens + tokens > self.batch_max_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(idx)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         reraise=True,
     )
+    async def _embed_request(self, batch: list[str]) -> list[list[float]]:
+        """Send a single embeddings request for a batch of texts."""
+        await embeddings_rate_limiter.acquire(
+            tokens=sum(self.estimate_tokens(text) for text in batch)
+        )
+        response = await self.client.embeddings.create(
+            model=self.model, input=batch, encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
+
     async def embed_batch(self, texts: list[str]) -> list[list[float]]:
         """
         Generate embeddings for multiple texts in batch.
@@ -160,19 +214,13 @@ class EmbeddingsService:
             return []
 
         try:
-            # Process in batches
-            all_embeddings = []
-            for i in range(0, len(texts), self.batch_size):
-                batch = texts[i : i + self.batch_size]
-
-                response = await self.client.embeddings.create(
-                    model=self.model, input=batch, encoding_format="float"
-                )
-
-                embeddings = [item.embedding for item in response.data]
-                all_embeddings.extend(embeddings)
+            all_embeddings: list[list[float]] = [None] * len(texts)  # type: ignore[list-item]
+            for batch_num, indices in enumerate(self.plan_batches(texts), start=1):
+                embeddings = await self._embed_request([texts[i] for i in indices])
+                for i, embedding in zip(indices, embeddings):
+                    all_embeddings[i] = embedding
 
-                logger.debug(f"Generated {len(embeddings)} embeddings (batch {i // self.batch_size + 1})")
+                logger.debug(f"Generated {len(embeddings)} embeddings (batch {batch_num})")
 
             return all_embeddings
 
@@ -180,48 +228,57 @@ class EmbeddingsService:
             logger.error(f"Batch embedding generation failed: {e}")
             raise EmbeddingProviderError(f"Failed to generate batch embeddings: {e}")
 
-    async def embed_with_cache(
-        self, text: str, redis_client, cache_prefix: str = "emb"
-    ) -> list[float]:
+    async def embed_batch_partial(self, texts: list[str]) -> list[Optional[list[float]]]:
         """
-        Generate embedding with Redis cache.
+        Generate embeddings in token-budgeted batches, isolating failures per batch.
+
+        Unlike `embed_batch`, a failing request does not abort the whole call:
+        the texts of that batch get `None` and the remaining batches proceed.
 
         Args:
-            text: Text to embed
-            redis_client: Redis client instance
-            cache_prefix: Cache key prefix
+            texts: List of texts to embed
 
         Returns:
-            Embedding vector
+            Embedding vectors aligned with `texts` (None where the batch failed)
         """
-        # Compute cache key
-        text_hash = self.compute_text_hash(text)
-        cache_key = f"{cache_prefix}:{text_hash}"
+        results: list[Optional[list[float]]] = [None] * len(texts)
 
-        try:
-            # Check cache
-            cached = await redis_client.get(cache_key)
-            if cached:
-                logger.debug(f"Cache hit for embedding: {cache_key}")
-                import json
+        for indices in self.plan_batches(texts):
+            try:
+                embeddings = await self._embed_request([texts[i] for i in indices])
+            except Exception as e:
+                logger.warning(f"Embedding batch of {len(indices)} texts failed: {e}")
+                continue
 
-                return json.loads(cached)
+            if len(embeddings) != len(indices):
+                logger.warning(
+                    f"Embedding batch returned {len(embeddings)} vectors for {len(indices)} texts"
+                )
+                continue
 
-            # Generate embedding
-            embedding = await self.embed_text(text)
+            for i, embedding in zip(indices, embeddings):
+                results[i] = embedding
 
-            # Store in cache
-            import json
+        return results
 
-            await redis_client.setex(
-                cache_key, settings.cache_ttl_embeddings, json.dumps(embedding)
-            )
+    async def embed_with_cache(self, text: str) -> list[float]:
+        """
+        Generate embedding through the shared embedding cache.
 
-            return embedding
+        Args:
+            text: Text to embed
 
-        except Exception as e:
-            logger.warning(f"Cache operation failed, generating without cache: {e}")
-            return await self.embed_text(text)
+        Returns:
+            Embedding vector
+        """
+        text_hash = self.compute_text_hash(text)
+        cached = await self.cache.get(text_hash)
+        if cached is not None:
+            return cached
+
+        embedding = await self.embed_text(text)
+        await self.cache.set(text_hash, embedding)
+        return embedding
 
 
 # Global service instance
@@ -5,6 +5,7 @@ import json
 from typing import Annotated, TypedDict, List, Literal
 from uuid import UUID
 
+from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
@@ -14,9 +15,23 @@ from loguru import logger
 from app.config import get_settings
 from app.services.tools import COMPLIANCE_TOOLS
 from app.services.agents import AgentLogger
+from app.services.rate_limiter import llm_rate_limiter
 
 settings = get_settings()
 
+
+class RateLimitCallback(AsyncCallbackHandler):
+    """Acquire from the shared LLM rate limiter before every chat model call."""
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        prompt_chars = sum(
+            len(str(m.content)) for batch in messages for m in batch
+        )
+        await llm_rate_limiter.acquire(tokens=prompt_chars // 4 + settings.llm_max_tokens)
+
+
+rate_limit_callbacks = [RateLimitCallback()]
+
 # --- State Definition ---
 class ComplianceState(TypedDict):
     repo_id: str
@@ -41,7 +56,8 @@ async def planner_node(state: ComplianceState):
     llm = ChatOpenAI(
         api_key=settings.openai_api_key or "dummy", # Fallback if using Azure adapter
         model="gpt-4o", 
-        temperature=0
+        temperature=0,
+        callbacks=rate_limit_callbacks,
     )
     
     # In production use Azure adapter if configured
@@ -69,7 +85,9 @@ async def navigator_node(state: ComplianceState):
     agent_logger = AgentLogger(scan_id)
     await agent_logger.log("NAVIGATOR", "Executing search strategy...")
     
-    llm = ChatOpenAI(model="gpt-4o", temperature=0).bind_tools(COMPLIANCE_TOOLS)
+    llm = ChatOpenAI(
+        model="gpt-4o", temperature=0, callbacks=rate_limit_callbacks
+    ).bind_tools(COMPLIANCE_TOOLS)
     
     # Context for the scout
     messages = state["messages"] + [
@@ -100,7 +118,7 @@ async def investigator_node(state: ComplianceState):
     
     await agent_logger.log("INVESTIGATOR", "Analyzing retrieved code context...")
     
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = ChatOpenAI(model="gpt-4o", temperature=0, callbacks=rate_limit_callbacks)
     
     analysis_prompt = f"""
     You are a Compliance Investigator.
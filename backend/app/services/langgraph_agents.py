@@ -18,6 +18,8 @@ from app.services.agents import AgentLogger, AgentType
 from app.services.embeddings import embeddings_service
 from app.services.llm import llm_service
 from app.database import db
+from app.services.memory_index import memory_index
+from app.services.candidate_filter import identifiers, mentions_identifier
 
 
 class ComplianceState(TypedDict):
@@ -144,7 +146,7 @@ Respond with JSON:
 
 
 class CodeNavigatorAgent(BaseAgent):
-    """Finds relevant repository files using vector search"""
+    """Finds relevant repository files using hybrid vector and full-text search"""
     
     def __init__(self, scan_id: str):
         super().__init__("NAVIGATOR", scan_id)
@@ -159,29 +161,33 @@ class CodeNavigatorAgent(BaseAgent):
         matched_files = []
         no_match = []
         
-        for task in tasks:
-            await self.log(f"📊 Matching: {task[:50]}...")
-            task_embedding = await embeddings_service.embed_text(task)
-            embedding_str = "[" + ",".join(map(str, task_embedding)) + "]"
-            
-            async with db.acquire() as conn:
-                results = await conn.fetch("""
-                    SELECT file_path, chunk_text, 1 - (embedding <=> $1::vector) as similarity
-                    FROM code_map WHERE repo_id = $2 AND embedding IS NOT NULL
-                    ORDER BY embedding <=> $1::vector LIMIT 5
-                """, embedding_str, UUID(repo_id))
-                
-                if results:
-                    for row in results:
-                        if row['similarity'] > 0.7:
-                            matched_files.append({
-                                "path": row['file_path'],
-                                "confidence": round(row['similarity'], 2),
-                                "task": task,
-                                "snippet": row['chunk_text'][:200]
-                            })
-                else:
-                    no_match.append(task)
+        await self.log(f"📊 Matching {len(tasks)} tasks: " + "; ".join(task[:50] for task in tasks))
+        
+        # One embedding request and one search round trip for all tasks
+        task_embeddings = await embeddings_service.embed_batch(tasks)
+        async with db.acquire() as conn:
+            task_results = await memory_index.search_similar_many(
+                conn, task_embeddings, UUID(repo_id), top_k=5, include_text=True,
+                query_texts=tasks,
+            )
+        
+        for task, results in zip(tasks, task_results):
+            if results:
+                for row in results:
+                    similarity = 1 - row['distance']
+                    # Full-text hits count below the floor only on an exact identifier
+                    if similarity > 0.7 or (
+                        row.get('lexical_rank') is not None
+                        and mentions_identifier(identifiers(task), row['chunk_text'])
+                    ):
+                        matched_files.append({
+                            "path": row['file_path'],
+                            "confidence": round(similarity, 2),
+                            "task": task,
+                            "snippet": row['chunk_text'][:200]
+                        })
+            else:
+                no_match.append(task)
         
         await self.log(f"🎯 Mapped to {len(matched_files)} code locations")
         state["matched_files"] = {"matched_files": matched_files, "no_match": no_match}
@@ -12,17 +12,123 @@ def macro_compliance_prompt(rule_text: str, context_block: str) -> str:
 """
 LLM service for code analysis and compliance reasoning.
 """
+import json
+import re
+from functools import lru_cache
 from typing import Any, Optional
 
+import tiktoken
 from loguru import logger
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
 from app.core.exceptions import LLMProviderError
+from app.services.rate_limiter import estimate_message_tokens, llm_rate_limiter
+from app.services.verdict_cache import content_hash, prompt_fingerprint, verdict_cache
 
 settings = get_settings()
 
+VERDICTS = ("compliant", "non_compliant", "partial", "unknown")
+SEVERITIES = ("critical", "high", "medium", "low")
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model: str) -> "tiktoken.Encoding":
+    """tiktoken encoding of a model; deployment names tiktoken doesn't know use cl100k_base."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _compliance_prompt_version() -> str:
+    """
+    Verdict cache version shared by the single- and multi-chunk prompts,
+    whose verdicts are interchangeable.
+
+    Neither prompt shows the model where the code sits (file path, lines),
+    so a cached verdict, evidence included, holds for every copy of it.
+    """
+    from app.prompts.templates import COMPLIANCE_ANALYSIS_PROMPT, COMPLIANCE_BATCH_ANALYSIS_PROMPT
+
+    return prompt_fingerprint(
+        *COMPLIANCE_ANALYSIS_PROMPT.values(), *COMPLIANCE_BATCH_ANALYSIS_PROMPT.values()
+    )
+
+
+def _code_hash(code_text: str, language: str) -> str:
+    """Verdict cache key of code: everything about it the prompts show the model."""
+    return content_hash(f"{language}\n{code_text}")
+
+
+def _render_chunk(chunk_index: int, chunk: dict[str, Any]) -> str:
+    """A code chunk as numbered in a multi-chunk prompt."""
+    from app.prompts.templates import COMPLIANCE_BATCH_ANALYSIS_PROMPT
+
+    return COMPLIANCE_BATCH_ANALYSIS_PROMPT["chunk"].format(
+        chunk_index=chunk_index,
+        language=chunk["language"],
+        code_text=chunk["chunk_text"],
+    )
+
+
+def _validate_verdict(item: Any) -> Optional[dict[str, Any]]:
+    """A verdict with the single-chunk result's fields, or None if it's malformed."""
+    if not isinstance(item, dict):
+        return None
+    score = item.get("severity_score")
+    if (
+        item.get("verdict") not in VERDICTS
+        or item.get("severity") not in SEVERITIES
+        or isinstance(score, bool)
+        or not isinstance(score, (int, float))
+        or not 0 <= score <= 10
+        or not isinstance(item.get("explanation"), str)
+    ):
+        return None
+    return {
+        "verdict": item["verdict"],
+        "severity": item["severity"],
+        "severity_score": score,
+        "explanation": item["explanation"],
+        "evidence": item.get("evidence"),
+        "remediation": item.get("remediation"),
+    }
+
+
+def parse_batch_verdicts(response: str, count: int) -> list[Optional[dict[str, Any]]]:
+    """
+    Parse a multi-chunk reply into per-chunk verdicts.
+
+    Args:
+        response: Model reply, a JSON array of verdicts numbered by chunk_index (from 1)
+        count: Number of chunks in the prompt
+
+    Returns:
+        One validated verdict per chunk, in order; None where the reply has no
+        usable verdict for that chunk
+    """
+    verdicts: list[Optional[dict[str, Any]]] = [None] * count
+    try:
+        items = json.loads(_CODE_FENCE.sub("", response.strip()))
+    except json.JSONDecodeError:
+        return verdicts
+    if isinstance(items, dict):
+        items = items.get("verdicts", items.get("results"))
+    if not isinstance(items, list):
+        return verdicts
+
+    for item in items:
+        index = item.get("chunk_index") if isinstance(item, dict) else None
+        if isinstance(index, bool) or not isinstance(index, int) or not 1 <= index <= count:
+            continue
+        if verdicts[index - 1] is None:
+            verdicts[index - 1] = _validate_verdict(item)
+    return verdicts
+
 
 class LLMService:
     """Unified LLM service supporting Azure OpenAI and OpenAI."""
@@ -77,12 +183,15 @@ class LLMService:
         Returns:
             Generated text
         """
+        max_tokens = max_tokens or self.max_tokens
+        await llm_rate_limiter.acquire(tokens=estimate_message_tokens(messages, max_tokens))
+
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature or self.temperature,
-                max_tokens=max_tokens or self.max_tokens,
+                max_tokens=max_tokens,
             )
 
             content = response.choices[0].message.content
@@ -119,29 +228,54 @@ class LLMService:
 
         return await self.generate(messages, temperature=0.1, max_tokens=300)
 
+    def count_tokens(self, text: str) -> int:
+        """Count tokens of a text with the model's tiktoken encoding."""
+        return len(_encoding_for(self.model).encode(text, disallowed_special=()))
+
     async def analyze_compliance(
         self,
         rule_text: str,
         code_text: str,
-        file_path: str,
-        start_line: int,
-        end_line: int,
         language: str,
+        cache_stats: Optional[dict[str, int]] = None,
     ) -> dict[str, Any]:
         """
         Analyze code compliance against a rule.
 
+        Verdicts are cached by model, prompt version, rule text and code
+        (text and language; see app/services/verdict_cache.py), so the same
+        code judged against the same rule is only sent to the model once,
+        wherever it sits.
+
         Args:
             rule_text: Compliance rule in natural language
             code_text: Code snippet to analyze
-            file_path: File path
-            start_line: Start line number
-            end_line: End line number
             language: Programming language
+            cache_stats: Counters ("hits"/"misses") to record the verdict cache lookup in
 
         Returns:
             Compliance analysis result with verdict, severity, explanation, remediation
         """
+        cache_key = (self.model, _compliance_prompt_version(), content_hash(rule_text), _code_hash(code_text, language))
+        if settings.verdict_cache_enabled:
+            cached = await verdict_cache.get(*cache_key, stats=cache_stats)
+            if cached is not None:
+                return cached
+
+        result, valid = await self._analyze_single(rule_text, code_text, language)
+        # Only valid verdicts are cached; any other reply is retried next time
+        if valid and settings.verdict_cache_enabled:
+            await verdict_cache.set(*cache_key, result)
+        return result
+
+    async def _analyze_single(
+        self, rule_text: str, code_text: str, language: str
+    ) -> tuple[dict[str, Any], bool]:
+        """
+        One-chunk analysis call; returns the result and whether the reply was
+        a valid verdict (`_validate_verdict`). An invalid reply yields an
+        "unknown" verdict, which must not be cached.
+        """
         from app.prompts.templates import COMPLIANCE_ANALYSIS_PROMPT
 
         messages = [
@@ -150,9 +284,6 @@ class LLMService:
                 "role": "user",
                 "content": COMPLIANCE_ANALYSIS_PROMPT["user"].format(
                     rule_text=rule_text,
-                    file_path=file_path,
-                    start_line=start_line,
-                    end_line=end_line,
                     language=language,
                     code_text=code_text,
                 ),
@@ -163,12 +294,11 @@ class LLMService:
 
         # Parse structured response (expects JSON)
         try:
-            import json
-
-            result = json.loads(response)
-            return result
+            result = _validate_verdict(json.loads(response))
         except json.JSONDecodeError:
-            logger.warning("Failed to parse LLM response as JSON, returning raw text")
+            result = None
+        if result is None:
+            logger.warning("LLM response is not a valid compliance verdict, returning raw text")
             return {
                 "verdict": "unknown",
                 "severity": "medium",
@@ -176,7 +306,153 @@ class LLMService:
                 "explanation": response,
                 "evidence": None,
                 "remediation": None,
-            }
+            }, False
+        return result, True
+
+    def plan_compliance_batches(
+        self,
+        rule_text: str,
+        chunks: list[dict[str, Any]],
+        max_chunks: Optional[int] = None,
+        max_prompt_tokens: Optional[int] = None,
+    ) -> list[list[int]]:
+        """
+        Group code chunks for one rule into multi-chunk analysis calls.
+
+        Each batch holds at most `compliance_batch_max_chunks` chunks and,
+        together with the system prompt and the rule, at most
+        `compliance_batch_max_prompt_tokens` prompt tokens (counted with
+        tiktoken). A chunk too large to share a call gets one to itself.
+
+        Args:
+            rule_text: Compliance rule in natural language
+            chunks: Code chunks with chunk_text and language
+            max_chunks: Chunks per call (overrides default)
+            max_prompt_tokens: Prompt token budget per call (overrides default)
+
+        Returns:
+            List of batches, each a list of indices into `chunks`
+        """
+        from app.prompts.templates import COMPLIANCE_BATCH_ANALYSIS_PROMPT
+
+        max_chunks = max_chunks or settings.compliance_batch_max_chunks
+        budget = max_prompt_tokens or settings.compliance_batch_max_prompt_tokens
+        base_tokens = self.count_tokens(
+            COMPLIANCE_BATCH_ANALYSIS_PROMPT["system"]
+            + COMPLIANCE_BATCH_ANALYSIS_PROMPT["user"].format(rule_text=rule_text, chunks="")
+        )
+
+        batches: list[list[int]] = []
+        current: list[int] = []
+        current_tokens = base_tokens
+
+        for idx, chunk in enumerate(chunks):
+            tokens = self.count_tokens(_render_chunk(len(current) + 1, chunk))
+            if current and (len(current) >= max_chunks or current_tokens + tokens > budget):
+                batches.append(current)
+                current, current_tokens = [], base_tokens
+            current.append(idx)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def analyze_compliance_batch(
+        self,
+        rule_text: str,
+        chunks: list[dict[str, Any]],
+        cache_stats: Optional[dict[str, int]] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Analyze several code chunks against one rule in as few calls as possible.
+
+        Chunks without a cached verdict are packed by `plan_compliance_batches`
+        and sent with COMPLIANCE_BATCH_ANALYSIS_PROMPT, so the system prompt
+        and rule are paid for once per batch instead of once per chunk. The
+        reply must be a JSON array with one valid verdict per chunk; chunks
+        whose verdict is missing or malformed (or whose whole call failed)
+        are retried one at a time with the single-chunk prompt.
+
+        Args:
+            rule_text: Compliance rule in natural language
+            chunks: Code chunks with chunk_text and language
+            cache_stats: Counters ("hits"/"misses") to record verdict cache lookups in
+
+        Returns:
+            One analysis per chunk, in order, shaped like `analyze_compliance`'s
+        """
+        version = _compliance_prompt_version()
+        rule_hash = content_hash(rule_text)
+        results: list[Optional[dict[str, Any]]] = [None] * len(chunks)
+
+        # Identical code is analyzed once
+        pending: dict[str, list[int]] = {}
+        for idx, chunk in enumerate(chunks):
+            code_hash = _code_hash(chunk["chunk_text"], chunk["language"])
+            if code_hash in pending:
+                pending[code_hash].append(idx)
+                continue
+            if settings.verdict_cache_enabled:
+                cached = await verdict_cache.get(self.model, version, rule_hash, code_hash, stats=cache_stats)
+                if cached is not None:
+                    results[idx] = cached
+                    continue
+            pending[code_hash] = [idx]
+
+        groups = list(pending.items())
+        todo = [chunks[positions[0]] for _, positions in groups]
+        for batch in self.plan_compliance_batches(rule_text, todo):
+            verdicts = (
+                await self._analyze_packed(rule_text, [todo[i] for i in batch])
+                if len(batch) > 1
+                else [None]
+            )
+            for i, verdict in zip(batch, verdicts):
+                code_hash, positions = groups[i]
+                chunk = todo[i]
+                valid = verdict is not None
+                if not valid:
+                    verdict, valid = await self._analyze_single(
+                        rule_text, chunk["chunk_text"], chunk["language"]
+                    )
+                if valid and settings.verdict_cache_enabled:
+                    await verdict_cache.set(self.model, version, rule_hash, code_hash, verdict)
+                for position in positions:
+                    results[position] = verdict
+
+        return results
+
+    async def _analyze_packed(
+        self, rule_text: str, chunks: list[dict[str, Any]]
+    ) -> list[Optional[dict[str, Any]]]:
+        """One multi-chunk call; returns each chunk's validated verdict, or None."""
+        from app.prompts.templates import COMPLIANCE_BATCH_ANALYSIS_PROMPT
+
+        messages = [
+            {"role": "system", "content": COMPLIANCE_BATCH_ANALYSIS_PROMPT["system"]},
+            {
+                "role": "user",
+                "content": COMPLIANCE_BATCH_ANALYSIS_PROMPT["user"].format(
+                    rule_text=rule_text,
+                    chunks="\n".join(
+                        _render_chunk(n, chunk) for n, chunk in enumerate(chunks, start=1)
+                    ),
+                ),
+            },
+        ]
+
+        try:
+            response = await self.generate(messages, temperature=0.1, max_tokens=600 * len(chunks))
+        except LLMProviderError as e:
+            logger.warning(f"Multi-chunk compliance analysis failed, retrying chunks one by one: {e}")
+            return [None] * len(chunks)
+
+        verdicts = parse_batch_verdicts(response, len(chunks))
+        failed = sum(verdict is None for verdict in verdicts)
+        if failed:
+            logger.warning(f"{failed}/{len(chunks)} verdicts missing or invalid in multi-chunk reply")
+        return verdicts
 
     async def generate_scan_summary(self, violations: list[dict[str, Any]]) -> str:
         """
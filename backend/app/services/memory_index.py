@@ -0,0 +1,444 @@
+"""
+In-process vector index for hot repositories.
+
+Repeated scans of the same repository send hundreds of similarity queries
+to Postgres. When `vector_memory_index_enabled` is set, a repository's
+embeddings are loaded once into a contiguous float32 matrix with
+unit-normalised rows, and each query is answered with a single
+matrix-vector product plus `argpartition`.
+
+When the indexer has published an embedding snapshot for the repository's
+current commit (see `embedding_snapshots`), the index maps it instead of
+reading code_map, and fetches chunk text for the hits only.
+
+Indexes are keyed by the repository's sync state (last commit, sync time
+and chunk count), which every full and incremental re-index updates, so a
+changed repository is reloaded on its next search. Loaded indexes share a
+memory budget and are evicted least-recently-used first. Searches the
+index cannot serve (no repo_id, stored embeddings requested, repository
+larger than the budget) fall through to `CodeMapQueries`.
+
+Searches given the query's text as well as its embedding are hybrid
+(when `hybrid_search_enabled`): vector and full-text rankings are fused by
+reciprocal rank. With an index loaded, only the full-text ranking comes
+from Postgres (`CodeMapQueries.search_lexical_many`) and is fused with the
+in-process vector ranking; otherwise Postgres does both in one round trip
+(`CodeMapQueries.search_hybrid_many`).
+
+The cache lives in the current process: long-lived API workers keep it
+between requests, RQ jobs keep it for the duration of a scan.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from loguru import logger
+
+from app.config import get_settings
+from app.models.database import CodeMapQueries, SimilarChunk
+from app.services.candidate_filter import lexical_queries
+from app.services.embedding_snapshots import load_snapshot, to_float32
+
+settings = get_settings()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length in place (zero rows are left as they are)."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class RepoVectorIndex:
+    """Embeddings of one repository as a normalised matrix."""
+
+    def __init__(
+        self,
+        rows: Sequence[dict[str, Any]],
+        embeddings: np.ndarray,
+        version: tuple,
+        snapshot: bool = False,
+    ):
+        """
+        Args:
+            rows: One dict per chunk with the `SimilarChunk` columns to return
+            embeddings: (len(rows), dimension) matrix, normalised in place
+            version: Repository sync state the index was loaded at
+            snapshot: rows and embeddings come from a memory-mapped snapshot;
+                the matrix is already normalised and rows carry no text
+        """
+        self.rows = rows
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.has_text = not snapshot
+        self._positions: Optional[dict[UUID, int]] = None
+        if snapshot:
+            # Shared page cache, not process memory
+            self.matrix = embeddings
+            self.nbytes = 0
+        else:
+            self.matrix = _normalize(np.ascontiguousarray(embeddings, dtype=np.float32))
+            self.nbytes = self.matrix.nbytes + sum(
+                len(row.get("chunk_text") or "") + len(row.get("nl_summary") or "") for row in rows
+            )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        include_text: bool = False,
+        include_summary: bool = False,
+    ) -> list[list[SimilarChunk]]:
+        """
+        Top-k chunks by cosine distance for each query vector.
+
+        Args:
+            queries: (m, dimension) query matrix
+            top_k: Number of chunks per query
+
+        Returns:
+            One list of chunks per query, nearest first
+        """
+        queries = _normalize(np.array(queries, dtype=np.float32, ndmin=2))
+        k = min(top_k, len(self.rows))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ self.matrix.T
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+        dropped = self._dropped(include_text, include_summary)
+        results = []
+        for row_scores, row_candidates in zip(scores, candidates):
+            ordered = row_candidates[np.argsort(-row_scores[row_candidates], kind="stable")]
+            results.append([self._match(i, row_scores[i], dropped) for i in ordered])
+        return results
+
+    def search_hybrid(
+        self,
+        queries: np.ndarray,
+        lexical: list[list[UUID]],
+        top_k: int,
+        candidates: int,
+        rrf_k: int,
+        include_text: bool = False,
+        include_summary: bool = False,
+    ) -> list[list[SimilarChunk]]:
+        """
+        Fuse each query's `candidates` nearest chunks with its full-text
+        matches by reciprocal rank, like `CodeMapQueries.hybrid_many_query`.
+
+        Args:
+            queries: (m, dimension) query matrix
+            lexical: chunk_ids of each query's full-text matches, best first
+
+        Returns:
+            One list of chunks per query, best fused score first, with
+            rrf_score, vector_rank and lexical_rank
+        """
+        queries = _normalize(np.array(queries, dtype=np.float32, ndmin=2))
+        if not self.rows:
+            return [[] for _ in range(len(queries))]
+        if self._positions is None:
+            self._positions = {row["chunk_id"]: i for i, row in enumerate(self.rows)}
+        k = min(max(candidates, top_k), len(self.rows))
+        scores = queries @ self.matrix.T
+        nearest = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else None
+
+        dropped = self._dropped(include_text, include_summary)
+        results = []
+        for q, (row_scores, matches) in enumerate(zip(scores, lexical)):
+            row_candidates = nearest[q] if nearest is not None else np.arange(len(self.rows))
+            ordered = row_candidates[np.argsort(-row_scores[row_candidates], kind="stable")]
+            ranks: dict[int, list[Optional[int]]] = {
+                int(i): [rank, None] for rank, i in enumerate(ordered, start=1)
+            }
+            for rank, chunk_id in enumerate(matches, start=1):
+                i = self._positions.get(chunk_id)
+                if i is not None:  # Not in the index yet; picked up on reload
+                    ranks.setdefault(i, [None, None])[1] = rank
+
+            fused = [
+                (sum(1.0 / (rrf_k + rank) for rank in pair if rank is not None), i, pair)
+                for i, pair in ranks.items()
+            ]
+            # Ties in the order of hybrid_many_query: by chunk_id
+            fused.sort(key=lambda item: (-item[0], str(self.rows[item[1]]["chunk_id"])))
+            hits = []
+            for rrf_score, i, (vector_rank, lexical_rank) in fused[:top_k]:
+                match = self._match(i, row_scores[i], dropped)
+                match.update(rrf_score=rrf_score, vector_rank=vector_rank, lexical_rank=lexical_rank)
+                hits.append(match)
+            results.append(hits)
+        return results
+
+    @staticmethod
+    def _dropped(include_text: bool, include_summary: bool) -> set[str]:
+        """Row keys a search leaves out."""
+        dropped = set()
+        if not include_text:
+            dropped.add("chunk_text")
+        if not include_summary:
+            dropped.add("nl_summary")
+        return dropped
+
+    def _match(self, i: int, score: float, dropped: set[str]) -> SimilarChunk:
+        """Result dict of row `i` at cosine similarity `score`."""
+        match = {key: value for key, value in self.rows[i].items() if key not in dropped}
+        match["distance"] = float(1.0 - score)
+        return match
+
+
+class MemoryVectorIndex:
+    """LRU cache of per-repository vector indexes under a memory budget."""
+
+    def __init__(self, max_bytes: int, check_interval: float):
+        """
+        Args:
+            max_bytes: Memory budget shared by all loaded repositories
+            check_interval: Seconds between checks that a loaded index is current
+        """
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._indexes: "OrderedDict[UUID, RepoVectorIndex]" = OrderedDict()
+        # Repositories too large for the budget, by the version that was too large
+        self._oversized: dict[UUID, tuple] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+    def invalidate(self, repo_id: Optional[UUID] = None) -> None:
+        """Drop a repository's index (or all of them)."""
+        if repo_id is None:
+            self._indexes.clear()
+            self._oversized.clear()
+        else:
+            self._indexes.pop(repo_id, None)
+            self._oversized.pop(repo_id, None)
+
+    @staticmethod
+    async def _version(conn, repo_id: UUID) -> tuple:
+        """Sync state of a repository; changes whenever it is re-indexed."""
+        record = await conn.fetchrow(
+            "SELECT last_commit_sha, last_synced_at, total_chunks FROM repos WHERE repo_id = $1",
+            repo_id,
+        )
+        return tuple(record) if record else ()
+
+    async def _load(self, conn, repo_id: UUID, version: tuple) -> RepoVectorIndex:
+        """Read a repository's embeddings from code_map."""
+        columns = ", ".join("c." + column for column in CodeMapQueries.SIMILAR_COLUMNS)
+        records = await conn.fetch(
+            f"""
+            SELECT {columns}, cc.chunk_text, cc.nl_summary, c.embedding
+            FROM code_map c
+            JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+            WHERE c.repo_id = $1 AND c.embedding IS NOT NULL
+            ORDER BY c.chunk_id
+            """,
+            repo_id,
+        )
+        rows = []
+        embeddings = np.empty((len(records), settings.embedding_dimension), dtype=np.float32)
+        for i, record in enumerate(records):
+            row = dict(record)
+            embeddings[i] = to_float32(row.pop("embedding"))
+            rows.append(row)
+        return RepoVectorIndex(rows, embeddings, version)
+
+    async def get(self, conn, repo_id: UUID) -> Optional[RepoVectorIndex]:
+        """
+        Current index for a repository, loading it if needed.
+
+        Returns:
+            None if the repository does not fit in the memory budget
+        """
+        index = self._indexes.get(repo_id)
+        now = time.monotonic()
+        if index is not None and now - index.checked_at < self.check_interval:
+            self._indexes.move_to_end(repo_id)
+            return index
+
+        version = await self._version(conn, repo_id)
+        if index is not None and index.version == version:
+            index.checked_at = now
+            self._indexes.move_to_end(repo_id)
+            return index
+        if self._oversized.get(repo_id) == version:
+            return None
+
+        snapshot = load_snapshot(repo_id, version[0] if version else None)
+        if snapshot is not None:
+            index = RepoVectorIndex(snapshot.rows, snapshot.embeddings, version, snapshot=True)
+            self._indexes[repo_id] = index
+            logger.info(f"Mapped embedding snapshot for repo {repo_id}: {len(index)} chunks")
+            return index
+
+        if version and (version[2] or 0) * settings.embedding_dimension * 4 > self.max_bytes:
+            # Too large by its chunk count alone; don't read it just to find out
+            self._oversized[repo_id] = version
+            return None
+
+        self._indexes.pop(repo_id, None)
+        started = time.perf_counter()
+        index = await self._load(conn, repo_id, version)
+        if index.nbytes > self.max_bytes:
+            logger.info(
+                f"Repo {repo_id} ({index.nbytes / 1024 ** 2:.0f} MB) exceeds the memory index budget"
+            )
+            self._oversized[repo_id] = version
+            return None
+
+        self._indexes[repo_id] = index
+        while self.nbytes > self.max_bytes:
+            evicted, _ = self._indexes.popitem(last=False)
+            logger.debug(f"Evicted memory index for repo {evicted}")
+        logger.info(
+            f"Loaded memory index for repo {repo_id}: {len(index)} chunks, "
+            f"{index.nbytes / 1024 ** 2:.1f} MB in {time.perf_counter() - started:.2f}s"
+        )
+        return index
+
+    @staticmethod
+    async def _attach_text(
+        conn, results: list[list[SimilarChunk]], include_text: bool, include_summary: bool
+    ) -> None:
+        """Fetch text columns for the hits of a snapshot-backed search."""
+        columns = [
+            column
+            for column, wanted in (("chunk_text", include_text), ("nl_summary", include_summary))
+            if wanted
+        ]
+        chunk_ids = list({m["chunk_id"] for matches in results for m in matches})
+        if not columns or not chunk_ids:
+            return
+        records = await conn.fetch(
+            f"""
+            SELECT c.chunk_id, {", ".join("cc." + column for column in columns)}
+            FROM code_map c
+            JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+            WHERE c.chunk_id = ANY($1::uuid[])
+            """,
+            chunk_ids,
+        )
+        texts = {record["chunk_id"]: dict(record) for record in records}
+        for matches in results:
+            for match in matches:
+                for column in columns:
+                    match[column] = texts.get(match["chunk_id"], {}).get(column)
+
+    async def _index_for(
+        self, conn, repo_id: Optional[UUID], include_embedding: bool
+    ) -> Optional[RepoVectorIndex]:
+        """Index that can serve a search, or None to fall through to Postgres."""
+        if not settings.vector_memory_index_enabled or repo_id is None or include_embedding:
+            return None
+        return await self.get(conn, repo_id)
+
+    async def search_similar(
+        self,
+        conn,
+        embedding: Any,
+        repo_id: Optional[UUID],
+        top_k: int = 10,
+        *,
+        include_text: bool = False,
+        include_summary: bool = False,
+        include_embedding: bool = False,
+        query_text: Optional[str] = None,
+    ) -> list[SimilarChunk]:
+        """
+        Drop-in replacement for `CodeMapQueries.search_similar`; with
+        `query_text`, a hybrid vector + full-text search.
+        """
+        if query_text is not None and settings.hybrid_search_enabled:
+            results = await self.search_similar_many(
+                conn, [embedding], repo_id, top_k,
+                include_text=include_text,
+                include_summary=include_summary,
+                include_embedding=include_embedding,
+                query_texts=[query_text],
+            )
+            return results[0]
+        index = await self._index_for(conn, repo_id, include_embedding)
+        if index is None:
+            return await CodeMapQueries.search_similar(
+                conn, embedding, repo_id, top_k,
+                include_text=include_text,
+                include_summary=include_summary,
+                include_embedding=include_embedding,
+            )
+        results = index.search(to_float32(embedding), top_k, include_text, include_summary)
+        if not index.has_text:
+            await self._attach_text(conn, results, include_text, include_summary)
+        return results[0]
+
+    async def search_similar_many(
+        self,
+        conn,
+        embeddings: list[Any],
+        repo_id: Optional[UUID],
+        top_k: int = 10,
+        *,
+        include_text: bool = False,
+        include_summary: bool = False,
+        include_embedding: bool = False,
+        query_texts: Optional[list[str]] = None,
+    ) -> list[list[SimilarChunk]]:
+        """
+        Drop-in replacement for `CodeMapQueries.search_similar_many`; with
+        `query_texts` (one per embedding), hybrid vector + full-text searches.
+        """
+        hybrid = query_texts is not None and settings.hybrid_search_enabled
+        tsqueries = lexical_queries(query_texts) if hybrid else []
+        index = await self._index_for(conn, repo_id, include_embedding)
+        if index is None and hybrid:
+            return await CodeMapQueries.search_hybrid_many(
+                conn, embeddings, tsqueries, repo_id, top_k,
+                include_text=include_text,
+                include_summary=include_summary,
+                include_embedding=include_embedding,
+            )
+        if index is None:
+            return await CodeMapQueries.search_similar_many(
+                conn, embeddings, repo_id, top_k,
+                include_text=include_text,
+                include_summary=include_summary,
+                include_embedding=include_embedding,
+            )
+        if not embeddings:
+            return []
+        queries = np.stack([to_float32(e) for e in embeddings])
+        if hybrid:
+            lexical = await CodeMapQueries.search_lexical_many(
+                conn, tsqueries, repo_id, settings.hybrid_search_candidates
+            )
+            results = index.search_hybrid(
+                queries, lexical, top_k,
+                candidates=settings.hybrid_search_candidates,
+                rrf_k=settings.hybrid_rrf_k,
+                include_text=include_text,
+                include_summary=include_summary,
+            )
+        else:
+            results = index.search(queries, top_k, include_text, include_summary)
+        if not index.has_text:
+            await self._attach_text(conn, results, include_text, include_summary)
+        return results
+
+
+# Global in-process index used by the search call sites
+memory_index = MemoryVectorIndex(
+    max_bytes=settings.vector_memory_index_max_mb * 1024 ** 2,
+    check_interval=settings.vector_memory_index_check_seconds,
+)
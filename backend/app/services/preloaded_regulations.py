@@ -19,6 +19,7 @@ from loguru import logger
 from app.services.pdf_processor import PDFProcessor
 from app.services.embeddings import embeddings_service
 from app.database import db
+from app.models.database import RegulationChunkQueries
 
 
 class PreloadedRegulationService:
@@ -168,59 +169,42 @@ class PreloadedRegulationService:
                 1
             )
             
-            # Process chunks in batches for efficiency
-            inserted_count = 0
+            # Embed every chunk, then load them all with one bulk upsert
+            rows = []
             
             for idx, chunk in enumerate(chunks):
                 try:
                     # Generate embedding
                     embedding = await embeddings_service.embed_text(chunk["text"])
                     
-                    # Format embedding for PostgreSQL vector type
-                    embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-                    
                     # Create unique chunk hash
                     chunk_hash = hashlib.sha256(
                         f"{self.DEMO_REGULATION['rule_id']}-{idx}-{chunk['text'][:100]}".encode()
                     ).hexdigest()[:16]
                     
-                    # Insert chunk into regulation_chunks table
-                    await conn.execute("""
-                        INSERT INTO regulation_chunks (
-                            chunk_id,
-                            rule_id,
-                            chunk_text,
-                            chunk_hash,
-                            chunk_index,
-                            embedding,
-                            rule_section,
-                            metadata
-                        )
-                        VALUES ($1, $2, $3, $4, $5, $6::vector, $7, $8::jsonb)
-                    """,
-                        uuid4(),
-                        self.DEMO_REGULATION["rule_id"],
-                        chunk["text"],
-                        chunk_hash,
-                        idx,
-                        embedding_str,
-                        f"{chunk['section_number']} {chunk['section_title']}",
-                        json.dumps({
+                    rows.append({
+                        "rule_id": self.DEMO_REGULATION["rule_id"],
+                        "chunk_text": chunk["text"],
+                        "chunk_hash": chunk_hash,
+                        "chunk_index": idx,
+                        "embedding": embedding,
+                        "rule_section": f"{chunk['section_number']} {chunk['section_title']}",
+                        "metadata": {
                             "section_number": chunk["section_number"],
                             "section_title": chunk["section_title"],
                             "chunk_index": chunk["chunk_index"],
                             "compliance_tag": self.DEMO_REGULATION["compliance_tag"]
-                        })
-                    )
-                    
-                    inserted_count += 1
+                        },
+                    })
                     
-                    if (inserted_count % 10 == 0):
-                        logger.info(f"Processed {inserted_count}/{len(chunks)} chunks")
+                    if (len(rows) % 10 == 0):
+                        logger.info(f"Processed {len(rows)}/{len(chunks)} chunks")
                 
                 except Exception as e:
                     logger.warning(f"Failed to process chunk {idx}: {e}")
                     continue
+            
+            inserted_count = await RegulationChunkQueries.insert_batch(conn, rows)
         
         logger.info(f"✅ Stored {inserted_count} regulation chunks in database")
         
@@ -0,0 +1,189 @@
+"""
+Distributed token-bucket rate limiter for OpenAI/Azure OpenAI calls.
+
+Every worker process acquires from the same Redis buckets before calling the
+provider, so the fleet as a whole stays just under the configured
+requests/min and tokens/min quotas instead of discovering them through 429s.
+"""
+import asyncio
+import random
+import time
+from typing import Optional
+
+from loguru import logger
+
+from app.config import get_settings
+from app.workers.job_queue import job_queue
+
+settings = get_settings()
+
+# Seconds before Redis is retried after a failure, doubling up to the max
+_REDIS_RETRY_MIN = 1.0
+_REDIS_RETRY_MAX = 60.0
+
+# Refill every bucket in KEYS, then take ARGV amounts from all of them or
+# from none. Returns 0 on success, otherwise the milliseconds to wait until
+# the most depleted bucket can serve the request.
+# ARGV: capacity_1, amount_1, capacity_2, amount_2, ...  (capacity per minute)
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local levels = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[(i - 1) * 2 + 1])
+    local amount = math.min(tonumber(ARGV[(i - 1) * 2 + 2]), capacity)
+    local rate = capacity / 60000.0
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens - amount
+    if tokens < amount then
+        wait = math.max(wait, math.ceil((amount - tokens) / rate))
+    end
+end
+
+if wait > 0 then
+    return wait
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', levels[i], 'ts', now)
+    redis.call('PEXPIRE', key, 120000)
+end
+return 0
+"""
+
+
+class _LocalBucket:
+    """In-process token bucket used when Redis is unreachable."""
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Refill, then return seconds until `amount` tokens are available."""
+        now = time.monotonic()
+        rate = self.capacity / 60.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / rate)
+
+    def take(self, amount: float) -> None:
+        """Take `amount` tokens (call only after `wait_time` returned 0)."""
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Token bucket over requests/min and (optionally) tokens/min.
+
+    Buckets live in Redis and are shared by all worker processes. Limits are
+    scaled by `rate_limit_headroom` so the fleet stays just under quota.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: Optional[int] = None,
+        headroom: Optional[float] = None,
+    ):
+        headroom = settings.rate_limit_headroom if headroom is None else headroom
+        self.name = name
+        self.requests_per_minute = max(1.0, requests_per_minute * headroom)
+        self.tokens_per_minute = (
+            max(1.0, tokens_per_minute * headroom) if tokens_per_minute else None
+        )
+        self.enabled = settings.rate_limit_enabled
+
+        # Hash tag keeps both buckets in one slot for the multi-key script
+        self._keys = [f"ratelimit:{{{name}}}:requests"]
+        if self.tokens_per_minute:
+            self._keys.append(f"ratelimit:{{{name}}}:tokens")
+        self._script = None
+        # While Redis is down the local buckets serve until this monotonic time
+        self._redis_retry_at = 0.0
+        self._redis_backoff = 0.0
+        self._local = [_LocalBucket(self.requests_per_minute)]
+        if self.tokens_per_minute:
+            self._local.append(_LocalBucket(self.tokens_per_minute))
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Wait until one request (and `tokens` tokens) can be sent.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        if not self.enabled:
+            return
+
+        args: list[float] = [self.requests_per_minute, 1]
+        if self.tokens_per_minute:
+            args.extend([self.tokens_per_minute, max(tokens, 1)])
+
+        waited = 0.0
+        while True:
+            wait_seconds = await self._try_acquire(args)
+            if wait_seconds <= 0:
+                break
+            # Jitter so workers released at the same moment don't stampede
+            delay = wait_seconds * random.uniform(1.0, 1.2)
+            waited += delay
+            await asyncio.sleep(delay)
+
+        if waited > 1.0:
+            logger.debug(f"Rate limiter {self.name} delayed request by {waited:.1f}s")
+
+    async def _try_acquire(self, args: list[float]) -> float:
+        """Try to take from all buckets; return seconds to wait (0 if taken)."""
+        if time.monotonic() >= self._redis_retry_at:
+            try:
+                if job_queue.async_redis is None:
+                    await job_queue.connect_async()
+                if self._script is None:
+                    self._script = job_queue.async_redis.register_script(_TOKEN_BUCKET_SCRIPT)
+                wait_ms = await self._script(keys=self._keys, args=args)
+                if self._redis_backoff:
+                    logger.info(f"Rate limiter {self.name} back on Redis buckets")
+                    self._redis_backoff = 0.0
+                return int(wait_ms) / 1000.0
+            except Exception as e:
+                # Warn once per outage; retry Redis with exponential backoff
+                if not self._redis_backoff:
+                    logger.warning(f"Rate limiter {self.name} falling back to local bucket: {e}")
+                self._redis_backoff = min(
+                    _REDIS_RETRY_MAX, max(_REDIS_RETRY_MIN, self._redis_backoff * 2)
+                )
+                self._redis_retry_at = time.monotonic() + self._redis_backoff
+
+        buckets = list(zip(self._local, args[1::2]))
+        wait = max(bucket.wait_time(amount) for bucket, amount in buckets)
+        if wait == 0:
+            for bucket, amount in buckets:
+                bucket.take(amount)
+        return wait
+
+
+def estimate_message_tokens(messages: list[dict[str, str]], max_tokens: int = 0) -> int:
+    """Rough token estimate (4 chars ≈ 1 token) for a chat request, including the completion."""
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    return prompt_tokens + max_tokens
+
+
+# Global limiter instances shared by the embeddings and LLM services
+embeddings_rate_limiter = RateLimiter(
+    "embeddings",
+    requests_per_minute=settings.rate_limit_embeddings,
+    tokens_per_minute=settings.rate_limit_embedding_tokens,
+)
+llm_rate_limiter = RateLimiter(
+    "llm",
+    requests_per_minute=settings.rate_limit_llm,
+    tokens_per_minute=settings.rate_limit_llm_tokens,
+)
@@ -3,13 +3,13 @@ Regulation Sync Service
 Handles syncing regulations from various sources (PDF, JSON, API)
 """
 import hashlib
-import json
 from typing import Dict, Any, Optional, List
 from loguru import logger
 
 from app.services.regulation_processor import regulation_processor
 from app.services.embeddings import embeddings_service
 from app.database import db
+from app.models.database import RegulationChunkQueries
 
 
 class RegulationSyncService:
@@ -121,31 +121,7 @@ class RegulationSyncService:
             return 0
         
         async with db.acquire() as conn:
-            for chunk in chunks:
-                embedding = chunk.get("embedding")
-                embedding_str = None
-                if embedding:
-                    embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-                
-                await conn.execute("""
-                    INSERT INTO regulation_chunks (
-                        rule_id, rule_section, source_document, chunk_text,
-                        chunk_index, chunk_hash, embedding, metadata
-                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7::vector, $8::jsonb)
-                    ON CONFLICT (chunk_hash) DO UPDATE SET
-                        embedding = EXCLUDED.embedding,
-                        updated_at = NOW()
-                """,
-                    chunk["rule_id"],
-                    chunk.get("rule_section"),
-                    chunk.get("source_document"),
-                    chunk["chunk_text"],
-                    chunk["chunk_index"],
-                    chunk["chunk_hash"],
-                    embedding_str,
-                    json.dumps(chunk.get("metadata", {}))
-                )
+            await RegulationChunkQueries.insert_batch(conn, chunks)
         
         return len(chunks)
 
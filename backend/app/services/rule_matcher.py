@@ -2,13 +2,43 @@
 Rule Matcher Service (Agent 3)
 Matches compliance rules against code using RAG
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from uuid import UUID
 from loguru import logger
 
+from app.config import get_settings
 from app.services.embeddings import embeddings_service
-from app.services.llm import llm_service
+from app.services.llm import _code_hash, llm_service
 from app.database import db
+from app.services.memory_index import memory_index
+from app.services.verdict_cache import content_hash, prompt_fingerprint, verdict_cache
+
+settings = get_settings()
+
+RULE_MATCH_PROMPT = """Analyze if this code complies with the regulation requirement.
+
+Regulation Requirement:
+{rule_text}
+
+Code ({language}):
+```
+{chunk_text}
+```
+
+Provide analysis in JSON format:
+{{
+    "verdict": "compliant" | "non_compliant" | "partial" | "unclear",
+    "confidence": 0.0-1.0,
+    "reasoning": "Brief explanation",
+    "evidence": "Code quoted from the snippet that supports the verdict"
+}}
+
+Quote the code itself as evidence; do not cite file paths or line numbers.
+"""
+
+# Verdicts cached under an older wording of the prompt are not reused; the
+# prompt never shows where the code sits, so a verdict holds for every copy
+RULE_MATCH_PROMPT_VERSION = prompt_fingerprint(RULE_MATCH_PROMPT)
 
 
 class RuleMatcherService:
@@ -48,9 +78,10 @@ class RuleMatcherService:
             
             # Analyze each chunk for compliance
             findings = []
+            cache_stats = {"hits": 0, "misses": 0}
             for chunk in relevant_chunks:
                 finding = await self._analyze_chunk_compliance(
-                    rule_text, chunk
+                    rule_text, chunk, cache_stats
                 )
                 findings.append(finding)
             
@@ -62,7 +93,8 @@ class RuleMatcherService:
                 "repo_id": str(repo_id),
                 "verdict": verdict,
                 "findings_count": len(findings),
-                "findings": findings[:5]  # Return top 5
+                "findings": findings[:5],  # Return top 5
+                "verdict_cache": cache_stats
             }
             
         except Exception as e:
@@ -93,67 +125,74 @@ class RuleMatcherService:
         """Use RAG to find relevant code chunks"""
         # Generate embedding for rule
         rule_embedding = await embeddings_service.embed_text(rule_text)
-        embedding_str = "[" + ",".join(map(str, rule_embedding)) + "]"
         
         # Search for similar code chunks
         async with db.acquire() as conn:
-            chunks = await conn.fetch("""
-                SELECT 
-                    chunk_id, file_path, chunk_text, start_line, end_line,
-                    1 - (embedding <=> $1::vector) as similarity
-                FROM code_map
-                WHERE repo_id = $2 AND embedding IS NOT NULL
-                ORDER BY embedding <=> $1::vector
-                LIMIT $3
-            """, embedding_str, repo_id, top_k)
+            chunks = await memory_index.search_similar(
+                conn, rule_embedding, repo_id, top_k, include_text=True, query_text=rule_text
+            )
         
-        return [dict(chunk) for chunk in chunks]
+        return [
+            {
+                "chunk_id": chunk["chunk_id"],
+                "file_path": chunk["file_path"],
+                "chunk_text": chunk["chunk_text"],
+                "start_line": chunk["start_line"],
+                "end_line": chunk["end_line"],
+                "language": chunk["language"],
+                "similarity": 1 - chunk["distance"],
+            }
+            for chunk in chunks
+        ]
     
     async def _analyze_chunk_compliance(
         self,
         rule_text: str,
-        chunk: Dict[str, Any]
+        chunk: Dict[str, Any],
+        cache_stats: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
-        """Analyze if code chunk complies with rule"""
-        prompt = f"""Analyze if this code complies with the regulation requirement.
+        """Analyze if code chunk complies with rule (verdicts are cached by rule and code)"""
+        prompt = RULE_MATCH_PROMPT.format(
+            rule_text=rule_text,
+            language=chunk["language"],
+            chunk_text=chunk["chunk_text"],
+        )
+        cache_key = (
+            llm_service.model,
+            RULE_MATCH_PROMPT_VERSION,
+            content_hash(rule_text),
+            _code_hash(chunk["chunk_text"], chunk["language"]),
+        )
 
-Regulation Requirement:
-{rule_text}
-
-Code from {chunk['file_path']} (lines {chunk['start_line']}-{chunk['end_line']}):
-```
-{chunk['chunk_text']}
-```
+        analysis = None
+        if settings.verdict_cache_enabled:
+            analysis = await verdict_cache.get(*cache_key, stats=cache_stats)
+        if analysis is None:
+            response = await llm_service.generate([{"role": "user", "content": prompt}])
+            try:
+                import json
+                analysis = json.loads(response.strip())
+            except ValueError:
+                analysis = None
+            if isinstance(analysis, dict) and settings.verdict_cache_enabled:
+                await verdict_cache.set(*cache_key, analysis)
 
-Provide analysis in JSON format:
-{{
-    "verdict": "compliant" | "non_compliant" | "partial" | "unclear",
-    "confidence": 0.0-1.0,
-    "reasoning": "Brief explanation",
-    "evidence": "Specific code reference"
-}}
-"""
-        
-        response = await llm_service.generate([{"role": "user", "content": prompt}])
-        
-        try:
-            import json
-            analysis = json.loads(response.strip())
+        if isinstance(analysis, dict):
+            analysis = dict(analysis)
             analysis["file_path"] = chunk["file_path"]
             analysis["start_line"] = chunk["start_line"]
             analysis["end_line"] = chunk["end_line"]
             analysis["similarity"] = chunk.get("similarity", 0.0)
             return analysis
-        except:
-            return {
-                "verdict": "unclear",
-                "confidence": 0.0,
-                "reasoning": "Failed to analyze",
-                "evidence": "",
-                "file_path": chunk["file_path"],
-                "start_line": chunk["start_line"],
-                "end_line": chunk["end_line"]
-            }
+        return {
+            "verdict": "unclear",
+            "confidence": 0.0,
+            "reasoning": "Failed to analyze",
+            "evidence": "",
+            "file_path": chunk["file_path"],
+            "start_line": chunk["start_line"],
+            "end_line": chunk["end_line"]
+        }
     
     def _aggregate_verdict(self, findings: list) -> str:
         """Aggregate individual findings into overall verdict"""
@@ -7,15 +7,15 @@ from langchain_core.tools import tool
 from loguru import logger
 
 from app.database import db
-from app.models.database import CodeMapQueries
 from app.services.embeddings import embeddings_service
+from app.services.memory_index import memory_index
 # from app.services.storage import storage_service # Optional: if using blob storage
 
 @tool
 async def search_codebase(query: str, repo_id: str) -> str:
     """
-    Search the codebase for snippets relevant to the query using semantic vector search.
-    Use this to find relevant files or code blocks.
+    Search the codebase for snippets relevant to the query, by meaning and by exact
+    identifiers or keywords. Use this to find relevant files or code blocks.
     """
     try:
         repo_uuid = UUID(repo_id)
@@ -26,8 +26,8 @@ async def search_codebase(query: str, repo_id: str) -> str:
             await db.connect()
             
         async with db.acquire() as conn:
-            chunks = await CodeMapQueries.search_similar(
-                conn, embedding, repo_uuid, top_k=5
+            chunks = await memory_index.search_similar(
+                conn, embedding, repo_uuid, top_k=5, include_text=True, query_text=query
             )
             
         if not chunks:
@@ -62,9 +62,10 @@ async def read_file_content(file_path: str, repo_id: str) -> str:
         async with db.acquire() as conn:
             # This assumes we store chunks. In a real app, use storage_service.download_file
             query = """
-                SELECT chunk_text, start_line FROM code_map 
-                WHERE repo_id = $1 AND file_path = $2
-                ORDER BY start_line ASC
+                SELECT cc.chunk_text, c.start_line FROM code_map c
+                JOIN chunk_content cc ON cc.chunk_hash = c.chunk_hash
+                WHERE c.repo_id = $1 AND c.file_path = $2
+                ORDER BY c.start_line ASC
             """
             rows = await conn.fetch(query, repo_uuid, file_path)
             
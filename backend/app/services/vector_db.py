@@ -5,9 +5,9 @@ from app.models.database import CodeMapQueries
 
 async def search_similar_chunks(conn, embedding, repo_id=None, top_k=10):
     """Search similar code map chunks using vector similarity."""
-    return await CodeMapQueries.search_similar(conn, embedding, repo_id, top_k)
+    return await CodeMapQueries.search_similar(conn, embedding, repo_id, top_k, include_text=True)
 
 async def upsert_embeddings(conn, embeddings, repo_id):
     """Upsert code map embeddings."""
     # embeddings: list of dicts with all code_map fields
-    return await CodeMapQueries.insert_batch(conn, embeddings)
+    return await CodeMapQueries.bulk_upsert(conn, embeddings)
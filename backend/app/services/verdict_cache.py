@@ -0,0 +1,126 @@
+"""
+Persistent cache of LLM compliance verdicts.
+
+A verdict depends only on the model, the prompt template and the two texts
+it compares (the prompts never show where the code sits), so it is stored
+under `(model, prompt version, rule hash, code hash)`: the hashes are
+SHA-256 of the regulation text and of the code with its language, and the
+prompt version is a fingerprint of the template text,
+so editing a prompt retires its cached verdicts on its own. Re-scanning an
+unchanged repository, or scanning it against an overlapping rule, reuses
+earlier verdicts instead of paying for them again.
+
+Lookups try Redis (`cache_ttl_verdicts`), then the compliance_verdicts
+table, and copy Postgres hits back into Redis. Failures of either tier are
+logged and treated as misses.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import db
+from app.models.database import VerdictCacheQueries
+from app.workers.job_queue import job_queue
+
+settings = get_settings()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a text, as stored in chunk_hash columns."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(*templates: str) -> str:
+    """Version of a prompt: a short hash of its template text."""
+    return content_hash("\x00".join(templates))[:16]
+
+
+class VerdictCache:
+    """Redis tier in front of the compliance_verdicts table."""
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(model: str, prompt_version: str, rule_hash: str, code_hash: str) -> str:
+        return f"verdict:{model}:{prompt_version}:{rule_hash}:{code_hash}"
+
+    async def get(
+        self,
+        model: str,
+        prompt_version: str,
+        rule_hash: str,
+        code_hash: str,
+        stats: Optional[dict[str, int]] = None,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Look up a cached verdict.
+
+        Args:
+            stats: Counters to record the hit or miss in, besides the global ones
+
+        Returns:
+            The verdict, or None on a miss
+        """
+        verdict = await self._get(model, prompt_version, rule_hash, code_hash)
+        outcome = "misses" if verdict is None else "hits"
+        self.stats[outcome] += 1
+        if stats is not None:
+            stats[outcome] = stats.get(outcome, 0) + 1
+        return verdict
+
+    async def _get(
+        self, model: str, prompt_version: str, rule_hash: str, code_hash: str
+    ) -> Optional[dict[str, Any]]:
+        key = self.key(model, prompt_version, rule_hash, code_hash)
+        try:
+            await job_queue.connect_async()
+            cached = await job_queue.async_redis.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.debug(f"Verdict cache Redis lookup failed: {e}")
+
+        try:
+            async with db.acquire() as conn:
+                verdict = await VerdictCacheQueries.get(
+                    conn, model, prompt_version, rule_hash, code_hash
+                )
+        except Exception as e:
+            logger.warning(f"Verdict cache database lookup failed: {e}")
+            return None
+        if verdict is not None:
+            await self._set_redis(key, verdict)
+        return verdict
+
+    async def _set_redis(self, key: str, verdict: dict[str, Any]) -> None:
+        try:
+            await job_queue.connect_async()
+            await job_queue.async_redis.set(key, json.dumps(verdict), ex=settings.cache_ttl_verdicts)
+        except Exception as e:
+            logger.debug(f"Failed to cache verdict in Redis: {e}")
+
+    async def set(
+        self,
+        model: str,
+        prompt_version: str,
+        rule_hash: str,
+        code_hash: str,
+        verdict: dict[str, Any],
+    ) -> None:
+        """Store a verdict in both tiers."""
+        await self._set_redis(self.key(model, prompt_version, rule_hash, code_hash), verdict)
+        try:
+            async with db.acquire() as conn:
+                await VerdictCacheQueries.upsert(
+                    conn, model, prompt_version, rule_hash, code_hash, verdict
+                )
+        except Exception as e:
+            logger.warning(f"Failed to store verdict: {e}")
+
+
+# Global cache instance
+verdict_cache = VerdictCache()
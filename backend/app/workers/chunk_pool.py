@@ -0,0 +1,95 @@
+"""
+Process-pool parallel chunking.
+
+Chunking (regex scans, AST parsing, hashing) is pure CPU work, so running
+it on the event loop stalls every other coroutine in the job. Files are
+grouped into batches and chunked in a `ProcessPoolExecutor`; results are
+yielded as batches complete, so the enrichment pipeline can start while
+the rest of the repository is still being chunked.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+from uuid import UUID
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.chunker import code_chunker
+from app.workers.git_tree import TreeEntry
+
+settings = get_settings()
+
+# (file, chunks) - chunks is None if the file could not be chunked
+ChunkedFile = tuple[TreeEntry, Optional[list[dict[str, Any]]]]
+
+
+def _chunk_batch(files: list[tuple[TreeEntry, str]], repo_id: UUID) -> list[ChunkedFile]:
+    """Chunk a batch of files, tagging each chunk with its file's blob SHA."""
+    results: list[ChunkedFile] = []
+    for entry, content in files:
+        try:
+            chunks = code_chunker.chunk_file(entry.path, content, repo_id)
+        except Exception as e:
+            logger.warning(f"Failed to chunk {entry.path}: {e}")
+            results.append((entry, None))
+            continue
+        for chunk in chunks:
+            chunk["blob_sha"] = entry.blob_sha
+        results.append((entry, chunks))
+    return results
+
+
+def _take(files: Iterator[tuple[TreeEntry, str]], n: int) -> list[tuple[TreeEntry, str]]:
+    """Pull the next batch of up to n files."""
+    return list(islice(files, n))
+
+
+async def chunk_files(
+    files: Iterable[tuple[TreeEntry, str]],
+    repo_id: UUID,
+    workers: Optional[int] = None,
+    batch_files: Optional[int] = None,
+) -> AsyncIterator[ChunkedFile]:
+    """
+    Chunk files across worker processes, yielding results as they complete.
+
+    Input that fits in a single batch is chunked in a thread instead, so
+    small re-indexes don't pay for starting a pool. Results are not
+    returned in input order.
+
+    Args:
+        files: (tree entry, decoded content) pairs; may be a lazy iterator
+        repo_id: Repository UUID stored on every chunk
+        workers: Worker processes (default `indexing_chunk_workers`, 0 = CPU count)
+        batch_files: Files per pool task (default `indexing_chunk_batch_files`)
+    """
+    workers = workers or settings.indexing_chunk_workers or os.cpu_count() or 1
+    batch_files = batch_files or settings.indexing_chunk_batch_files
+    loop = asyncio.get_running_loop()
+    files_iter = iter(files)
+
+    # Reading files can block on git, so pull batches off the event loop
+    batch = await asyncio.to_thread(_take, files_iter, batch_files)
+    if len(batch) < batch_files or workers == 1:
+        while batch:
+            for result in await asyncio.to_thread(_chunk_batch, batch, repo_id):
+                yield result
+            batch = await asyncio.to_thread(_take, files_iter, batch_files)
+        return
+
+    logger.info(f"Chunking with {workers} worker processes ({batch_files} files per task)")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: set[asyncio.Future] = set()
+        while batch or pending:
+            # Keep every worker busy with one batch queued behind it
+            while batch and len(pending) < workers * 2:
+                pending.add(loop.run_in_executor(pool, _chunk_batch, batch, repo_id))
+                batch = await asyncio.to_thread(_take, files_iter, batch_files)
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    yield result
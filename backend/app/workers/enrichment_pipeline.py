@@ -0,0 +1,330 @@
+"""
+Streaming enrichment pipeline for code chunks.
+
+Chunks flow through two independent lanes - embeddings and NL summaries -
+each with its own concurrency limit. A chunk is emitted to a bounded output
+queue as soon as both lanes are done with it, and a single writer flushes the
+queue to the database in fixed-size groups.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Optional, Union
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.embeddings import embeddings_service
+from app.services.llm import llm_service
+from app.workers.job_queue import job_queue
+
+settings = get_settings()
+
+ChunkSink = Callable[[list[dict[str, Any]]], Awaitable[Any]]
+
+
+def lane_concurrency(configured: int, rate_per_minute: int) -> int:
+    """
+    Concurrency for an API lane.
+
+    The configured value is capped by the per-second request rate derived
+    from the per-minute quota, so a lane never keeps more requests in flight
+    than the quota can sustain.
+    """
+    return max(1, min(configured, rate_per_minute // 60))
+
+
+def _log_progress(stage: str, done: int, total: Optional[int], started: float) -> None:
+    """Log stage progress with throughput in chunks per second."""
+    elapsed = max(time.monotonic() - started, 1e-6)
+    of_total = f"/{total}" if total is not None else ""
+    logger.info(f"{stage}: {done}{of_total} chunks ({done / elapsed:.1f} chunks/s)")
+
+
+async def embed_chunks(chunks: list[dict[str, Any]]) -> int:
+    """
+    Attach embeddings to chunks, sending only cache misses to the provider.
+
+    The whole group is looked up in the embedding cache at once. Misses are
+    embedded in token-budgeted batches of up to `embedding_batch_size`
+    texts, and each batch is written back to the cache in one pipeline. A
+    failed batch leaves its chunks with `embedding = None` without
+    affecting the other batches.
+
+    Returns:
+        Number of chunks embedded by the provider
+    """
+    if not chunks:
+        return 0
+
+    cache = embeddings_service.cache
+    text_hashes = [embeddings_service.compute_text_hash(c["chunk_text"]) for c in chunks]
+    cached = await cache.get_many(text_hashes)
+
+    misses: list[tuple[dict[str, Any], str]] = []
+    for chunk, text_hash, hit in zip(chunks, text_hashes, cached):
+        chunk["embedding"] = hit
+        if hit is None:
+            misses.append((chunk, text_hash))
+
+    if not misses:
+        return 0
+
+    texts = [chunk["chunk_text"] for chunk, _ in misses]
+    embedded = 0
+
+    for indices in embeddings_service.plan_batches(texts):
+        vectors = await embeddings_service.embed_batch_partial([texts[i] for i in indices])
+        fresh = {}
+        for i, vector in zip(indices, vectors):
+            if vector is None:
+                continue
+            chunk, text_hash = misses[i]
+            chunk["embedding"] = vector
+            fresh[text_hash] = vector
+            embedded += 1
+        await cache.set_many(fresh)
+
+    if embedded < len(texts):
+        logger.warning(f"{len(texts) - embedded} chunks left without embeddings")
+    return embedded
+
+
+async def summarize_chunk(chunk: dict[str, Any]) -> bool:
+    """
+    Attach an NL summary to a chunk, generating it only on a cache miss.
+
+    Returns:
+        True if the summary was generated by the LLM
+    """
+    cached_summary = await job_queue.get_cached_nl_summary(chunk["chunk_hash"])
+    if cached_summary:
+        chunk["nl_summary"] = cached_summary
+        return False
+
+    try:
+        summary = await llm_service.generate_code_summary(
+            chunk["chunk_text"],
+            chunk["language"],
+            chunk["file_path"],
+        )
+    except Exception as e:
+        logger.warning(f"NL summary generation failed: {e}")
+        chunk["nl_summary"] = None
+        return False
+
+    chunk["nl_summary"] = summary
+    await job_queue.cache_nl_summary(chunk["chunk_hash"], summary)
+    return True
+
+
+class _PendingChunk:
+    """A chunk waiting for its lanes to finish."""
+
+    __slots__ = ("chunk", "lanes_left")
+
+    def __init__(self, chunk: dict[str, Any], lanes_left: int):
+        self.chunk = chunk
+        self.lanes_left = lanes_left
+
+
+class ChunkEnrichmentPipeline:
+    """
+    Producer/consumer pipeline that embeds, summarizes and stores chunks.
+
+    - Embedding lane: chunks are grouped into provider batches of
+      `embedding_batch_size`; at most `embed_concurrency` batches in flight.
+    - Summary lane: one LLM call per chunk; at most `llm_concurrency` in flight.
+    - Output: finished chunks go to a bounded queue, flushed to `sink` in
+      groups of `flush_size`. The queue bound also caps chunks in flight, so
+      a slow sink applies backpressure to the producer.
+
+    Chunks that already carry an `embedding` (or `nl_summary`) skip that
+    lane; chunks that carry both go straight to the output queue and are
+    counted as `reused`.
+    """
+
+    def __init__(
+        self,
+        sink: ChunkSink,
+        embed_concurrency: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        flush_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        summarize: bool = True,
+    ):
+        self.sink = sink
+        self.embed_concurrency = embed_concurrency or lane_concurrency(
+            settings.indexing_embed_concurrency, settings.rate_limit_embeddings
+        )
+        self.llm_concurrency = llm_concurrency or lane_concurrency(
+            settings.indexing_llm_concurrency, settings.rate_limit_llm
+        )
+        self.embed_batch_size = embeddings_service.batch_size
+        self.flush_size = flush_size or settings.indexing_flush_size
+        # A pending embedding batch must fit in the queue, otherwise the
+        # producer would wait on chunks that are waiting on it
+        self.queue_size = max(queue_size or settings.indexing_queue_size, self.embed_batch_size)
+        self.summarize = summarize
+
+        self._embed_sem = asyncio.Semaphore(self.embed_concurrency)
+        self._llm_sem = asyncio.Semaphore(self.llm_concurrency)
+        self._stats = {"chunks": 0, "reused": 0, "embedded": 0, "summarized": 0, "written": 0}
+
+    async def run(
+        self, chunks: Union[Iterable[dict[str, Any]], AsyncIterable[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        """
+        Enrich and store all chunks.
+
+        Args:
+            chunks: Chunk dicts, as a plain or async iterable
+
+        Returns:
+            Pipeline statistics
+        """
+        started = time.monotonic()
+        out_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        in_flight = asyncio.Semaphore(self.queue_size)
+        writer = asyncio.create_task(self._writer(out_queue, started))
+        tasks: set[asyncio.Task] = set()
+
+        def spawn(coro) -> None:
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        embed_batch: list[_PendingChunk] = []
+
+        try:
+            async for chunk in _aiter(chunks):
+                await in_flight.acquire()
+                self._stats["chunks"] += 1
+
+                needs_embedding = chunk.get("embedding") is None
+                needs_summary = self.summarize and chunk.get("nl_summary") is None
+                if not (needs_embedding or needs_summary):
+                    self._stats["reused"] += 1
+                    await out_queue.put(chunk)
+                    in_flight.release()
+                    continue
+
+                pending = _PendingChunk(chunk, needs_embedding + needs_summary)
+                if needs_summary:
+                    spawn(self._summary_lane(pending, out_queue, in_flight))
+
+                if needs_embedding:
+                    embed_batch.append(pending)
+                    if len(embed_batch) >= self.embed_batch_size:
+                        spawn(self._embed_lane(embed_batch, out_queue, in_flight))
+                        embed_batch = []
+
+            if embed_batch:
+                spawn(self._embed_lane(embed_batch, out_queue, in_flight))
+
+            while tasks:
+                await asyncio.gather(*list(tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            writer.cancel()
+            raise
+
+        await out_queue.put(None)
+        error = await writer
+        if error:
+            raise error
+
+        elapsed = time.monotonic() - started
+        return {
+            **self._stats,
+            "elapsed_seconds": round(elapsed, 2),
+            "chunks_per_second": round(self._stats["chunks"] / max(elapsed, 1e-6), 1),
+        }
+
+    async def _embed_lane(
+        self,
+        batch: list[_PendingChunk],
+        out_queue: asyncio.Queue,
+        in_flight: asyncio.Semaphore,
+    ) -> None:
+        """Embed one provider batch of chunks."""
+        async with self._embed_sem:
+            try:
+                # Await first: `+= await` would read the counter before suspending
+                embedded = await embed_chunks([p.chunk for p in batch])
+                self._stats["embedded"] += embedded
+            except Exception as e:
+                logger.warning(f"Embedding lane failed for {len(batch)} chunks: {e}")
+                for pending in batch:
+                    pending.chunk.setdefault("embedding", None)
+        for pending in batch:
+            await self._lane_done(pending, out_queue, in_flight)
+
+    async def _summary_lane(
+        self,
+        pending: _PendingChunk,
+        out_queue: asyncio.Queue,
+        in_flight: asyncio.Semaphore,
+    ) -> None:
+        """Summarize one chunk."""
+        async with self._llm_sem:
+            try:
+                if await summarize_chunk(pending.chunk):
+                    self._stats["summarized"] += 1
+            except Exception as e:
+                logger.warning(f"Summary lane failed for {pending.chunk['file_path']}: {e}")
+                pending.chunk.setdefault("nl_summary", None)
+        await self._lane_done(pending, out_queue, in_flight)
+
+    @staticmethod
+    async def _lane_done(
+        pending: _PendingChunk, out_queue: asyncio.Queue, in_flight: asyncio.Semaphore
+    ) -> None:
+        """Emit the chunk once every lane has finished with it."""
+        pending.lanes_left -= 1
+        if pending.lanes_left == 0:
+            await out_queue.put(pending.chunk)
+            in_flight.release()
+
+    async def _writer(self, out_queue: asyncio.Queue, started: float) -> Optional[Exception]:
+        """
+        Drain the output queue, flushing to the sink in fixed-size groups.
+
+        After a sink failure the writer keeps draining (so producers never
+        block on a full queue) and returns the error for `run` to raise.
+        """
+        buffer: list[dict[str, Any]] = []
+        error: Optional[Exception] = None
+
+        async def flush() -> None:
+            nonlocal buffer, error
+            if buffer and error is None:
+                try:
+                    await self.sink(buffer)
+                    self._stats["written"] += len(buffer)
+                    _log_progress("Indexed", self._stats["written"], None, started)
+                except Exception as e:
+                    logger.error(f"Failed to flush {len(buffer)} chunks: {e}")
+                    error = e
+            buffer = []
+
+        while True:
+            chunk = await out_queue.get()
+            if chunk is None:
+                break
+            buffer.append(chunk)
+            if len(buffer) >= self.flush_size:
+                await flush()
+
+        await flush()
+        return error
+
+
+async def _aiter(chunks: Union[Iterable[Any], AsyncIterable[Any]]):
+    """Iterate a plain or async iterable asynchronously."""
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:  # type: ignore[union-attr]
+            yield chunk
+    else:
+        for chunk in chunks:  # type: ignore[union-attr]
+            yield chunk
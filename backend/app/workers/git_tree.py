@@ -0,0 +1,241 @@
+"""
+Read repository trees straight from a git object database.
+
+`git ls-tree -r -l` lists every file of a commit (path, blob SHA, size) in
+one call, and `git cat-file --batch` streams blob contents over a single
+pipe. Indexing therefore never needs a checkout, and unchanged files can
+be recognised by blob SHA without reading them at all.
+"""
+import re
+import subprocess
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from loguru import logger
+
+from app.core.exceptions import RepositoryCloneError
+
+# Directory names that hold vendored or generated code
+EXCLUDED_DIRS = frozenset(
+    {"node_modules", "vendor", "third_party", "bower_components", "site-packages", ".git"}
+)
+EXCLUDED_SUFFIXES = (".min.js",)
+
+
+class TreeEntry(NamedTuple):
+    """A file in a commit tree."""
+
+    path: str
+    blob_sha: str
+    size: int
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                body = pattern[i + 1 : end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class GitIgnore:
+    """
+    Matcher for the .gitignore files of a tree.
+
+    Supports comments, negation, directory-only and anchored patterns and
+    `**`. Later and deeper rules override earlier ones, as in git.
+    """
+
+    def __init__(self):
+        # (base directory, compiled pattern, negated, directory only)
+        self._rules: list[tuple[str, re.Pattern, bool, bool]] = []
+
+    def add(self, base: str, text: str) -> None:
+        """
+        Add the rules of one .gitignore file.
+
+        Args:
+            base: Directory containing the .gitignore ("" for the root)
+            text: File contents
+        """
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            # A slash anywhere but the end anchors the pattern to `base`
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = _translate_glob(line)
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            self._rules.append((base, re.compile(regex), negated, dir_only))
+
+    def is_ignored(self, path: str) -> bool:
+        """Check whether a file path (relative to the repo root) is ignored."""
+        ignored = False
+        for base, regex, negated, dir_only in self._rules:
+            if base:
+                if not path.startswith(base + "/"):
+                    continue
+                rel = path[len(base) + 1 :]
+            else:
+                rel = path
+
+            parts = rel.split("/")
+            # A rule matching any parent directory ignores everything below it
+            targets = ["/".join(parts[:i]) for i in range(1, len(parts))]
+            if not dir_only:
+                targets.append(rel)
+            if any(regex.fullmatch(t) for t in targets):
+                ignored = not negated
+        return ignored
+
+
+def _git(git_dir: Path, *args: str) -> bytes:
+    """Run a git command against git_dir and return raw stdout."""
+    try:
+        result = subprocess.run(
+            ["git", f"--git-dir={git_dir}", *args],
+            check=True, capture_output=True, timeout=300,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        stderr = (getattr(e, "stderr", None) or b"").decode("utf-8", "replace")
+        raise RepositoryCloneError(f"git {args[0]} failed: {stderr.strip() or e}") from e
+    return result.stdout
+
+
+def list_source_files(
+    git_dir: Path,
+    commit_sha: str,
+    extensions: Iterable[str],
+    max_size: Optional[int] = None,
+) -> dict[str, TreeEntry]:
+    """
+    List the indexable files of a commit in a single tree walk.
+
+    Skips files without one of `extensions`, files under vendored or
+    `node_modules` directories, files matched by the tree's .gitignore
+    files, symlinks, submodules and (if given) files larger than
+    `max_size` bytes.
+
+    Returns:
+        Tree entries keyed by path
+    """
+    extensions = tuple(extensions)
+    candidates: list[TreeEntry] = []
+    gitignores: list[TreeEntry] = []
+
+    output = _git(git_dir, "ls-tree", "-r", "-l", "-z", "--full-tree", commit_sha)
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, _, raw_path = record.partition(b"\t")
+        mode, obj_type, blob_sha, size = meta.split()
+        # Regular files only: no symlinks (120000) or submodules (commit)
+        if obj_type != b"blob" or mode not in (b"100644", b"100755"):
+            continue
+
+        path = raw_path.decode("utf-8", "surrogateescape")
+        entry = TreeEntry(path, blob_sha.decode(), int(size))
+        parts = path.split("/")
+
+        if EXCLUDED_DIRS.intersection(parts[:-1]):
+            continue
+        if parts[-1] == ".gitignore":
+            gitignores.append(entry)
+        elif path.endswith(extensions) and not path.endswith(EXCLUDED_SUFFIXES):
+            if max_size is not None and entry.size > max_size:
+                logger.warning(f"Skipping large file: {path}")
+                continue
+            candidates.append(entry)
+
+    ignore = GitIgnore()
+    # Root rules first so that deeper .gitignore files override them
+    gitignores.sort(key=lambda e: e.path.count("/"))
+    for entry, data in iter_blobs(git_dir, gitignores):
+        base = str(PurePosixPath(entry.path).parent)
+        ignore.add("" if base == "." else base, data.decode("utf-8", "replace"))
+
+    return {e.path: e for e in candidates if not ignore.is_ignored(e.path)}
+
+
+def iter_blobs(git_dir: Path, entries: list[TreeEntry]) -> Iterator[tuple[TreeEntry, bytes]]:
+    """
+    Stream blob contents for tree entries through one `git cat-file --batch`.
+
+    Requests are written from a helper thread so large outputs never
+    deadlock the pipe. Missing objects are skipped.
+    """
+    if not entries:
+        return
+
+    proc = subprocess.Popen(
+        ["git", f"--git-dir={git_dir}", "cat-file", "--batch"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    def feed() -> None:
+        try:
+            for entry in entries:
+                proc.stdin.write(f"{entry.blob_sha}\n".encode())
+            proc.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+
+    try:
+        for entry in entries:
+            header = proc.stdout.readline().split()
+            if len(header) < 3:
+                if not header:
+                    raise RepositoryCloneError("git cat-file exited early")
+                logger.warning(f"Blob {entry.blob_sha} for {entry.path} is missing")
+                continue
+            data = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # trailing newline
+            yield entry, data
+    finally:
+        proc.kill()
+        proc.wait()
+        writer.join(timeout=1)
@@ -1,7 +1,6 @@
 """
 Job queue management using Redis and RQ.
 """
-import json
 from typing import Any, Optional
 from uuid import UUID
 
@@ -20,30 +19,6 @@ class JobQueue:
 
     # (Duplicate __init__ and related methods removed)
 
-    async def get_cached_embedding(self, text_hash: str) -> Optional[Any]:
-        """Get cached embedding from Redis."""
-        if self.async_redis is None:
-            await self.connect_async()
-        key = f"embedding:{text_hash}"
-        if self.async_redis is None:
-            raise RuntimeError("Redis client not initialized")
-        value = await self.async_redis.get(key)
-        if value is not None:
-            try:
-                return json.loads(value)
-            except Exception:
-                return value
-        return None
-
-    async def cache_embedding(self, text_hash: str, embedding: Any) -> None:
-        """Cache embedding in Redis."""
-        if self.async_redis is None:
-            await self.connect_async()
-        key = f"embedding:{text_hash}"
-        if self.async_redis is None:
-            raise RuntimeError("Redis client not initialized")
-        await self.async_redis.set(key, json.dumps(embedding), ex=604800)
-
     async def get_cached_nl_summary(self, chunk_hash: str) -> Optional[str]:
         """Get cached NL summary from Redis."""
         if self.async_redis is None:
@@ -132,11 +107,54 @@ class JobQueue:
         logger.info(f"Enqueued indexing job {job.id} for {full_name}")
         return job.id
 
+    def enqueue_reindex_job(
+        self,
+        repo_id: UUID,
+        installation_id: int,
+        full_name: str,
+        commit_sha: Optional[str] = None,
+        changed_files: Optional[list[str]] = None,
+        removed_files: Optional[list[str]] = None,
+        oauth_token: Optional[str] = None,
+    ) -> str:
+        """
+        Enqueue incremental re-indexing job.
+        Args:
+            repo_id: Repository UUID
+            installation_id: GitHub installation ID
+            full_name: Repository full name (owner/repo)
+            commit_sha: Commit to index
+            changed_files: Added/modified paths (None = compare the whole tree by file_hash)
+            removed_files: Deleted paths
+            oauth_token: GitHub OAuth token (for user repos when installation_id=0)
+        Returns:
+            Job ID
+        """
+        from app.workers.indexing_worker import reindex_changed_files
+
+        job = self.queue.enqueue(
+            reindex_changed_files,
+            repo_id=str(repo_id),
+            installation_id=installation_id,
+            full_name=full_name,
+            commit_sha=commit_sha,
+            changed_files=changed_files,
+            removed_files=removed_files,
+            oauth_token=oauth_token,
+            job_timeout=settings.job_timeout,
+            result_ttl=86400,
+            failure_ttl=604800,
+        )
+
+        logger.info(f"Enqueued re-indexing job {job.id} for {full_name}")
+        return job.id
+
     def enqueue_analysis_job(
         self,
         scan_id: UUID,
         repo_id: UUID,
         rule_ids: Optional[list[str]] = None,
+        concurrency: Optional[int] = None,
     ) -> str:
         """
         Enqueue compliance analysis job.
@@ -144,6 +162,7 @@ class JobQueue:
             scan_id: Scan UUID
             repo_id: Repository UUID
             rule_ids: Specific rules to check (None = all rules)
+            concurrency: LLM calls in flight (None = `analysis_llm_concurrency`)
         Returns:
             Job ID
         """
@@ -154,6 +173,7 @@ class JobQueue:
             scan_id=str(scan_id),
             repo_id=str(repo_id),
             rule_ids=rule_ids,
+            concurrency=concurrency,
             job_timeout=settings.job_timeout,
             result_ttl=86400,
         )
@@ -161,6 +181,26 @@ class JobQueue:
         logger.info(f"Enqueued analysis job {job.id} for scan {scan_id}")
         return job.id
 
+    def enqueue_vector_index_job(self, repo_id: Optional[UUID] = None) -> str:
+        """
+        Enqueue a concurrent build of code_map vector indexes.
+        Args:
+            repo_id: Repository whose partial index to build (None = all indexes)
+        Returns:
+            Job ID
+        """
+        from app.workers.vector_indexes import build_vector_indexes
+
+        job = self.queue.enqueue(
+            build_vector_indexes,
+            repo_id=str(repo_id) if repo_id else None,
+            job_timeout=settings.job_timeout,
+            result_ttl=86400,
+        )
+
+        logger.info(f"Enqueued vector index job {job.id} for repo {repo_id or 'all'}")
+        return job.id
+
     def get_job_status(self, job_id: str) -> dict[str, Any]:
         """Get job status from RQ."""
         from rq.job import Job
@@ -0,0 +1,184 @@
+"""
+HNSW vector indexes for code_map, including per-repository partial indexes.
+
+A global ANN index serves `WHERE repo_id = $2` searches by scanning
+neighbours from every tenant and filtering afterwards, which loses recall
+and latency as the table grows. Repositories with at least
+`vector_repo_index_min_chunks` chunks therefore get their own partial HNSW
+index (`WHERE repo_id = '<uuid>'`), so their searches only walk their own
+vectors. Repository searches without a valid partial index (smaller
+repositories, or one whose index is still being built) are exact scans of
+their rows through idx_code_map_repo (see `set_vector_search_params`); the
+global index only serves searches across all repositories.
+
+All indexes are built with CREATE INDEX CONCURRENTLY, which does not block
+the inserts and updates of running indexing jobs.
+"""
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import db
+from app.models.database import REPO_VECTOR_INDEX_PREFIX, repo_vector_index_name
+
+settings = get_settings()
+
+GLOBAL_INDEX = "idx_code_map_embedding_hnsw"
+LEGACY_INDEX = "idx_code_map_embedding"  # IVFFlat, replaced by GLOBAL_INDEX
+
+
+def _hnsw_definition(name: str, where: Optional[str] = None) -> str:
+    """CREATE INDEX CONCURRENTLY statement for an HNSW cosine index on code_map."""
+    statement = (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON code_map USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {settings.vector_hnsw_m}, ef_construction = {settings.vector_hnsw_ef_construction})"
+    )
+    if where:
+        statement += f" WHERE {where}"
+    return statement
+
+
+async def _index_state(conn, name: str) -> Optional[bool]:
+    """True if the index exists and is valid, False if invalid, None if missing."""
+    return await conn.fetchval(
+        """
+        SELECT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = $1
+        """,
+        name,
+    )
+
+
+async def _build(conn, name: str, statement: str) -> bool:
+    """
+    Build an index concurrently unless a valid one already exists.
+
+    A concurrent build that failed part-way leaves an INVALID index behind,
+    which IF NOT EXISTS would keep forever; it is dropped and rebuilt.
+
+    Returns:
+        True if the index was built
+    """
+    state = await _index_state(conn, name)
+    if state:
+        return False
+    if state is False:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    logger.info(f"Building {name}")
+    # Must run outside a transaction block, and outlasts the pool's command_timeout
+    await conn.execute(statement, timeout=settings.job_timeout)
+    return True
+
+
+async def migrate_global_index(conn) -> bool:
+    """
+    Replace the global IVFFlat index on code_map with an HNSW one.
+
+    The HNSW index is built before the IVFFlat index is dropped, so
+    searches keep an index throughout.
+
+    Returns:
+        True if the HNSW index was built
+    """
+    built = await _build(conn, GLOBAL_INDEX, _hnsw_definition(GLOBAL_INDEX))
+    if await _index_state(conn, LEGACY_INDEX) is not None:
+        logger.info(f"Dropping IVFFlat index {LEGACY_INDEX}")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {LEGACY_INDEX}")
+    return built
+
+
+async def ensure_repo_index(conn, repo_id: UUID) -> bool:
+    """
+    Build a repository's partial HNSW index if it does not exist.
+
+    Returns:
+        True if the index was built
+    """
+    repo_id = UUID(str(repo_id))  # DDL cannot take parameters; only ever interpolate a UUID
+    name = repo_vector_index_name(repo_id)
+    return await _build(conn, name, _hnsw_definition(name, where=f"repo_id = '{repo_id}'"))
+
+
+async def sync_repo_indexes(conn, min_chunks: Optional[int] = None) -> dict[str, int]:
+    """
+    Give every large repository a partial index and drop stale ones.
+
+    Indexes of repositories that were deleted or shrank below `min_chunks`
+    are dropped.
+
+    Args:
+        min_chunks: Chunk count that earns a partial index (default
+            `vector_repo_index_min_chunks`)
+
+    Returns:
+        Counts of indexes built and dropped
+    """
+    min_chunks = min_chunks or settings.vector_repo_index_min_chunks
+    large = {
+        record["repo_id"]
+        for record in await conn.fetch(
+            "SELECT repo_id FROM repos WHERE total_chunks >= $1", min_chunks
+        )
+    }
+    existing = {
+        record["relname"]
+        for record in await conn.fetch(
+            """
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'code_map'::regclass AND c.relname LIKE $1
+            """,
+            REPO_VECTOR_INDEX_PREFIX + "%",
+        )
+    }
+
+    built = 0
+    for repo_id in sorted(large, key=str):
+        if await ensure_repo_index(conn, repo_id):
+            built += 1
+
+    wanted = {repo_vector_index_name(repo_id) for repo_id in large}
+    stale = sorted(existing - wanted)
+    for name in stale:
+        logger.info(f"Dropping stale partial index {name}")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    return {"built": built, "dropped": len(stale)}
+
+
+async def _async_build_vector_indexes(repo_id: Optional[str]) -> dict:
+    """Async implementation of the vector index job."""
+    try:
+        await db.connect()
+        async with db.acquire() as conn:
+            if repo_id:
+                built = await ensure_repo_index(conn, UUID(repo_id))
+                return {"status": "success", "repo_id": repo_id, "built": int(built)}
+            await migrate_global_index(conn)
+            counts = await sync_repo_indexes(conn)
+            return {"status": "success", **counts}
+    except Exception as e:
+        logger.error(f"Vector index build failed: {e}")
+        return {"status": "failed", "repo_id": repo_id, "error": str(e)}
+
+
+def build_vector_indexes(repo_id: Optional[str] = None) -> dict:
+    """
+    RQ job: Build code_map vector indexes concurrently.
+
+    Args:
+        repo_id: Build this repository's partial index; None migrates the
+            global index and syncs every repository's partial index
+
+    Returns:
+        Job result dictionary
+    """
+    return asyncio.run(_async_build_vector_indexes(repo_id))
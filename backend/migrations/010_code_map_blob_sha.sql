@@ -0,0 +1,7 @@
+-- Track the git blob SHA of each indexed file so re-indexing can skip
+-- unchanged files straight from `git ls-tree` without reading them
+ALTER TABLE code_map ADD COLUMN IF NOT EXISTS blob_sha VARCHAR(40);
+
+CREATE INDEX IF NOT EXISTS idx_code_map_repo_file ON code_map(repo_id, file_path);
+
+COMMENT ON COLUMN code_map.blob_sha IS 'Git blob SHA of the file the chunk came from';
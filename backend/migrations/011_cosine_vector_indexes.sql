@@ -0,0 +1,6 @@
+-- Every vector query uses cosine distance (<=>), but regulation_chunks was
+-- indexed with vector_l2_ops, so its nearest-neighbour searches could never
+-- use the index. Rebuild it with the cosine opclass used by code_map.
+DROP INDEX IF EXISTS idx_regulation_embedding;
+CREATE INDEX IF NOT EXISTS idx_regulation_embedding
+    ON regulation_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
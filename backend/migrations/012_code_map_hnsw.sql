@@ -0,0 +1,19 @@
+-- Move code_map from the global IVFFlat index to HNSW.
+--
+-- Building an HNSW index over a populated table takes a long time and a
+-- plain CREATE INDEX blocks writes for all of it, so this migration only
+-- builds the index while code_map is empty (fresh installs). Existing
+-- installs build it, and the per-repository partial indexes, with
+-- CREATE INDEX CONCURRENTLY by running:
+--
+--     python scripts/backfill_vector_indexes.py
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM code_map LIMIT 1) THEN
+        CREATE INDEX IF NOT EXISTS idx_code_map_embedding_hnsw
+            ON code_map USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+        DROP INDEX IF EXISTS idx_code_map_embedding;
+    ELSE
+        RAISE NOTICE 'code_map has rows: run scripts/backfill_vector_indexes.py to build HNSW indexes concurrently';
+    END IF;
+END $$;
@@ -0,0 +1,55 @@
+-- Unlogged staging tables for COPY-based bulk loads (see copy_upsert in
+-- app/models/database.py). Rows are streamed in with COPY, merged into the
+-- target with one INSERT ... SELECT ... ON CONFLICT and deleted again in the
+-- same transaction, tagged by batch_id so concurrent loaders can share them.
+-- Unlogged: staged rows never reach the WAL and are never needed after a crash.
+CREATE UNLOGGED TABLE IF NOT EXISTS code_map_staging (
+    batch_id UUID NOT NULL,
+    seq INTEGER NOT NULL,
+    repo_id UUID,
+    file_path TEXT,
+    language VARCHAR(50),
+    start_line INTEGER,
+    end_line INTEGER,
+    chunk_text TEXT,
+    ast_node_type VARCHAR(50),
+    file_hash VARCHAR(64),
+    chunk_hash VARCHAR(64),
+    embedding vector(1536),
+    nl_summary TEXT,
+    metadata JSONB,
+    call_links JSONB,
+    variables JSONB,
+    config_keys JSONB,
+    semantic_tags JSONB,
+    previous_hash VARCHAR(64),
+    delta_type VARCHAR(20),
+    blob_sha VARCHAR(40)
+);
+
+CREATE INDEX IF NOT EXISTS idx_code_map_staging_batch ON code_map_staging(batch_id);
+
+CREATE UNLOGGED TABLE IF NOT EXISTS regulation_chunks_staging (
+    batch_id UUID NOT NULL,
+    seq INTEGER NOT NULL,
+    rule_id VARCHAR(255),
+    rule_section VARCHAR(500),
+    source_document VARCHAR(500),
+    chunk_text TEXT,
+    chunk_index INTEGER,
+    chunk_hash VARCHAR(64),
+    embedding vector(1536),
+    nl_summary TEXT,
+    metadata JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_regulation_chunks_staging_batch ON regulation_chunks_staging(batch_id);
+
+-- The regulation loaders upsert ON CONFLICT (chunk_hash), which needs a
+-- unique index; keep the most recently updated copy of any duplicate first.
+DELETE FROM regulation_chunks a
+USING regulation_chunks b
+WHERE a.chunk_hash = b.chunk_hash
+  AND (a.updated_at, a.ctid) < (b.updated_at, b.ctid);
+
+CREATE UNIQUE INDEX IF NOT EXISTS regulation_chunks_chunk_hash_unique ON regulation_chunks(chunk_hash);
@@ -0,0 +1,63 @@
+-- Content-addressed chunk storage.
+--
+-- code_map had a global UNIQUE (chunk_hash), so identical code in two
+-- repositories (forks, vendored libraries) - or in two files of one - kept a
+-- single row that each re-index overwrote. The text, embedding and summary of
+-- each distinct chunk now live once in chunk_content, and code_map holds one
+-- row per occurrence, unique per (repo_id, file_path, chunk_hash).
+--
+-- code_map keeps a copy of the embedding: repository-filtered nearest
+-- neighbour searches need the vector on the row that carries repo_id to use
+-- the per-repository partial HNSW indexes. Text and summaries are therefore
+-- stored per unique chunk, but vector storage still grows with occurrences.
+-- The copy is only ever overwritten by a non-NULL embedding.
+CREATE TABLE IF NOT EXISTS chunk_content (
+    chunk_hash VARCHAR(64) PRIMARY KEY,
+    chunk_text TEXT NOT NULL,
+    embedding vector(1536),
+    nl_summary TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE UNLOGGED TABLE IF NOT EXISTS chunk_content_staging (
+    batch_id UUID NOT NULL,
+    seq INTEGER NOT NULL,
+    chunk_hash VARCHAR(64),
+    chunk_text TEXT,
+    embedding vector(1536),
+    nl_summary TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunk_content_staging_batch ON chunk_content_staging(batch_id);
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'code_map' AND column_name = 'chunk_text'
+    ) THEN
+        INSERT INTO chunk_content (chunk_hash, chunk_text, embedding, nl_summary)
+        SELECT DISTINCT ON (chunk_hash) chunk_hash, chunk_text, embedding, nl_summary
+        FROM code_map
+        ORDER BY chunk_hash, updated_at DESC
+        ON CONFLICT (chunk_hash) DO NOTHING;
+
+        ALTER TABLE code_map DROP COLUMN chunk_text;
+        ALTER TABLE code_map DROP COLUMN nl_summary;
+        ALTER TABLE code_map_staging DROP COLUMN IF EXISTS chunk_text;
+        ALTER TABLE code_map_staging DROP COLUMN IF EXISTS nl_summary;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'code_map_occurrence_unique'
+        AND conrelid = 'code_map'::regclass
+    ) THEN
+        ALTER TABLE code_map DROP CONSTRAINT IF EXISTS code_map_chunk_hash_unique;
+        ALTER TABLE code_map ADD CONSTRAINT code_map_occurrence_unique
+            UNIQUE (repo_id, file_path, chunk_hash);
+        ALTER TABLE code_map ADD CONSTRAINT code_map_chunk_content_fk
+            FOREIGN KEY (chunk_hash) REFERENCES chunk_content(chunk_hash);
+    END IF;
+END $$;
@@ -0,0 +1,16 @@
+-- Durable tier of the LLM verdict cache (app/services/verdict_cache.py).
+-- A verdict is content-addressed: the same model, prompt template version,
+-- rule text and code text always map to the same row, whichever repository,
+-- file or scan produced it. Hashes are SHA-256 hex digests; code_hash covers
+-- the code and its language.
+CREATE TABLE IF NOT EXISTS compliance_verdicts (
+    model VARCHAR(100) NOT NULL,
+    prompt_version VARCHAR(32) NOT NULL,
+    rule_hash VARCHAR(64) NOT NULL,
+    code_hash VARCHAR(64) NOT NULL,
+    verdict JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (model, prompt_version, rule_hash, code_hash)
+);
+
+CREATE INDEX IF NOT EXISTS idx_compliance_verdicts_created ON compliance_verdicts(created_at);
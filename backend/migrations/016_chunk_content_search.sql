@@ -0,0 +1,22 @@
+-- Full-text search over chunk text and summaries, for hybrid (lexical +
+-- vector) retrieval (see CodeMapQueries.search_hybrid_many).
+--
+-- The 'simple' configuration neither stems nor drops stopwords, so exact
+-- identifiers such as kyc, pan or aadhaar are indexed as written. The code
+-- is indexed twice, as is and with camelCase split into words, and the
+-- default parser already splits snake_case: MAX_TXN_LIMIT and
+-- panNumber are found by max, txn, limit, pan and number.
+-- Code terms weigh more (A) than summary terms (B) in ts_rank_cd.
+ALTER TABLE chunk_content ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        setweight(
+            to_tsvector(
+                'simple',
+                chunk_text || ' ' || regexp_replace(chunk_text, '([a-z0-9])([A-Z])', '\1 \2', 'g')
+            ),
+            'A'
+        )
+        || setweight(to_tsvector('simple', COALESCE(nl_summary, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chunk_content_search ON chunk_content USING GIN (search_tsv);
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Build code_map HNSW indexes without blocking indexing jobs.
+
+This script:
+1. Builds the global HNSW index and drops the old IVFFlat index
+2. Builds a partial HNSW index for every repository with at least
+   --min-chunks chunks, and drops partial indexes that are no longer needed
+
+Every index is built with CREATE INDEX CONCURRENTLY, so it can run while
+workers keep writing to code_map. Re-running it only builds what is missing.
+
+Usage:
+    python scripts/backfill_vector_indexes.py [--min-chunks 20000] [--repo <repo_id>]
+"""
+import argparse
+import asyncio
+from uuid import UUID
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import db
+from app.workers.vector_indexes import ensure_repo_index, migrate_global_index, sync_repo_indexes
+
+settings = get_settings()
+
+
+async def backfill(min_chunks: int, repo_id: UUID | None) -> None:
+    """Build the requested indexes."""
+    await db.connect()
+    try:
+        async with db.acquire() as conn:
+            if repo_id:
+                built = await ensure_repo_index(conn, repo_id)
+                logger.info(f"Partial index for {repo_id}: {'built' if built else 'already present'}")
+                return
+
+            await migrate_global_index(conn)
+            counts = await sync_repo_indexes(conn, min_chunks)
+            logger.info(f"Partial indexes built: {counts['built']}, dropped: {counts['dropped']}")
+    finally:
+        await db.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-chunks", type=int, default=settings.vector_repo_index_min_chunks)
+    parser.add_argument("--repo", type=UUID, default=None, help="Only build this repository's index")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.min_chunks, args.repo))
+
+
+if __name__ == "__main__":
+    main()
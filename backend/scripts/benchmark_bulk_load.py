@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Benchmark code_map bulk loading against the configured database.
+
+Compares the executemany upsert (`CodeMapQueries.insert_batch`, one
+INSERT ... ON CONFLICT per row) with the COPY loader
+(`CodeMapQueries.bulk_upsert`, binary COPY into the staging tables plus
+one set-based upsert per flush). Both also store the chunks' content.
+
+Each loader writes the same generated chunks twice: first into an empty
+repository (all inserts), then again (all conflicts, i.e. re-indexing
+unchanged code). Chunks are handed over in groups of --group, the size
+of the indexing pipeline's flushes.
+
+The chunks belong to a throwaway installation and repository, which are
+deleted (with their chunks and content) when the benchmark finishes.
+
+Usage:
+    python scripts/benchmark_bulk_load.py [--chunks 20000] [--group 200]
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+from uuid import UUID
+
+import numpy as np
+
+from app.config import get_settings
+from app.database import db
+from app.models.database import ChunkContentQueries, CodeMapQueries
+
+settings = get_settings()
+
+# Outside the range of real GitHub ids
+BENCH_INSTALLATION_ID = -4242
+BENCH_GITHUB_ID = -4242
+
+
+def generate_chunks(repo_id: UUID, count: int) -> list[dict]:
+    """Generate chunks shaped like the indexer's, with random embeddings."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(count, settings.embedding_dimension)).astype(np.float32)
+    chunks = []
+    for i in range(count):
+        text = f"def handler_{i}(request):\n    return process(request, limit={i % 1000})\n"
+        chunks.append(
+            {
+                "repo_id": repo_id,
+                "file_path": f"src/module_{i // 50}.py",
+                "language": "python",
+                "start_line": (i % 50) * 3 + 1,
+                "end_line": (i % 50) * 3 + 3,
+                "chunk_text": text,
+                "ast_node_type": "function_definition",
+                "file_hash": hashlib.sha256(f"file-{i // 50}".encode()).hexdigest(),
+                "chunk_hash": hashlib.sha256(f"bench-{i}".encode()).hexdigest(),
+                "embedding": embeddings[i],
+                "nl_summary": f"Handles request {i}",
+                "metadata": {"name": f"handler_{i}"},
+                "call_links": ["process"],
+                "variables": {"limit": i % 1000},
+                "config_keys": {},
+                "semantic_tags": ["request_handling"],
+                "delta_type": "added",
+                "blob_sha": hashlib.sha1(f"blob-{i // 50}".encode()).hexdigest(),
+            }
+        )
+    return chunks
+
+
+async def load(loader, chunks: list[dict], group: int) -> float:
+    """Seconds taken to load all chunks in groups through a loader."""
+    started = time.perf_counter()
+    for start in range(0, len(chunks), group):
+        async with db.acquire() as conn:
+            await loader(conn, chunks[start:start + group])
+    return time.perf_counter() - started
+
+
+async def run(count: int, group: int) -> None:
+    await db.connect()
+    try:
+        async with db.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO installations (installation_id, account_id, account_login, app_id, target_type)
+                VALUES ($1, $1, 'bulk-load-benchmark', 0, 'User')
+                ON CONFLICT (installation_id) DO NOTHING
+                """,
+                BENCH_INSTALLATION_ID,
+            )
+            repo_id = await conn.fetchval(
+                """
+                INSERT INTO repos (installation_id, github_id, repo_name, full_name)
+                VALUES ($1, $2, 'bulk-load-benchmark', 'bench/bulk-load-benchmark')
+                ON CONFLICT (github_id) DO UPDATE SET updated_at = NOW()
+                RETURNING repo_id
+                """,
+                BENCH_INSTALLATION_ID,
+                BENCH_GITHUB_ID,
+            )
+        chunks = generate_chunks(repo_id, count)
+
+        print(f"{count} chunks in groups of {group}:")
+        for name, loader in (
+            ("executemany", CodeMapQueries.insert_batch),
+            ("copy", CodeMapQueries.bulk_upsert),
+        ):
+            async with db.acquire() as conn:
+                await conn.execute("DELETE FROM code_map WHERE repo_id = $1", repo_id)
+                await ChunkContentQueries.prune(conn)
+            insert_time = await load(loader, chunks, group)
+            upsert_time = await load(loader, chunks, group)
+            print(
+                f"{name:>12}: insert {insert_time:8.2f}s ({count / insert_time:8.0f} chunks/s)  "
+                f"re-upsert {upsert_time:8.2f}s ({count / upsert_time:8.0f} chunks/s)"
+            )
+    finally:
+        async with db.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM installations WHERE installation_id = $1", BENCH_INSTALLATION_ID
+            )
+            await ChunkContentQueries.prune(conn)
+        await db.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--group", type=int, default=settings.indexing_flush_size)
+    args = parser.parse_args()
+    asyncio.run(run(args.chunks, args.group))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark Python chunk extraction on large generated modules.
+
+Compares the single-pass AST extractor in CodeParser with the previous
+indentation-scanning extractor, which rescanned the rest of the file for
+every def/class and re-parsed every chunk.
+
+Two module shapes are measured: "wide" (many classes and methods, shallow
+nesting) and "deep" (functions nested dozens of levels, where the forward
+scan is quadratic in the nesting depth).
+
+Usage:
+    python scripts/benchmark_chunk_extraction.py [--classes 200] [--methods 20] [--depth 4]
+"""
+import argparse
+import re
+import time
+
+from app.services.code_parser import (
+    code_parser,
+    detect_function_calls,
+    extract_constants_from_code,
+    find_hardcoded_thresholds,
+)
+
+
+def generate_module(classes: int, methods: int, depth: int) -> str:
+    """Generate a module with classes, methods and nested helper functions."""
+    out = ["MAX_RETRIES = 3", ""]
+    for c in range(classes):
+        out.append(f"class Service{c}:")
+        out.append(f'    """Service {c}."""')
+        for m in range(methods):
+            indent = "    "
+            out.append(f"{indent}def method_{m}(self, amount):")
+            for d in range(depth):
+                indent += "    "
+                out.append(f"{indent}limit_{d} = {d * 100}")
+                out.append(f"{indent}def helper_{d}(value):")
+            indent += "    "
+            out.append(f"{indent}return validate(value) and audit(amount)")
+            out.append("")
+        out.append("")
+    return "\n".join(out)
+
+
+def legacy_extract(content: str) -> list[dict]:
+    """The previous extractor: forward indentation scan plus per-chunk ast.parse."""
+    chunks = []
+    pattern = r"^(class|def|async def)\s+(\w+)"
+    lines = content.split("\n")
+    for i, line in enumerate(lines):
+        match = re.match(pattern, line.strip())
+        if match:
+            start_line = i + 1
+            end_line = start_line
+            base_indent = len(line) - len(line.lstrip())
+            for j in range(i + 1, len(lines)):
+                if lines[j].strip() and not lines[j].strip().startswith("#"):
+                    current_indent = len(lines[j]) - len(lines[j].lstrip())
+                    if current_indent <= base_indent:
+                        end_line = j
+                        break
+            else:
+                end_line = len(lines)
+            chunk_text = "\n".join(lines[i:end_line])
+            call_links = list({c for calls in detect_function_calls(chunk_text).values() for c in calls})
+            variables = extract_constants_from_code(chunk_text)
+            chunks.append(
+                {
+                    "name": match.group(2),
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "text": chunk_text,
+                    "call_links": call_links,
+                    "variables": variables,
+                    "config_keys": find_hardcoded_thresholds(variables),
+                }
+            )
+    return chunks
+
+
+def timed(fn, *args, repeat: int = 3) -> tuple[float, list]:
+    """Best wall-clock time of `repeat` runs."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--methods", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=4)
+    args = parser.parse_args()
+
+    profiles = [
+        ("wide", args.classes, args.methods, args.depth),
+        ("deep", max(1, args.classes // 25), max(1, args.methods // 2), 60),
+    ]
+    for shape, classes, methods, depth in profiles:
+        for scale in (4, 2, 1):
+            content = generate_module(max(1, classes // scale), methods, depth)
+            line_count = content.count("\n") + 1
+
+            legacy_time, legacy_chunks = timed(legacy_extract, content, repeat=1)
+            new_time, new_chunks = timed(code_parser.extract_functions_fallback, content, "python")
+
+            same_chunks = [(c["start_line"], c["end_line"], c["text"]) for c in legacy_chunks] == [
+                (c["start_line"], c["end_line"], c["text"]) for c in new_chunks
+            ]
+            print(
+                f"{shape:>4} {line_count:>8} lines, {len(new_chunks):>6} chunks: "
+                f"legacy {legacy_time:8.3f}s  single-pass {new_time:7.3f}s  "
+                f"speedup {legacy_time / new_time:6.1f}x  identical chunks: {same_chunks}"
+            )
+
+
+if __name__ == "__main__":
+    main()
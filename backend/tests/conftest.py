@@ -2,14 +2,16 @@
 Pytest configuration and fixtures.
 """
 import asyncio
+import os
 from typing import AsyncGenerator, Generator
 
 import pytest
 import pytest_asyncio
+from asyncpg import create_pool
 from httpx import AsyncClient
 
 from app.config import get_settings
-from app.database import db
+from app.database import Database, db
 from app.main import app
 
 settings = get_settings()
@@ -38,6 +40,23 @@ async def test_db():
     await db.disconnect()
 
 
+@pytest_asyncio.fixture
+async def test_pool():
+    """
+    Pool on the migrated, disposable database at TEST_DATABASE_URL.
+
+    Tests using it are skipped unless that variable is set, so they never
+    touch the database configured for the app.
+    """
+    test_db_url = os.environ.get("TEST_DATABASE_URL")
+    if not test_db_url:
+        pytest.skip("set TEST_DATABASE_URL to run database tests")
+
+    pool = await create_pool(test_db_url, min_size=1, max_size=2, init=Database._init_connection)
+    yield pool
+    await pool.close()
+
+
 @pytest_asyncio.fixture
 async def client() -> AsyncGenerator[AsyncClient, None]:
     """Test client fixture."""
@@ -0,0 +1,112 @@
+"""
+Tests for COPY-based bulk loading and shared chunk content.
+"""
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.models.database import (
+    ChunkContentQueries,
+    CodeMapQueries,
+    RegulationChunkQueries,
+    copy_upsert,
+)
+
+
+def _conn():
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.copy_records_to_table = AsyncMock()
+    conn.execute = AsyncMock()
+    return conn
+
+
+def _chunk(repo_id, i):
+    return {
+        "repo_id": repo_id,
+        "file_path": "src/app.py",
+        "language": "python",
+        "start_line": i,
+        "end_line": i + 1,
+        "chunk_text": f"x = {i}",
+        "file_hash": "f" * 64,
+        "chunk_hash": f"{i:064x}",
+        "embedding": [0.1, 0.2],
+        "variables": {"x": i},
+    }
+
+
+@pytest.mark.asyncio
+async def test_copy_upsert_copies_each_flush_then_merges():
+    """Test every flush is one COPY, one set-based upsert and a staging cleanup."""
+    conn = _conn()
+    rows = [(f"{i:064x}", f"x = {i}", None, None) for i in range(5)]
+
+    count = await copy_upsert(
+        conn, "chunk_content", ChunkContentQueries.INSERT_COLUMNS, rows,
+        conflict_columns=("chunk_hash",), update_columns=(), fill_columns=("embedding",),
+        flush_size=2,
+    )
+
+    assert count == 5
+    assert conn.transaction.call_count == 3
+    assert conn.copy_records_to_table.await_count == 3
+
+    (table,), kwargs = conn.copy_records_to_table.await_args_list[0]
+    assert table == "chunk_content_staging"
+    assert kwargs["columns"] == ["batch_id", "seq", *ChunkContentQueries.INSERT_COLUMNS]
+    batch_id = kwargs["records"][0][0]
+    assert [record[1:] for record in kwargs["records"]] == [(0, *rows[0]), (1, *rows[1])]
+
+    merge, delete = conn.execute.await_args_list[:2]
+    assert "DISTINCT ON (chunk_hash)" in merge.args[0]
+    assert "ON CONFLICT (chunk_hash) DO UPDATE" in merge.args[0]
+    assert "embedding = COALESCE(EXCLUDED.embedding, chunk_content.embedding)" in merge.args[0]
+    assert merge.args[1] == delete.args[1] == batch_id
+    assert delete.args[0].startswith("DELETE FROM chunk_content_staging")
+
+    # Later flushes get their own batch id and restart their sequence
+    (_,), last = conn.copy_records_to_table.await_args_list[2]
+    assert last["records"][0][0] != batch_id and [r[1] for r in last["records"]] == [0]
+
+
+@pytest.mark.asyncio
+async def test_code_map_stores_content_once_and_occurrences_per_repo():
+    """Test shared code is merged into one content row and one occurrence per repository."""
+    fork_a, fork_b = uuid4(), uuid4()
+    conn = _conn()
+
+    await CodeMapQueries.bulk_upsert(conn, [_chunk(fork_a, 0), _chunk(fork_b, 0), _chunk(fork_a, 1)])
+
+    (content_table,), content = conn.copy_records_to_table.await_args_list[0]
+    (code_map_table,), occurrences = conn.copy_records_to_table.await_args_list[1]
+    assert (content_table, code_map_table) == ("chunk_content_staging", "code_map_staging")
+    assert [record[2] for record in content["records"]] == [f"{0:064x}", f"{0:064x}", f"{1:064x}"]
+    assert "DISTINCT ON (chunk_hash)" in conn.execute.await_args_list[0].args[0]
+    assert "chunk_text" not in occurrences["columns"]
+    row = dict(zip(occurrences["columns"], occurrences["records"][1]))
+    assert row["repo_id"] == fork_b and row["variables"] == '{"x": 0}'
+
+    merge = conn.execute.await_args_list[2].args[0]
+    assert "DISTINCT ON (repo_id, file_path, chunk_hash)" in merge
+    assert "ON CONFLICT (repo_id, file_path, chunk_hash) DO UPDATE" in merge
+    assert "embedding = COALESCE(EXCLUDED.embedding, code_map.embedding)" in merge
+
+
+@pytest.mark.asyncio
+async def test_regulation_insert_batch_stages_json_metadata():
+    """Test regulation chunks go through their staging table with JSON metadata."""
+    conn = _conn()
+
+    await RegulationChunkQueries.insert_batch(
+        conn,
+        [{"rule_id": "RBI_PA", "chunk_text": "t", "chunk_index": 0, "chunk_hash": "h", "metadata": {"a": 1}}],
+    )
+
+    (table,), kwargs = conn.copy_records_to_table.await_args
+    assert table == "regulation_chunks_staging"
+    row = dict(zip(kwargs["columns"], kwargs["records"][0]))
+    assert row["metadata"] == '{"a": 1}' and row["embedding"] is None
+    assert "INSERT INTO regulation_chunks" in conn.execute.await_args_list[0].args[0]
@@ -0,0 +1,109 @@
+"""
+Tests for the pre-LLM candidate filter.
+"""
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.services import candidate_filter
+from app.services.candidate_filter import (
+    BM25,
+    identifiers,
+    lexical_queries,
+    rule_keywords,
+    select_candidates,
+    tokenize,
+)
+
+
+def _hit(text, similarity, summary=None):
+    return {
+        "chunk_id": uuid4(),
+        "chunk_hash": str(hash(text)),
+        "chunk_text": text,
+        "nl_summary": summary,
+        "distance": 1.0 - similarity,
+    }
+
+
+def test_tokenize_splits_identifiers_and_drops_stopwords():
+    """Test code identifiers and prose reduce to the same normalized terms."""
+    assert tokenize("def storeCardPAN(card_numbers):") == ["def", "store", "card", "pan", "card", "number"]
+    assert rule_keywords("Card numbers must be stored with encryption.") == [
+        "card", "number", "stored", "encryption",
+    ]
+
+
+def test_lexical_queries_keep_only_distinctive_terms():
+    """Test a realistic clause searches its identifiers and rarest words, not generic ones."""
+    clause = (
+        "All regulated entities shall ensure that only authorised systems check customer data "
+        "above the MAX_TXN_LIMIT before storing PANs, and shall mask the panNumber field."
+    )
+    other = "Regulated entities shall ensure customer data is checked before storage."
+
+    query, _ = lexical_queries([clause, other], max_terms=5)
+
+    assert identifiers(clause) == ["max_txn_limit", "pan", "pannumber"]
+    terms = query.split(" | ")
+    # Identifiers exactly, then clause-specific words; short words never as prefixes
+    assert set(terms[:3]) == {"max_txn_limit", "pan", "pannumber"}
+    assert terms[3:] == ["authorised:*", "storing:*"]
+    assert not {"all", "regulated", "entity", "ensure", "only", "check", "customer", "data"} & {
+        term.rstrip(":*") for term in terms
+    }
+    assert lexical_queries(["the and of", "Ensure all data is valid"]) == ["", ""]
+
+
+def test_bm25_prefers_rare_matching_terms():
+    """Test a document matching a rare query term outranks one matching only common terms."""
+    bm25 = BM25([["card", "data"], ["card", "encrypt"], ["card", "log"]])
+    assert bm25.score(["card", "encrypt"], 1) > bm25.score(["card", "encrypt"], 0) > 0
+    assert bm25.score(["missing"], 2) == 0.0
+
+
+def test_select_candidates_gates_scores_and_caps_per_rule():
+    """Test the similarity floor, lexical boost, per-rule cap and funnel counts."""
+    rule = {"chunk_text": "Card data must be encrypted before storage."}
+    encrypts = _hit("def save(card):\n    db.put(encrypt(card))", 0.76, "Encrypts card data before storage")
+    unrelated = _hit("def render_page(request):\n    return template", 0.80)
+    tagged = _hit("def put(record):\n    bucket.write(record)", 0.75)
+    below = _hit("def encrypt_card_storage(card): ...", 0.5)
+
+    with patch.object(candidate_filter.settings, "similarity_threshold", 0.7), \
+            patch.object(candidate_filter.settings, "prefilter_enabled", True):
+        (picks,), funnel = select_candidates(
+            [(rule, [unrelated, encrypts, tagged, below])],
+            semantic_tags={tagged["chunk_id"]: ["storage"]},
+            max_per_rule=2,
+            min_score=0.0,
+        )
+
+    assert [p["chunk_text"] for p in picks] == [encrypts["chunk_text"], tagged["chunk_text"]]
+    assert picks[0]["prefilter_score"] >= picks[1]["prefilter_score"]
+    assert funnel == {"retrieved": 4, "similar": 3, "lexical": 2, "selected": 2}
+
+    with patch.object(candidate_filter.settings, "similarity_threshold", 0.7), \
+            patch.object(candidate_filter.settings, "prefilter_enabled", False):
+        (picks,), funnel = select_candidates([(rule, [unrelated, encrypts, tagged, below])])
+
+    assert picks == [unrelated, encrypts, tagged] and funnel["selected"] == 3
+
+
+def test_hybrid_hits_only_pass_the_floor_on_an_identifier():
+    """Test full-text hits add no LLM calls unless they contain one of the clause's identifiers."""
+    rule = {"chunk_text": "Customer data must be encrypted before storage."}
+    named = {"chunk_text": "Transfers above MAX_TXN_LIMIT must be reported."}
+    vector_hits = [_hit("def put(card):\n    vault.store(encrypt(card))", 0.78)]
+    generic = [{**_hit(f"def load_data_{i}(): ...", 0.3), "lexical_rank": i} for i in range(1, 4)]
+    limit = {**_hit("if amount > MAX_TXN_LIMIT:\n    return", 0.4), "lexical_rank": 1}
+
+    with patch.object(candidate_filter.settings, "similarity_threshold", 0.7), \
+            patch.object(candidate_filter.settings, "prefilter_enabled", True):
+        vector_only, _ = select_candidates([(rule, vector_hits), (named, [])], max_per_rule=3, min_score=0.0)
+        hybrid, funnel = select_candidates(
+            [(rule, vector_hits + generic), (named, generic + [limit])], max_per_rule=3, min_score=0.0
+        )
+
+    assert sum(map(len, hybrid)) == sum(map(len, vector_only)) + 1
+    assert [p["chunk_text"] for p in hybrid[1]] == [limit["chunk_text"]]
+    assert funnel["retrieved"] == 8 and funnel["similar"] == 2
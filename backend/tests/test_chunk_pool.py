@@ -0,0 +1,31 @@
+"""
+Tests for process-pool parallel chunking.
+"""
+import pytest
+from uuid import uuid4
+
+from app.workers.chunk_pool import chunk_files
+from app.workers.git_tree import TreeEntry
+
+
+def _files(sample_code_python, n):
+    return [
+        (TreeEntry(f"src/module_{i}.py", f"{i:040x}", len(sample_code_python)), sample_code_python)
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers,batch_files", [(2, 2), (1, 64)])
+async def test_chunk_files_returns_every_file(sample_code_python, workers, batch_files):
+    """Test pooled and inline chunking both return chunks for every file."""
+    repo_id = uuid4()
+    files = _files(sample_code_python, 7)
+
+    results = [r async for r in chunk_files(iter(files), repo_id, workers, batch_files)]
+
+    assert sorted(entry.path for entry, _ in results) == sorted(e.path for e, _ in files)
+    for entry, chunks in results:
+        assert chunks
+        assert all(c["blob_sha"] == entry.blob_sha for c in chunks)
+        assert all(c["repo_id"] == repo_id for c in chunks)
@@ -70,3 +70,40 @@ def test_estimate_tokens():
     tokens = code_chunker.estimate_tokens(text)
 
     assert tokens == 100  # 400 / 4
+
+
+def test_diff_chunks_reuses_unchanged_enrichment(sample_code_python):
+    """Test unchanged chunks inherit stored enrichment and others get a delta_type."""
+    repo_id = uuid4()
+    chunks = code_chunker.chunk_file("src/banking.py", sample_code_python, repo_id)
+    assert len(chunks) >= 2
+
+    unchanged, modified = chunks[0], chunks[1]
+    previous = [
+        {
+            "file_path": "src/banking.py",
+            "chunk_hash": unchanged["chunk_hash"],
+            "name": unchanged["metadata"].get("name"),
+            "embedding": [0.1] * 1536,
+            "nl_summary": "stored summary",
+        },
+        {
+            "file_path": "src/banking.py",
+            "chunk_hash": "old-hash",
+            "name": modified["metadata"].get("name"),
+            "embedding": [0.2] * 1536,
+            "nl_summary": "old summary",
+        },
+    ]
+
+    counts = code_chunker.diff_chunks(chunks, previous)
+
+    assert unchanged["delta_type"] == "unchanged"
+    assert unchanged["nl_summary"] == "stored summary"
+    assert unchanged["embedding"] == [0.1] * 1536
+    assert modified["delta_type"] == "modified"
+    assert modified["previous_hash"] == "old-hash"
+    assert "embedding" not in modified
+    assert counts["unchanged"] == 1
+    assert counts["modified"] == 1
+    assert counts["added"] == len(chunks) - 2
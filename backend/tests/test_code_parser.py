@@ -0,0 +1,110 @@
+"""
+Tests for code parser.
+"""
+from app.services.code_parser import code_parser
+
+
+NESTED_MODULE = '''
+MAX_AMOUNT = 100
+
+
+class PaymentService:
+    fee_limit = 5
+
+    def charge(self, amount):
+        retry_max = 3
+
+        def attempt():
+            return submit(amount)
+
+        return attempt()
+
+    # trailing comment
+async def refund(tx):
+    await notify(tx)
+'''
+
+
+def test_python_chunks_single_pass_spans():
+    """Test spans cover nested definitions and trailing blank/comment lines."""
+    chunks = code_parser.extract_functions_fallback(NESTED_MODULE, "python")
+    spans = {c["name"]: (c["type"], c["start_line"], c["end_line"]) for c in chunks}
+
+    assert [c["name"] for c in chunks] == ["PaymentService", "charge", "attempt", "refund"]
+    assert spans["PaymentService"] == ("class", 5, 16)
+    assert spans["charge"] == ("function", 8, 16)
+    assert spans["attempt"] == ("function", 11, 13)
+    assert spans["refund"] == ("function", 17, 19)
+    assert chunks[1]["text"].startswith("    def charge(self, amount):")
+
+
+def test_python_chunks_metadata_from_one_tree():
+    """Test call_links, variables and config_keys are attributed per chunk."""
+    chunks = {c["name"]: c for c in code_parser.extract_functions_fallback(NESTED_MODULE, "python")}
+
+    assert chunks["PaymentService"]["call_links"] == ["attempt", "submit"]
+    assert chunks["PaymentService"]["variables"] == {"fee_limit": 5, "retry_max": 3}
+    assert chunks["PaymentService"]["config_keys"] == {"fee_limit": 5, "retry_max": 3}
+    assert chunks["attempt"]["call_links"] == ["submit"]
+    assert chunks["attempt"]["variables"] == {}
+    assert chunks["refund"]["call_links"] == ["notify"]
+
+
+def test_python_chunks_syntax_error_returns_empty():
+    """Test unparsable files produce no AST chunks."""
+    assert code_parser.extract_functions_fallback("def broken(:\n    pass\n", "python") == []
+
+
+JS_MODULE = """const MAX_LIMIT = 5;
+export function pay(amount) {
+  validate(amount);
+  return api.charge(amount);
+}
+const refund = (tx) => notify(tx);
+class Gateway {
+  send(x) { this.post(x); }
+}
+"""
+
+JAVA_MODULE = """class Payments {
+  static final int MAX_RETRIES = 3;
+  void pay(int amount) {
+    validate(amount);
+    gateway.charge(amount);
+  }
+}
+"""
+
+
+def test_tree_sitter_javascript_chunks():
+    """Test functions, arrow functions, classes and methods with call edges."""
+    chunks = code_parser.extract_functions_fallback(JS_MODULE, "javascript")
+    found = {c["name"]: c for c in chunks}
+
+    assert [(c["type"], c["name"]) for c in chunks] == [
+        ("function", "pay"),
+        ("function", "refund"),
+        ("class", "Gateway"),
+        ("method", "send"),
+    ]
+    assert (found["pay"]["start_line"], found["pay"]["end_line"]) == (2, 5)
+    assert found["pay"]["call_links"] == ["charge", "validate"]
+    assert found["refund"]["text"] == "const refund = (tx) => notify(tx);"
+    assert found["Gateway"]["call_links"] == ["post"]
+
+
+def test_tree_sitter_java_chunks():
+    """Test Java classes and methods with call edges and constants."""
+    chunks = {c["name"]: c for c in code_parser.extract_functions_fallback(JAVA_MODULE, "java")}
+
+    assert chunks["Payments"]["type"] == "class"
+    assert chunks["Payments"]["config_keys"] == {"MAX_RETRIES": 3}
+    assert chunks["pay"]["type"] == "method"
+    assert chunks["pay"]["call_links"] == ["charge", "validate"]
+
+
+def test_parse_file_returns_syntax_tree():
+    """Test parse_file returns a reusable tree-sitter tree per language."""
+    assert code_parser.parse_file("app.py", "def f():\n    pass\n").type == "module"
+    assert code_parser.parse_file("App.tsx", "const A = () => <div/>;\n").type == "program"
+    assert code_parser.parse_file("README.md", "# docs") is None
@@ -0,0 +1,78 @@
+"""
+Tests for the compliance analysis worker's investigate stage.
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.workers import indexing_worker
+
+
+def _code_chunk(i):
+    return {
+        "chunk_id": uuid4(),
+        "file_path": f"src/m{i}.py",
+        "chunk_text": f"x = {i}",
+        "start_line": 1,
+        "end_line": 2,
+        "language": "python",
+        "distance": 0.1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_investigations_are_bounded_and_gathered_in_search_order():
+    """Test at most `concurrency` batches run at once and violations keep search order."""
+    rules = [{"rule_id": f"R{r}", "chunk_id": uuid4(), "chunk_text": f"rule {r}", "embedding": [1.0]} for r in range(3)]
+    matches = [[_code_chunk(r * 10 + i) for i in range(4)] for r in range(3)]
+    in_flight, peak = 0, 0
+
+    async def analyze(rule_text, code_chunks, cache_stats=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(random.random() / 100)
+        in_flight -= 1
+        return [
+            {"verdict": "non_compliant", "severity": "high", "severity_score": 8, "explanation": c["chunk_text"]}
+            for c in code_chunks
+        ]
+
+    def plan(rule_text, code_chunks):
+        return [[0], [1, 2], [3]]
+
+    def keep_all(clauses, semantic_tags):
+        return [hits for _, hits in clauses], {"retrieved": 12, "similar": 12, "lexical": 0, "selected": 12}
+
+    @asynccontextmanager
+    async def acquire():
+        yield MagicMock()
+
+    queries = MagicMock()
+    queries.list_all_rules = AsyncMock(return_value=["R"])
+    queries.get_by_rule_id = AsyncMock(return_value=rules)
+    violations = MagicMock(insert_batch=AsyncMock())
+    scans = MagicMock(update_violation_counts=AsyncMock(), update_status=AsyncMock())
+
+    with patch.object(indexing_worker, "db", MagicMock(connect=AsyncMock(), acquire=acquire)), \
+            patch.object(indexing_worker, "job_queue", MagicMock(connect_async=AsyncMock())), \
+            patch.object(indexing_worker, "AgentLogger", return_value=MagicMock(log=AsyncMock(), flush=AsyncMock())), \
+            patch.object(indexing_worker, "memory_index", MagicMock(search_similar_many=AsyncMock(return_value=matches))), \
+            patch.object(indexing_worker, "llm_service", MagicMock(analyze_compliance_batch=analyze, plan_compliance_batches=plan)), \
+            patch.object(indexing_worker, "RegulationChunkQueries", queries), \
+            patch.object(indexing_worker, "CodeMapQueries", MagicMock(get_semantic_tags=AsyncMock(return_value={}))), \
+            patch.object(indexing_worker, "select_candidates", keep_all), \
+            patch.object(indexing_worker, "ViolationQueries", violations), \
+            patch.object(indexing_worker, "ScanQueries", scans):
+        result = await indexing_worker._async_analyze_compliance(str(uuid4()), str(uuid4()), None, concurrency=3)
+
+    assert result["status"] == "success" and result["violations_found"] == 12
+    assert peak == 3
+    (_, inserted), _ = violations.insert_batch.await_args
+    assert [v["explanation"] for v in inserted] == [c["chunk_text"] for chunks in matches for c in chunks]
+    summary = scans.update_status.await_args.args[3]
+    assert summary["concurrency"] == 3 and summary["analysis_batches"] == 9
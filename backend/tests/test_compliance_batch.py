@@ -0,0 +1,127 @@
+"""
+Tests for multi-chunk compliance analysis.
+"""
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.llm import LLMService, parse_batch_verdicts
+
+
+def _verdict(index, verdict="compliant"):
+    return {
+        "chunk_index": index,
+        "verdict": verdict,
+        "severity": "low",
+        "severity_score": 1,
+        "explanation": f"chunk {index}",
+    }
+
+
+def _chunk(i, size=10):
+    return {
+        "chunk_text": f"x{i} = " + "1" * size,
+        "file_path": f"src/m{i}.py",
+        "start_line": 1,
+        "end_line": 2,
+        "language": "python",
+    }
+
+
+class FakeVerdictCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, *key, stats=None):
+        verdict = self.data.get(key)
+        if stats is not None:
+            stats["misses" if verdict is None else "hits"] += 1
+        return verdict
+
+    async def set(self, *args):
+        *key, verdict = args
+        self.data[tuple(key)] = verdict
+
+
+def _llm():
+    llm = LLMService.__new__(LLMService)
+    llm.model = "gpt-4o-mini"
+    llm.count_tokens = len
+    return llm
+
+
+def test_parse_batch_verdicts_keeps_only_valid_numbered_items():
+    """Test fenced arrays parse and bad, duplicate or out-of-range items are dropped."""
+    reply = "```json\n" + json.dumps(
+        [
+            _verdict(2, "non_compliant"),
+            {**_verdict(1), "severity_score": 11},
+            _verdict(4),
+            _verdict(2),
+            {**_verdict(3), "verdict": "maybe"},
+        ]
+    ) + "\n```"
+
+    verdicts = parse_batch_verdicts(reply, 3)
+
+    assert verdicts[0] is None and verdicts[2] is None
+    assert verdicts[1]["verdict"] == "non_compliant" and "chunk_index" not in verdicts[1]
+    assert parse_batch_verdicts("not json", 2) == [None, None]
+
+
+def test_plan_compliance_batches_respects_count_and_token_budget():
+    """Test batches close at the chunk limit or when the prompt budget would be exceeded."""
+    llm = _llm()
+    chunks = [_chunk(i) for i in range(5)] + [_chunk(5, size=5000), _chunk(6)]
+
+    batches = llm.plan_compliance_batches("Encrypt card data", chunks, max_chunks=3, max_prompt_tokens=3000)
+
+    assert batches == [[0, 1, 2], [3, 4], [5], [6]]
+
+
+@pytest.mark.asyncio
+async def test_batch_call_retries_only_invalid_items_and_caches_verdicts():
+    """Test one call covers the batch, a bad item is re-asked alone, and repeats hit the cache."""
+    llm = _llm()
+    llm.generate = AsyncMock(
+        side_effect=[
+            json.dumps([_verdict(1, "non_compliant"), {"chunk_index": 2}, _verdict(3)]),
+            json.dumps({"verdict": "partial", "severity": "high", "severity_score": 7, "explanation": "retry"}),
+        ]
+    )
+    chunks = [_chunk(0), _chunk(1), _chunk(2), _chunk(0)]
+    stats = {"hits": 0, "misses": 0}
+
+    with patch("app.services.llm.verdict_cache", FakeVerdictCache()) as cache:
+        results = await llm.analyze_compliance_batch("Encrypt card data", chunks, cache_stats=stats)
+
+        assert [r["verdict"] for r in results] == ["non_compliant", "partial", "compliant", "non_compliant"]
+        assert llm.generate.await_count == 2
+        packed, retry = (call.args[0][1]["content"] for call in llm.generate.await_args_list)
+        assert "### Chunk 3" in packed and "### Chunk 4" not in packed
+        assert "x1 = " in retry and "x0 = " not in retry
+        assert len(cache.data) == 3
+
+        again = await llm.analyze_compliance_batch("Encrypt card data", chunks[:3], cache_stats=stats)
+        assert again == results[:3] and llm.generate.await_count == 2
+        assert stats == {"hits": 3, "misses": 3}
+
+
+@pytest.mark.asyncio
+async def test_invalid_retry_reply_is_unknown_and_not_cached():
+    """Test an incomplete single-chunk retry yields a complete unknown verdict that is retried next scan."""
+    llm = _llm()
+    llm.generate = AsyncMock(
+        side_effect=[
+            json.dumps([_verdict(1), {"chunk_index": 2, "verdict": "non_compliant"}]),
+            json.dumps({"verdict": "non_compliant"}),
+        ]
+    )
+
+    with patch("app.services.llm.verdict_cache", FakeVerdictCache()) as cache:
+        results = await llm.analyze_compliance_batch("Encrypt card data", [_chunk(0), _chunk(1)])
+
+    assert results[1]["verdict"] == "unknown"
+    assert {"severity", "severity_score", "explanation"} <= results[1].keys()
+    assert len(cache.data) == 1
@@ -0,0 +1,91 @@
+"""
+Tests for the two-tier embedding cache.
+"""
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.pending = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.pending[key] = value
+
+    async def execute(self):
+        self.redis.data.update(self.pending)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.mget_calls = []
+
+    async def mget(self, keys):
+        self.mget_calls.append(keys)
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def _cache(redis, model="text-embedding-3-small", max_entries=8):
+    cache = EmbeddingCache(model, dimension=3, max_entries=max_entries, ttl=60, redis_url="redis://test")
+    cache._redis = redis
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_stores_packed_float32_and_batches_lookups():
+    """Test vectors round-trip as 4-byte floats and a batch costs one MGET."""
+    redis = FakeRedis()
+    await _cache(redis).set_many({"a": [0.5, 1.0, 2.0], "b": np.ones(3)})
+
+    assert redis.data["emb:text-embedding-3-small:3:a"] == np.array([0.5, 1.0, 2.0], "<f4").tobytes()
+
+    cold = _cache(redis)
+    a, missing, b, a_again = await cold.get_many(["a", "c", "b", "a"])
+    assert a.dtype == np.float32 and a.tolist() == [0.5, 1.0, 2.0]
+    assert b.tolist() == [1.0, 1.0, 1.0] and a_again is a
+    assert missing is None
+    assert len(redis.mget_calls) == 1 and len(redis.mget_calls[0]) == 3
+
+    # Redis hits are promoted into the LRU tier
+    assert (await cold.get("a")).tolist() == [0.5, 1.0, 2.0]
+    assert len(redis.mget_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_by_model_and_memory_tier_is_bounded():
+    """Test another model never sees cached vectors and the LRU evicts oldest first."""
+    redis = FakeRedis()
+    cache = _cache(redis, max_entries=2)
+    await cache.set_many({"a": [1, 0, 0], "b": [0, 1, 0], "c": [0, 0, 1]})
+
+    assert list(cache._memory) == ["b", "c"]
+    assert await _cache(redis, model="text-embedding-ada-002").get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_failures_are_misses():
+    """Test an unreachable Redis degrades to cache misses instead of errors."""
+
+    class BrokenRedis(FakeRedis):
+        async def mget(self, keys):
+            raise ConnectionError("redis down")
+
+        def pipeline(self, transaction=True):
+            raise ConnectionError("redis down")
+
+    cache = _cache(BrokenRedis())
+    await cache.set("a", [1.0, 2.0, 3.0])
+    assert await cache.get_many(["a", "b"]) == [cache._memory["a"], None]
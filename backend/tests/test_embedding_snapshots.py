@@ -0,0 +1,115 @@
+"""
+Tests for memory-mapped embedding snapshots.
+"""
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.services import embedding_snapshots
+from app.services.embedding_snapshots import gc_snapshots, load_snapshot, snapshots_enabled, write_snapshot
+from app.services.memory_index import MemoryVectorIndex
+
+
+def _records(repo_id, n=3):
+    return [
+        {
+            "chunk_id": uuid4(),
+            "repo_id": repo_id,
+            "file_path": f"src/f{i % 2}.py",
+            "language": "python",
+            "start_line": i * 10 + 1,
+            "end_line": i * 10 + 9,
+            "ast_node_type": None,
+            "chunk_hash": f"{i:064x}",
+            "embedding": np.eye(4, dtype=np.float32)[i],
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def snapshot_root(tmp_path):
+    with patch.object(embedding_snapshots, "SNAPSHOT_ROOT", tmp_path), patch.object(
+        embedding_snapshots.settings, "embedding_dimension", 4
+    ), patch.object(embedding_snapshots.settings, "embedding_snapshot_dtype", "float32"):
+        yield tmp_path
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trips_through_mmap(snapshot_root):
+    """Test a written snapshot maps back with the same rows and normalised vectors."""
+    repo_id = uuid4()
+    records = _records(repo_id)
+    conn = AsyncMock()
+    conn.fetch.return_value = records
+
+    assert await write_snapshot(conn, repo_id, "a" * 40) is not None
+
+    snapshot = load_snapshot(repo_id, "a" * 40)
+    assert isinstance(snapshot.embeddings, np.memmap)
+    assert np.allclose(np.linalg.norm(snapshot.embeddings, axis=1), 1.0)
+    assert len(snapshot.rows) == 3
+    row = snapshot.rows[2]
+    assert row["chunk_id"] == records[2]["chunk_id"]
+    assert row["file_path"] == "src/f0.py"
+    assert (row["start_line"], row["end_line"]) == (21, 29)
+    assert row["ast_node_type"] is None
+    assert row["chunk_hash"] == records[2]["chunk_hash"]
+
+    assert load_snapshot(repo_id, "b" * 40) is None
+
+
+@pytest.mark.asyncio
+async def test_new_commit_collects_old_snapshots(snapshot_root):
+    """Test publishing a new commit removes the previous snapshot."""
+    repo_id = uuid4()
+    conn = AsyncMock()
+    conn.fetch.return_value = _records(repo_id)
+
+    await write_snapshot(conn, repo_id, "a" * 40)
+    await write_snapshot(conn, repo_id, "b" * 40)
+
+    assert load_snapshot(repo_id, "a" * 40) is None
+    assert load_snapshot(repo_id, "b" * 40) is not None
+    assert gc_snapshots(repo_id) == 1
+    assert load_snapshot(repo_id, "b" * 40) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_index_serves_searches_from_snapshot(snapshot_root):
+    """Test the memory index maps the snapshot and fetches text for hits only."""
+    repo_id = uuid4()
+    records = _records(repo_id)
+    conn = AsyncMock()
+    conn.fetch.return_value = records
+    await write_snapshot(conn, repo_id, "a" * 40)
+
+    conn = AsyncMock()
+    conn.fetchrow.return_value = ("a" * 40, None, 3)
+    conn.fetch.return_value = [{"chunk_id": records[1]["chunk_id"], "chunk_text": "def f1(): pass"}]
+
+    with patch("app.services.memory_index.settings") as settings:
+        settings.vector_memory_index_enabled = True
+        index_cache = MemoryVectorIndex(max_bytes=0, check_interval=60)
+        (match,) = await index_cache.search_similar(
+            conn, [0.0, 1.0, 0.0, 0.0], repo_id, top_k=1, include_text=True
+        )
+
+    assert match["chunk_id"] == records[1]["chunk_id"]
+    assert match["distance"] == pytest.approx(0.0, abs=1e-6)
+    assert match["chunk_text"] == "def f1(): pass"
+    # Only the text lookup went to Postgres, not a code_map load
+    (query, chunk_ids), _ = conn.fetch.await_args
+    assert "chunk_id = ANY" in query and chunk_ids == [records[1]["chunk_id"]]
+
+
+def test_snapshots_are_only_written_for_the_memory_index():
+    """Test indexing skips snapshots nothing would read."""
+    with patch("app.services.embedding_snapshots.settings") as settings:
+        settings.embedding_snapshots_enabled = True
+        settings.vector_memory_index_enabled = False
+        assert not snapshots_enabled()
+        settings.vector_memory_index_enabled = True
+        assert snapshots_enabled()
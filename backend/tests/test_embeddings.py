@@ -49,3 +49,32 @@ def test_compute_text_hash():
 
     assert hash1 == hash2
     assert len(hash1) == 64  # SHA256 hex
+
+
+def test_plan_batches_respects_size_and_token_budget():
+    """Test batches are bounded by item count and estimated tokens."""
+    texts = ["a" * 400] * 5  # 100 tokens each
+
+    with patch.object(embeddings_service, "batch_size", 2), \
+            patch.object(embeddings_service, "batch_max_tokens", 1000):
+        assert embeddings_service.plan_batches(texts) == [[0, 1], [2, 3], [4]]
+
+    with patch.object(embeddings_service, "batch_size", 100), \
+            patch.object(embeddings_service, "batch_max_tokens", 250):
+        assert embeddings_service.plan_batches(texts) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_embed_batch_partial_isolates_failures():
+    """Test a failing batch does not discard the other batches."""
+    texts = ["text 1", "text 2", "text 3"]
+
+    with patch.object(embeddings_service, "batch_size", 1), \
+            patch.object(embeddings_service, "_embed_request", new_callable=AsyncMock) as mock_request:
+        mock_request.side_effect = [[[0.1] * 1536], Exception("boom"), [[0.3] * 1536]]
+
+        embeddings = await embeddings_service.embed_batch_partial(texts)
+
+    assert embeddings[0] == [0.1] * 1536
+    assert embeddings[1] is None
+    assert embeddings[2] == [0.3] * 1536
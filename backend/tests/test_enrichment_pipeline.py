@@ -0,0 +1,115 @@
+"""
+Tests for the chunk enrichment pipeline.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from app.workers import enrichment_pipeline
+from app.workers.enrichment_pipeline import ChunkEnrichmentPipeline, lane_concurrency
+
+
+def _chunks(n):
+    return [
+        {
+            "chunk_text": f"def f{i}(): pass",
+            "chunk_hash": f"hash-{i}",
+            "language": "python",
+            "file_path": "src/app.py",
+        }
+        for i in range(n)
+    ]
+
+
+def test_lane_concurrency_capped_by_rate_limit():
+    """Test lane concurrency never exceeds the per-second quota."""
+    assert lane_concurrency(16, 500) == 8
+    assert lane_concurrency(4, 3500) == 4
+    assert lane_concurrency(4, 10) == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_flushes_in_fixed_size_groups():
+    """Test every chunk is enriched and flushed in flush_size groups."""
+    flushed = []
+
+    async def sink(batch):
+        flushed.append(len(batch))
+
+    async def fake_embed(chunks):
+        # Suspend like a real provider call so concurrent lanes interleave
+        await asyncio.sleep(0)
+        for chunk in chunks:
+            chunk["embedding"] = [0.1] * 1536
+        return len(chunks)
+
+    async def fake_summarize(chunk):
+        chunk["nl_summary"] = "summary"
+        return True
+
+    with patch("app.workers.enrichment_pipeline.embed_chunks", side_effect=fake_embed), \
+            patch("app.workers.enrichment_pipeline.summarize_chunk", side_effect=fake_summarize), \
+            patch.object(enrichment_pipeline.embeddings_service, "batch_size", 3):
+        pipeline = ChunkEnrichmentPipeline(sink=sink, embed_concurrency=4, flush_size=10)
+        chunks = _chunks(25)
+        stats = await pipeline.run(chunks)
+
+    assert flushed == [10, 10, 5]
+    assert stats["written"] == 25
+    assert stats["embedded"] == 25
+    assert stats["summarized"] == 25
+    assert all(c["nl_summary"] == "summary" for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_surfaces_sink_errors():
+    """Test a failing sink fails the run instead of hanging."""
+
+    async def sink(batch):
+        raise RuntimeError("db down")
+
+    async def fake_embed(chunks):
+        return 0
+
+    async def fake_summarize(chunk):
+        return False
+
+    with patch("app.workers.enrichment_pipeline.embed_chunks", side_effect=fake_embed), \
+            patch("app.workers.enrichment_pipeline.summarize_chunk", side_effect=fake_summarize):
+        pipeline = ChunkEnrichmentPipeline(sink=sink, flush_size=2, queue_size=2)
+        with pytest.raises(RuntimeError):
+            await pipeline.run(_chunks(20))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_lanes_for_reused_chunks():
+    """Test chunks carrying an embedding and summary bypass both lanes."""
+    written = []
+
+    async def sink(batch):
+        written.extend(batch)
+
+    async def fake_embed(chunks):
+        for chunk in chunks:
+            chunk["embedding"] = [0.1] * 1536
+        return len(chunks)
+
+    async def fake_summarize(chunk):
+        chunk["nl_summary"] = "summary"
+        return True
+
+    chunks = _chunks(6)
+    for chunk in chunks[:4]:
+        chunk["embedding"] = [0.2] * 1536
+        chunk["nl_summary"] = "stored"
+
+    with patch("app.workers.enrichment_pipeline.embed_chunks", side_effect=fake_embed) as embed, \
+            patch("app.workers.enrichment_pipeline.summarize_chunk", side_effect=fake_summarize):
+        stats = await ChunkEnrichmentPipeline(sink=sink, flush_size=10).run(chunks)
+
+    assert stats["reused"] == 4
+    assert stats["embedded"] == 2
+    assert stats["summarized"] == 2
+    assert len(written) == 6
+    assert [c["chunk_hash"] for c in embed.call_args.args[0]] == ["hash-4", "hash-5"]
@@ -0,0 +1,78 @@
+"""
+Tests for reading repository trees from the git object database.
+"""
+import subprocess
+
+import pytest
+
+from app.workers.git_tree import GitIgnore, iter_blobs, list_source_files
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with ignored, vendored and regular source files."""
+    root = tmp_path / "repo"
+    files = {
+        ".gitignore": "build/\n*.gen.py\n!keep.gen.py\n",
+        "src/app.py": "def main():\n    return 1\n",
+        "src/keep.gen.py": "x = 1\n",
+        "src/skip.gen.py": "x = 2\n",
+        "src/README.md": "docs\n",
+        "build/out.py": "y = 1\n",
+        "node_modules/lib/index.js": "module.exports = {}\n",
+        "web/.gitignore": "/local.js\n",
+        "web/local.js": "var a;\n",
+        "web/app.js": "function f() {}\n",
+    }
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=root, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+
+    git("init", "--quiet")
+    git("add", "--force", ".")
+    git("commit", "--quiet", "-m", "init")
+    return root / ".git", git("rev-parse", "HEAD")
+
+
+def test_list_source_files_applies_exclusions(repo):
+    """Test one tree walk honours extensions, .gitignore and vendored dirs."""
+    git_dir, sha = repo
+
+    entries = list_source_files(git_dir, sha, (".py", ".js"))
+
+    assert sorted(entries) == ["src/app.py", "src/keep.gen.py", "web/app.js"]
+    assert len(entries["src/app.py"].blob_sha) == 40
+
+
+def test_iter_blobs_streams_contents(repo):
+    """Test blob contents come back in request order."""
+    git_dir, sha = repo
+    entries = list(list_source_files(git_dir, sha, (".py", ".js")).values())
+
+    contents = {entry.path: data for entry, data in iter_blobs(git_dir, entries)}
+
+    assert contents["src/app.py"] == b"def main():\n    return 1\n"
+    assert contents["web/app.js"] == b"function f() {}\n"
+
+
+def test_gitignore_patterns():
+    """Test anchored, directory-only, negated and ** patterns."""
+    ignore = GitIgnore()
+    ignore.add("", "/dist\nlogs/\n**/generated/*.py\n*.pyc\n!important.pyc\n")
+    ignore.add("pkg", "local_*.py\n")
+
+    assert ignore.is_ignored("dist/a.py")
+    assert not ignore.is_ignored("src/dist/a.py")
+    assert ignore.is_ignored("src/logs/a.py")
+    assert not ignore.is_ignored("logs")
+    assert ignore.is_ignored("a/b/generated/x.py")
+    assert ignore.is_ignored("x.pyc")
+    assert not ignore.is_ignored("important.pyc")
+    assert ignore.is_ignored("pkg/sub/local_cfg.py")
+    assert not ignore.is_ignored("local_cfg.py")
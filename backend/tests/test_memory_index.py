@@ -0,0 +1,125 @@
+"""
+Tests for the in-process vector index.
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.services.memory_index import MemoryVectorIndex, RepoVectorIndex
+
+
+def _rows(n):
+    return [
+        {"chunk_id": i, "file_path": f"src/f{i}.py", "chunk_text": f"def f{i}(): pass", "nl_summary": None}
+        for i in range(n)
+    ]
+
+
+def test_search_matches_brute_force_cosine():
+    """Test argpartition top-k equals a full cosine sort, nearest first."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, 16)).astype(np.float32)
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+    expected_scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (
+        embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ).T
+
+    index = RepoVectorIndex(_rows(200), embeddings.copy(), version=("sha",))
+    results = index.search(queries, top_k=5)
+
+    for scores, matches in zip(expected_scores, results):
+        assert [m["chunk_id"] for m in matches] == list(np.argsort(-scores)[:5])
+        assert matches[0]["distance"] == pytest.approx(1 - scores.max(), abs=1e-5)
+        assert "chunk_text" not in matches[0]
+
+    (matches,) = index.search(queries[0], top_k=500, include_text=True)
+    assert len(matches) == 200
+    assert matches[0]["chunk_text"].startswith("def f")
+
+
+def _conn(versions, n=4, dim=3):
+    """Mock connection returning repo versions and n random embeddings."""
+    conn = AsyncMock()
+    conn.fetchrow.side_effect = lambda query, repo_id: versions[repo_id]
+    conn.fetch.side_effect = lambda query, repo_id: [
+        {"chunk_id": i, "file_path": "a.py", "chunk_text": "x", "nl_summary": None,
+         "embedding": np.arange(i, i + dim, dtype=np.float32)}
+        for i in range(n)
+    ]
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_index_reloads_on_version_change_and_evicts_lru():
+    """Test a re-indexed repo is reloaded and the oldest repo is evicted first."""
+    a, b = uuid4(), uuid4()
+    versions = {a: ("sha1", None, 4), b: ("sha1", None, 4)}
+    conn = _conn(versions)
+
+    with patch("app.services.memory_index.settings") as settings:
+        settings.embedding_dimension = 3
+        index_cache = MemoryVectorIndex(max_bytes=100, check_interval=0)
+
+        first = await index_cache.get(conn, a)
+        assert await index_cache.get(conn, a) is first
+        assert conn.fetch.await_count == 1
+
+        versions[a] = ("sha2", None, 4)
+        assert await index_cache.get(conn, a) is not first
+        assert conn.fetch.await_count == 2
+
+        # Each index is 4 * 3 * 4 bytes + 4 text bytes; two don't fit in 100
+        await index_cache.get(conn, b)
+        assert list(index_cache._indexes) == [b]
+
+        # Repos larger than the budget fall through to Postgres
+        versions[a] = ("sha3", None, 1000)
+        assert await index_cache.get(conn, a) is None
+
+
+def test_hybrid_search_fuses_full_text_matches_by_reciprocal_rank():
+    """Test full-text matches are fused with the in-process vector ranking."""
+    embeddings = np.eye(4, dtype=np.float32)
+    index = RepoVectorIndex(_rows(4), embeddings.copy(), version=("sha",))
+    query = np.array([[1.0, 0.5, 0.0, 0.0]], dtype=np.float32)
+
+    (matches,) = index.search_hybrid(query, [[3, 1, 99]], top_k=3, candidates=2, rrf_k=60)
+
+    # Chunk 1 is in both rankings, 0 only nearest, 3 only a full-text match
+    assert [m["chunk_id"] for m in matches] == [1, 0, 3]
+    assert (matches[0]["vector_rank"], matches[0]["lexical_rank"]) == (2, 2)
+    assert matches[0]["rrf_score"] == pytest.approx(1 / 62 + 1 / 62)
+    assert matches[2]["vector_rank"] is None and matches[2]["distance"] == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_hybrid_searches_keep_using_the_memory_index():
+    """Test a loaded index serves hybrid searches; only the full-text half goes to Postgres."""
+    repo_id = uuid4()
+    conn = _conn({repo_id: ("sha1", None, 4)})
+    queries = MagicMock(
+        search_lexical_many=AsyncMock(return_value=[[2]]),
+        search_hybrid_many=AsyncMock(),
+    )
+
+    with patch("app.services.memory_index.settings") as settings, \
+            patch("app.services.memory_index.CodeMapQueries", queries):
+        settings.vector_memory_index_enabled = True
+        settings.hybrid_search_enabled = True
+        settings.hybrid_search_candidates = 2
+        settings.hybrid_rrf_k = 60
+        settings.embedding_dimension = 3
+        index_cache = MemoryVectorIndex(max_bytes=10 ** 6, check_interval=60)
+        index_cache._load = AsyncMock(
+            return_value=RepoVectorIndex(_rows(4), np.eye(4, 3, dtype=np.float32), ("sha1", None, 4))
+        )
+        matches = await index_cache.search_similar(
+            conn, [1.0, 0.0, 0.0], repo_id, top_k=2, query_text="Validate MAX_TXN_LIMIT"
+        )
+
+    queries.search_hybrid_many.assert_not_awaited()
+    tsqueries = queries.search_lexical_many.await_args.args[1]
+    assert tsqueries == ["max_txn_limit | validate:*"]
+    assert [m["chunk_id"] for m in matches] == [0, 2] and matches[1]["lexical_rank"] == 1
@@ -0,0 +1,61 @@
+"""
+Tests for the token-bucket rate limiter.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.rate_limiter import RateLimiter, _LocalBucket, estimate_message_tokens
+
+
+def test_local_bucket_refills_at_capacity_per_minute():
+    """Test the fallback bucket drains and reports the refill wait."""
+    bucket = _LocalBucket(60)  # one token per second
+
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_estimate_message_tokens_includes_completion():
+    """Test chat token estimate covers prompt and completion budget."""
+    messages = [{"role": "user", "content": "a" * 400}]
+
+    assert estimate_message_tokens(messages, max_tokens=300) == 400
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_redis_bucket():
+    """Test acquire sleeps for the wait returned by the Redis script, then retries."""
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=1000, headroom=1.0)
+    limiter._script = AsyncMock(side_effect=[250, 0])
+
+    with patch("app.services.rate_limiter.job_queue", MagicMock(async_redis=MagicMock())), \
+            patch("app.services.rate_limiter.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await limiter.acquire(tokens=100)
+
+    assert limiter._script.await_count == 2
+    assert mock_sleep.await_args.args[0] >= 0.25
+    args = limiter._script.await_args.kwargs["args"]
+    assert args == [60, 1, 1000, 100]
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_warns_once_and_backs_off_reconnects():
+    """Test a Redis outage logs one warning and is not retried on every acquire."""
+    limiter = RateLimiter("test", requests_per_minute=600, headroom=1.0)
+    queue = MagicMock(async_redis=None, connect_async=AsyncMock(side_effect=ConnectionError("down")))
+
+    with patch("app.services.rate_limiter.job_queue", queue), \
+            patch("app.services.rate_limiter.logger") as mock_logger:
+        for _ in range(5):
+            await limiter.acquire()
+
+        assert queue.connect_async.await_count == 1
+        assert mock_logger.warning.call_count == 1
+
+        # Once the backoff expires Redis is tried again, still without a new warning
+        limiter._redis_retry_at = 0.0
+        await limiter.acquire()
+        assert queue.connect_async.await_count == 2
+        assert mock_logger.warning.call_count == 1 and limiter._redis_backoff == 2.0
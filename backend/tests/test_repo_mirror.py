@@ -0,0 +1,59 @@
+"""
+Tests for the persistent repository mirror cache.
+"""
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from app.workers.repo_mirror import RepoMirrorCache
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """A local git repository standing in for GitHub."""
+    repo = tmp_path / "upstream"
+    (repo / "src").mkdir(parents=True)
+    (repo / "src" / "app.py").write_text("def main():\n    return 1\n")
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=repo, check=True, capture_output=True,
+        )
+
+    git("init", "--quiet")
+    git("add", ".")
+    git("commit", "--quiet", "-m", "init")
+    return repo
+
+
+def _cache(tmp_path, max_bytes=10 * 1024 ** 2):
+    return RepoMirrorCache(tmp_path / "store", max_bytes)
+
+
+def test_mirror_fetches_once_per_commit(tmp_path, upstream):
+    """Test a mirror is created on first use and reused for a known commit."""
+    cache = _cache(tmp_path)
+
+    with patch.object(RepoMirrorCache, "_remote_url", return_value=f"file://{upstream}"):
+        with cache.open("acme/repo", "token") as sha:
+            assert cache.git("acme/repo", "show", f"{sha}:src/app.py").startswith("def main")
+
+        with patch.object(RepoMirrorCache, "_run_git", wraps=RepoMirrorCache._run_git) as run_git:
+            with cache.open("acme/repo", "token", sha) as cached_sha:
+                assert cached_sha == sha
+        assert "fetch" not in [c.args[1] for c in run_git.call_args_list]
+
+    assert cache.mirror_path("acme/repo").exists()
+
+
+def test_mirrors_evicted_over_budget(tmp_path, upstream):
+    """Test mirrors are evicted once the store exceeds its disk budget."""
+    cache = _cache(tmp_path, max_bytes=0)
+
+    with patch.object(RepoMirrorCache, "_remote_url", return_value=f"file://{upstream}"):
+        with cache.open("acme/repo", "token"):
+            pass
+
+    assert not cache.mirror_path("acme/repo").exists()
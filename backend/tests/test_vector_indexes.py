@@ -0,0 +1,93 @@
+"""
+Tests for code_map vector index builds.
+"""
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+
+from app.models.database import repo_vector_index_name
+from app.workers.vector_indexes import (
+    GLOBAL_INDEX,
+    LEGACY_INDEX,
+    ensure_repo_index,
+    migrate_global_index,
+    sync_repo_indexes,
+)
+
+
+def _conn(valid=None, repos=(), existing=()):
+    """Mock connection; `valid` maps index name to pg_index.indisvalid."""
+    valid = valid or {}
+    conn = AsyncMock()
+    conn.fetchval.side_effect = lambda query, name: valid.get(name)
+
+    async def fetch(query, *args):
+        if "FROM repos" in query:
+            return [{"repo_id": repo_id} for repo_id in repos]
+        return [{"relname": name} for name in existing]
+
+    conn.fetch.side_effect = fetch
+    return conn
+
+
+def _statements(conn):
+    return [call.args[0] for call in conn.execute.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_repo_index_is_partial_and_concurrent():
+    """Test a repository index covers only its rows and never blocks writes."""
+    repo_id = uuid4()
+    conn = _conn()
+
+    assert await ensure_repo_index(conn, repo_id) is True
+
+    (statement,) = _statements(conn)
+    assert statement.startswith(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {repo_vector_index_name(repo_id)}")
+    assert "USING hnsw (embedding vector_cosine_ops)" in statement
+    assert statement.endswith(f"WHERE repo_id = '{repo_id}'")
+
+
+@pytest.mark.asyncio
+async def test_invalid_index_is_dropped_and_rebuilt():
+    """Test an index left INVALID by an interrupted build is rebuilt."""
+    repo_id = uuid4()
+    name = repo_vector_index_name(repo_id)
+    conn = _conn(valid={name: False})
+
+    assert await ensure_repo_index(conn, repo_id) is True
+
+    drop, create = _statements(conn)
+    assert drop == f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+    assert create.startswith("CREATE INDEX CONCURRENTLY")
+
+    conn = _conn(valid={name: True})
+    assert await ensure_repo_index(conn, repo_id) is False
+    assert _statements(conn) == []
+
+
+@pytest.mark.asyncio
+async def test_global_index_built_before_ivfflat_dropped():
+    """Test the IVFFlat index is only dropped once HNSW exists."""
+    conn = _conn(valid={LEGACY_INDEX: True})
+
+    await migrate_global_index(conn)
+
+    create, drop = _statements(conn)
+    assert GLOBAL_INDEX in create and "hnsw" in create
+    assert drop == f"DROP INDEX CONCURRENTLY IF EXISTS {LEGACY_INDEX}"
+
+
+@pytest.mark.asyncio
+async def test_sync_builds_large_and_drops_stale():
+    """Test large repos get an index and indexes of other repos are dropped."""
+    large, gone = uuid4(), uuid4()
+    conn = _conn(repos=[large], existing=[repo_vector_index_name(gone)])
+
+    counts = await sync_repo_indexes(conn, min_chunks=100)
+
+    assert counts == {"built": 1, "dropped": 1}
+    statements = _statements(conn)
+    assert repo_vector_index_name(large) in statements[0]
+    assert statements[1] == f"DROP INDEX CONCURRENTLY IF EXISTS {repo_vector_index_name(gone)}"
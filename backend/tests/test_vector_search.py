@@ -0,0 +1,206 @@
+"""
+Tests for vector search index usage.
+"""
+import re
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.config import get_settings
+from app.models.database import (
+    DISTANCE_OPERATORS,
+    VECTOR_INDEX_OPCLASS,
+    CodeMapQueries,
+    distance_operator,
+    repo_vector_index_name,
+)
+
+settings = get_settings()
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+INDEX_PATTERN = re.compile(
+    r"ON\s+(\w+)\s+USING\s+(?:ivfflat|hnsw)\s*\(\s*embedding\s+(\w+)\s*\)", re.IGNORECASE
+)
+
+
+def _migrated_opclasses() -> dict[str, str]:
+    """Opclass of each table's embedding index after all migrations run."""
+    opclasses = {}
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        for table, opclass in INDEX_PATTERN.findall(path.read_text()):
+            opclasses[table] = opclass
+    return opclasses
+
+
+def test_registry_matches_migrated_indexes():
+    """Test the declared opclass of each table matches its migrated index."""
+    migrated = _migrated_opclasses()
+    for table, opclass in VECTOR_INDEX_OPCLASS.items():
+        assert migrated[table] == opclass
+
+
+def test_exact_search_orders_by_expression_no_index_serves():
+    """Test exact queries rank by distance without an ANN-indexable ORDER BY."""
+    operator = distance_operator("code_map")
+    for query in (
+        CodeMapQueries.similar_query(True, exact=True),
+        CodeMapQueries.similar_many_query(True, exact=True),
+        CodeMapQueries.hybrid_many_query(True, exact=True),
+    ):
+        assert "+ 0" in query
+        assert f"ORDER BY embedding {operator}" not in query and f"ORDER BY c.embedding {operator}" not in query
+
+
+def test_search_queries_use_index_operator():
+    """Test code_map searches order by the operator of its index opclass."""
+    operator = DISTANCE_OPERATORS[_migrated_opclasses()["code_map"]]
+    assert distance_operator("code_map") == operator
+
+    for query in (CodeMapQueries.similar_query(True), CodeMapQueries.similar_query(False)):
+        assert f"ORDER BY embedding {operator} $1::vector" in query
+        other = set(DISTANCE_OPERATORS.values()) - {operator}
+        assert not any(op in query for op in other)
+
+
+@pytest.mark.asyncio
+@pytest.mark.database
+async def test_search_plan_uses_vector_index(test_pool):
+    """Test EXPLAIN of the similarity search never falls back to a Seq Scan."""
+    embedding = [0.01] * settings.embedding_dimension
+
+    async with test_pool.acquire() as conn:
+        async with conn.transaction():
+            # Only an index the operator cannot use leaves a Seq Scan behind
+            await conn.execute("SET LOCAL enable_seqscan = off")
+            plans = [
+                await conn.fetch(
+                    "EXPLAIN " + CodeMapQueries.similar_query(True), embedding, uuid4(), 10
+                ),
+                await conn.fetch(
+                    "EXPLAIN " + CodeMapQueries.similar_query(False), embedding, 10
+                ),
+                await conn.fetch(
+                    "EXPLAIN " + CodeMapQueries.similar_many_query(True),
+                    [embedding, embedding], uuid4(), 10,
+                ),
+            ]
+
+    for plan in plans:
+        text = "\n".join(row[0] for row in plan)
+        assert "Seq Scan" not in text, text
+
+
+@pytest.mark.asyncio
+async def test_search_similar_projects_requested_columns():
+    """Test the embedding and text are only fetched when asked for."""
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.fetchrow = AsyncMock(return_value={"exact": False})
+    conn.fetch = AsyncMock(return_value=[])
+
+    await CodeMapQueries.search_similar(conn, [0.1], uuid4(), top_k=5)
+    query = conn.fetch.await_args.args[0]
+    assert "SELECT *" not in query
+    assert "embedding," not in query and "chunk_text" not in query
+
+    await CodeMapQueries.search_similar(conn, [0.1], None, include_text=True, include_embedding=True)
+    query, *args = conn.fetch.await_args.args
+    assert "chunk_text" in query and "embedding," in query
+    assert "JOIN chunk_content cc ON cc.chunk_hash = m.chunk_hash" in query
+    assert "repo_id = $2" not in query and args == [[0.1], 10]
+
+
+@pytest.mark.asyncio
+async def test_search_similar_many_groups_results_per_query():
+    """Test batched search splits into round trips and regroups top-k per query."""
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.fetchrow = AsyncMock(return_value={"exact": False})
+
+    async def fetch(query, batch, repo_id, top_k):
+        # Two hits for every query vector except [0.0]
+        return [
+            {"query_index": i, "file_path": f"{vector[0]}-{hit}", "distance": 0.1 * hit}
+            for i, vector in enumerate(batch, start=1)
+            if vector != [0.0]
+            for hit in range(2)
+        ]
+
+    conn.fetch = AsyncMock(side_effect=fetch)
+
+    results = await CodeMapQueries.search_similar_many(
+        conn, [[1.0], [0.0], [2.0]], uuid4(), top_k=2, batch_size=2
+    )
+
+    assert conn.fetch.await_count == 2
+    query = conn.fetch.await_args.args[0]
+    assert "CROSS JOIN LATERAL" in query and "unnest($1::vector[])" in query
+    assert [[m["file_path"] for m in r] for r in results] == [
+        ["1.0-0", "1.0-1"],
+        [],
+        ["2.0-0", "2.0-1"],
+    ]
+    assert all("query_index" not in m for r in results for m in r)
+
+
+@pytest.mark.asyncio
+async def test_search_hybrid_many_fuses_both_rankings_in_one_round_trip():
+    """Test hybrid search sends vectors and tsqueries together and regroups per query."""
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.fetchrow = AsyncMock(return_value={"exact": False})
+    conn.fetch = AsyncMock(
+        return_value=[
+            {"query_index": 2, "file_path": "pay.py", "rrf_score": 0.03, "lexical_rank": 1},
+            {"query_index": 1, "file_path": "log.py", "rrf_score": 0.01, "lexical_rank": None},
+        ]
+    )
+    repo_id = uuid4()
+
+    results = await CodeMapQueries.search_hybrid_many(
+        conn, [[1.0], [2.0]], ["", "payment:*"], repo_id, top_k=3, include_text=True, rrf_k=60
+    )
+
+    assert conn.fetch.await_count == 1
+    query, *args = conn.fetch.await_args.args
+    assert "FULL JOIN" in query and "to_tsquery('simple'" in query and "ORDER BY rrf_score DESC" in query
+    assert "cc.search_tsv" in query and "chunk_text" in query
+    assert args == [[[1.0], [2.0]], ["", "payment:*"], settings.hybrid_search_candidates, 60, 3, repo_id]
+    assert [[m["file_path"] for m in r] for r in results] == [["log.py"], ["pay.py"]]
+
+
+def test_chunk_content_search_vector_is_migrated():
+    """Test the full-text column the hybrid query reads is created and GIN indexed."""
+    sql = (MIGRATIONS / "016_chunk_content_search.sql").read_text()
+    assert "search_tsv" in sql and "GENERATED ALWAYS AS" in sql
+    assert re.search(r"USING\s+gin\s*\(\s*search_tsv\s*\)", sql, re.IGNORECASE)
+
+
+@pytest.mark.asyncio
+async def test_repo_without_partial_index_is_searched_exactly():
+    """Test a repo search is exact unless the repo has its own valid HNSW index."""
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.fetch = AsyncMock(return_value=[])
+    repo_id = uuid4()
+
+    conn.fetchrow = AsyncMock(return_value={"exact": True})
+    await CodeMapQueries.search_similar(conn, [0.1], repo_id)
+    params, *args = conn.fetchrow.await_args.args
+    assert "hnsw.ef_search" in params and args[2] == repo_vector_index_name(repo_id)
+    assert "+ 0" in conn.fetch.await_args.args[0]
+
+    conn.fetchrow = AsyncMock(return_value={"exact": False})
+    await CodeMapQueries.search_similar_many(conn, [[0.1]], repo_id)
+    assert "+ 0" not in conn.fetch.await_args.args[0]
+
+    # Searches across all repositories never look up a partial index
+    await CodeMapQueries.search_similar(conn, [0.1], None)
+    assert conn.fetchrow.await_args.args[3] is None
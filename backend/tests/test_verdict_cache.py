@@ -0,0 +1,122 @@
+"""
+Tests for the LLM verdict cache.
+"""
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.llm import LLMService, _code_hash
+from app.services.verdict_cache import VerdictCache, content_hash
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class FakeTable:
+    """compliance_verdicts in memory, behind VerdictCacheQueries' interface."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def get(self, conn, *key):
+        return self.rows.get(key)
+
+    async def upsert(self, conn, *args):
+        *key, verdict = args
+        self.rows[tuple(key)] = verdict
+
+
+@pytest.fixture
+def backends():
+    redis, table = FakeRedis(), FakeTable()
+
+    @asynccontextmanager
+    async def acquire():
+        yield MagicMock()
+
+    with patch("app.services.verdict_cache.job_queue", MagicMock(async_redis=redis, connect_async=AsyncMock())), \
+            patch("app.services.verdict_cache.db", MagicMock(acquire=acquire)), \
+            patch("app.services.verdict_cache.VerdictCacheQueries", table):
+        yield redis, table
+
+
+@pytest.mark.asyncio
+async def test_postgres_hits_are_copied_back_into_redis(backends):
+    """Test a verdict found only in Postgres is served and re-cached in Redis."""
+    redis, table = backends
+    cache = VerdictCache()
+    key = ("gpt-4o-mini", "v1", "r" * 64, "c" * 64)
+    stats = {"hits": 0, "misses": 0}
+
+    assert await cache.get(*key, stats=stats) is None
+    table.rows[key] = {"verdict": "compliant"}
+    assert await cache.get(*key, stats=stats) == {"verdict": "compliant"}
+
+    assert json.loads(redis.data[VerdictCache.key(*key)]) == {"verdict": "compliant"}
+    assert stats == {"hits": 1, "misses": 1} and cache.stats == stats
+
+
+@pytest.mark.asyncio
+async def test_analyze_compliance_reuses_verdicts_across_locations(backends):
+    """Test the same rule and code is sent to the model once, wherever the code sits."""
+    redis, table = backends
+    llm = LLMService.__new__(LLMService)
+    llm.model = "gpt-4o-mini"
+    llm.generate = AsyncMock(
+        return_value='{"verdict": "non_compliant", "severity": "high", "severity_score": 8, "explanation": "plain"}'
+    )
+    stats = {"hits": 0, "misses": 0}
+
+    for _ in range(2):
+        result = await llm.analyze_compliance("Encrypt card data", "store(card)", "python", cache_stats=stats)
+        assert result["verdict"] == "non_compliant"
+
+    # Nothing location-specific reaches the model, so the verdict holds for every copy
+    assert llm.generate.await_count == 1
+    prompt = llm.generate.await_args.args[0][1]["content"]
+    assert "File:" not in prompt and "Lines:" not in prompt
+    assert stats == {"hits": 1, "misses": 1}
+    ((model, _, rule_hash, code_hash),) = table.rows
+    assert (model, rule_hash, code_hash) == ("gpt-4o-mini", content_hash("Encrypt card data"), _code_hash("store(card)", "python"))
+
+    # Unparseable or incomplete replies are never cached
+    for reply in ("not json", '{"verdict": "non_compliant"}'):
+        llm.generate = AsyncMock(return_value=reply)
+        result = await llm.analyze_compliance("Encrypt card data", "log(card)", "python")
+        await llm.analyze_compliance("Encrypt card data", "log(card)", "python")
+        assert result["verdict"] == "unknown" and result["severity_score"] == 5.0
+        assert llm.generate.await_count == 2 and len(table.rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_rule_matcher_verdicts_carry_no_location_of_another_copy(backends):
+    """Test the rule matcher's cached verdict is keyed like LLMService's and never sees a path."""
+    from app.services import rule_matcher
+
+    redis, table = backends
+    llm = MagicMock(model="gpt-4o-mini", generate=AsyncMock(return_value='{"verdict": "compliant"}'))
+    chunk = {"chunk_text": "store(encrypt(card))", "start_line": 1, "end_line": 2, "language": "python"}
+
+    with patch.object(rule_matcher, "llm_service", llm):
+        first = await rule_matcher.RuleMatcherService()._analyze_chunk_compliance(
+            "Encrypt card data", {**chunk, "file_path": "a.py"}
+        )
+        second = await rule_matcher.RuleMatcherService()._analyze_chunk_compliance(
+            "Encrypt card data", {**chunk, "file_path": "vendor/a.py", "start_line": 40, "end_line": 41}
+        )
+
+    assert llm.generate.await_count == 1
+    assert "a.py" not in llm.generate.await_args.args[0][0]["content"]
+    assert (first["file_path"], second["file_path"], second["start_line"]) == ("a.py", "vendor/a.py", 40)
+    ((_, _, _, code_hash),) = table.rows
+    assert code_hash == _code_hash("store(encrypt(card))", "python")
@@ -0,0 +1,68 @@
+"""
+Tests for push-event driven re-indexing.
+"""
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from app.api.webhooks import handle_push_event
+
+
+def _mock_db():
+    db = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        yield MagicMock()
+
+    db.acquire = acquire
+    return db
+
+
+def _push_payload(before, commits, forced=False):
+    return {
+        "ref": "refs/heads/main",
+        "before": before,
+        "after": "b" * 40,
+        "forced": forced,
+        "repository": {"id": 42, "name": "repo", "full_name": "acme/repo", "default_branch": "main"},
+        "installation": {"id": 7},
+        "commits": commits,
+    }
+
+
+@pytest.mark.asyncio
+async def test_push_enqueues_delta_job_with_net_changes():
+    """Test a push enqueues an incremental job with net changed/removed files."""
+    repo = {"repo_id": uuid4(), "last_commit_sha": "a" * 40}
+    commits = [
+        {"added": ["src/new.py"], "modified": ["src/app.py"], "removed": ["src/old.py"]},
+        {"added": [], "modified": [], "removed": ["src/new.py"]},
+    ]
+
+    with patch("app.api.webhooks.get_db", new=AsyncMock(return_value=_mock_db())), \
+            patch("app.api.webhooks.RepositoryQueries.get_by_github_id", new=AsyncMock(return_value=repo)), \
+            patch("app.api.webhooks.job_queue") as mock_queue:
+        await handle_push_event(_push_payload("a" * 40, commits))
+
+    kwargs = mock_queue.enqueue_reindex_job.call_args.kwargs
+    assert kwargs["changed_files"] == ["src/app.py"]
+    assert kwargs["removed_files"] == ["src/new.py", "src/old.py"]
+    mock_queue.enqueue_indexing_job.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_force_push_compares_whole_tree():
+    """Test a force push falls back to a full-tree file_hash comparison."""
+    repo = {"repo_id": uuid4(), "last_commit_sha": "a" * 40}
+    commits = [{"added": [], "modified": ["src/app.py"], "removed": []}]
+
+    with patch("app.api.webhooks.get_db", new=AsyncMock(return_value=_mock_db())), \
+            patch("app.api.webhooks.RepositoryQueries.get_by_github_id", new=AsyncMock(return_value=repo)), \
+            patch("app.api.webhooks.job_queue") as mock_queue:
+        await handle_push_event(_push_payload("c" * 40, commits, forced=True))
+
+    kwargs = mock_queue.enqueue_reindex_job.call_args.kwargs
+    assert kwargs["changed_files"] is None
+    assert kwargs["removed_files"] is None